@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MaintenanceTeam, Technician, Equipment, MaintenanceRequest, WorkCenter, EquipmentCategory, MaintenanceLog
+from .models import MaintenanceTeam, Technician, Equipment, MaintenanceRequest, WorkCenter, EquipmentCategory, MaintenanceLog, MaintenancePlan, HealthRule, StageTransition, Task
 
 @admin.register(MaintenanceTeam)
 class MaintenanceTeamAdmin(admin.ModelAdmin):
@@ -16,7 +16,7 @@ class EquipmentCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(WorkCenter)
 class WorkCenterAdmin(admin.ModelAdmin):
-    list_display = ('name', 'code', 'efficiency', 'oee_target')
+    list_display = ('name', 'code', 'efficiency', 'oee_target', 'planned_hours_per_day')
 
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
@@ -28,13 +28,58 @@ class MaintenanceLogInline(admin.TabularInline):
     model = MaintenanceLog
     extra = 0
 
+class StageTransitionInline(admin.TabularInline):
+    model = StageTransition
+    extra = 0
+    can_delete = False
+    fields = readonly_fields = ('from_stage', 'to_stage', 'at', 'dwell_hours')
+    ordering = ('at',)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(MaintenanceRequest)
 class MaintenanceRequestAdmin(admin.ModelAdmin):
     list_display = ('subject', 'get_target', 'request_type', 'stage', 'priority', 'assigned_to', 'scheduled_date')
     list_filter = ('request_type', 'stage', 'priority', 'scheduled_date')
     search_fields = ('subject', 'equipment__name', 'work_center__name')
-    inlines = [MaintenanceLogInline]
+    inlines = [MaintenanceLogInline, StageTransitionInline]
 
     def get_target(self, obj):
         return obj.equipment if obj.equipment else obj.work_center
     get_target.short_description = 'Target'
+
+
+@admin.register(MaintenancePlan)
+class MaintenancePlanAdmin(admin.ModelAdmin):
+    list_display = ('name', 'equipment', 'category', 'work_center', 'interval_type', 'interval_days', 'interval_hours', 'start_date', 'is_active')
+    list_filter = ('interval_type', 'is_active', 'category', 'work_center')
+    search_fields = ('name', 'subject')
+    raw_id_fields = ('equipment',)
+    exclude = ('created_by',)
+
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(HealthRule)
+class HealthRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'metric', 'comparison', 'threshold', 'clear_threshold', 'trigger_after', 'priority', 'is_active')
+    list_filter = ('metric', 'comparison', 'is_active', 'category')
+    search_fields = ('name',)
+    exclude = ('created_by',)
+
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'last_error')
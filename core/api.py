@@ -0,0 +1,362 @@
+"""
+Versioned async JSON API.
+
+    GET    /api/v1/<resource>/            list: filters, ?q=, ?sort=, ?fields=, ?cursor=, ?limit=
+    POST   /api/v1/<resource>/            create
+    GET    /api/v1/<resource>/<id>/       detail: ?fields=
+    PATCH  /api/v1/<resource>/<id>/       partial update
+
+Resources are ``requests``, ``equipment``, ``work-centers`` and ``logs``.
+Reads use the async ORM on ``values()`` querysets limited to the
+requested fields, and lists use keyset pagination, so deep pages cost the
+same as the first. GET responses carry an ETag; a matching
+``If-None-Match`` gets an empty 304.
+
+Writes are validated with the same ModelForms as the HTML views and
+saved in a worker thread, since saving fires the (sync) model signals.
+
+Clients authenticate with a session (writes then need the CSRF token) or
+with ``Authorization: Bearer <token>`` for a token in
+``GEARGUARD_API_TOKENS``.
+"""
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.forms.models import model_to_dict, modelform_factory
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from . import assignment, pagination, search, sqlite
+from .forms import EquipmentForm, MaintenanceLogForm, MaintenanceRequestForm, WorkCenterForm
+from .models import Equipment, MaintenanceLog, MaintenanceRequest, WorkCenter
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class Resource:
+    """
+    How one model is exposed: public field name -> ``values()`` path,
+    query-string filters -> lookups, sortable fields, the ModelForm used
+    for writes and the search index kind behind ``?q=``.
+    """
+    def __init__(self, model, fields, form, filters=None, sort=('id',), default_sort='id',
+                 search_kind=None, updatable=True):
+        self.model = model
+        self.fields = fields
+        self.form = form
+        self.filters = filters or {}
+        self.sort = sort
+        self.default_sort = default_sort
+        self.search_kind = search_kind
+        self.updatable = updatable
+
+    def before_save(self, obj, user, created):
+        if created and hasattr(obj, 'created_by_id'):
+            obj.created_by = user
+
+
+class RequestResource(Resource):
+    def before_save(self, obj, user, created):
+        super().before_save(obj, user, created)
+        if created and not obj.assigned_to_id:
+            # Same routing as the request form
+            assignment.assign(obj)
+
+
+RESOURCES = {
+    'requests': RequestResource(
+        MaintenanceRequest,
+        fields={
+            'id': 'pk', 'subject': 'subject', 'request_type': 'request_type', 'stage': 'stage',
+            'priority': 'priority', 'scheduled_date': 'scheduled_date', 'duration': 'duration',
+            'equipment': 'equipment_id', 'equipment_name': 'equipment__name', 'work_center': 'work_center_id',
+            'assigned_to': 'assigned_to_id', 'team': 'team_id', 'created_by': 'created_by_id',
+            'instructions': 'instructions', 'created_at': 'created_at', 'updated_at': 'updated_at',
+            'stage_entered_at': 'stage_entered_at',
+        },
+        form=MaintenanceRequestForm,
+        filters={
+            'stage': 'stage', 'priority': 'priority', 'request_type': 'request_type',
+            'equipment': 'equipment_id', 'work_center': 'work_center_id', 'assigned_to': 'assigned_to_id',
+            'team': 'team_id', 'updated_since': 'updated_at__gte',
+        },
+        sort=('id', 'updated_at', 'scheduled_date', 'created_at'),
+        default_sort='-updated_at',
+        search_kind='request',
+    ),
+    'equipment': Resource(
+        Equipment,
+        fields={
+            'id': 'pk', 'name': 'name', 'serial_number': 'serial_number', 'category': 'category_id',
+            'category_name': 'category__name', 'work_center': 'work_center_id', 'department': 'department',
+            'location': 'location', 'maintenance_team': 'maintenance_team_id', 'owner': 'owner_id',
+            'health': 'health', 'is_scrapped': 'is_scrapped', 'purchase_date': 'purchase_date',
+            'warranty_expiry': 'warranty_expiry', 'description': 'description',
+        },
+        form=EquipmentForm,
+        filters={
+            'category': 'category_id', 'work_center': 'work_center_id', 'department': 'department',
+            'maintenance_team': 'maintenance_team_id', 'is_scrapped': 'is_scrapped',
+        },
+        sort=('id', 'name', 'serial_number', 'department', 'location', 'health'),
+        default_sort='name',
+        search_kind='equipment',
+    ),
+    'work-centers': Resource(
+        WorkCenter,
+        fields={
+            'id': 'pk', 'name': 'name', 'code': 'code', 'cost_per_hour': 'cost_per_hour',
+            'efficiency': 'efficiency', 'oee_target': 'oee_target', 'planned_hours_per_day': 'planned_hours_per_day',
+        },
+        form=WorkCenterForm,
+        filters={'code': 'code'},
+        sort=('id', 'code'),
+        default_sort='code',
+    ),
+    'logs': Resource(
+        MaintenanceLog,
+        fields={
+            'id': 'pk', 'request': 'request_id', 'comment': 'comment', 'created_by': 'created_by_id',
+            'created_by_name': 'created_by__username', 'created_at': 'created_at',
+        },
+        form=modelform_factory(MaintenanceLog, form=MaintenanceLogForm, fields=['request', 'comment']),
+        filters={'request': 'request_id', 'created_by': 'created_by_id'},
+        sort=('id', 'created_at'),
+        default_sort='-created_at',
+        # Logs are an audit trail
+        updatable=False,
+    ),
+}
+
+
+def page_size():
+    return getattr(settings, 'GEARGUARD_API_PAGE_SIZE', 50)
+
+
+def max_page_size():
+    return getattr(settings, 'GEARGUARD_API_MAX_PAGE_SIZE', 200)
+
+
+def error(message, status=400, **extra):
+    return JsonResponse({'status': 'error', 'message': message, **extra}, status=status)
+
+
+def json_response(request, payload, status=200):
+    """
+    Serialize ``payload``; GETs get an ETag of the body and a 304 when the
+    client already has it.
+    """
+    body = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+    if request.method in SAFE_METHODS and status == 200:
+        etag = quote_etag(hashlib.md5(body, usedforsecurity=False).hexdigest())
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
+    return HttpResponse(body, status=status, content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Return ``(user, error response)``.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        supplied = header[len('Bearer '):]
+        for token, username in getattr(settings, 'GEARGUARD_API_TOKENS', {}).items():
+            if token and constant_time_compare(supplied, token):
+                user = await User.objects.filter(username=username, is_active=True).afirst()
+                if user is not None:
+                    return user, None
+        return None, error('Invalid token', status=401)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, error('Authentication required', status=401)
+    if request.method not in SAFE_METHODS:
+        # The views are csrf_exempt for token clients; session clients
+        # still need the CSRF token
+        rejected = CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+        if rejected is not None:
+            return None, rejected
+    return user, None
+
+
+def parse_fields(resource, value):
+    """
+    Return the public field names selected by ``?fields=``; raises ValueError.
+    """
+    if not value:
+        return list(resource.fields)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def parse_limit(value):
+    try:
+        limit = int(value or page_size())
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return min(limit, max_page_size())
+
+
+def filter_value(model, lookup, raw):
+    field = model._meta.get_field(lookup.split('__')[0])
+    if isinstance(field, models.BooleanField):
+        return raw.lower() in ('1', 'true', 'yes')
+    try:
+        return field.to_python(raw)
+    except ValidationError as exc:
+        raise ValueError(f"Invalid value '{raw}'") from exc
+
+
+def serialize(resource, names, row):
+    return {name: row[resource.fields[name]] for name in names}
+
+
+async def list_rows(request, resource):
+    try:
+        names = parse_fields(resource, request.GET.get('fields'))
+        filters = {
+            lookup: filter_value(resource.model, lookup, request.GET[param])
+            for param, lookup in resource.filters.items() if param in request.GET
+        }
+        limit = parse_limit(request.GET.get('limit'))
+    except ValueError as exc:
+        return error(str(exc))
+
+    sort, descending = pagination.parse_sort(request.GET.get('sort'), resource.sort, resource.default_sort)
+    sort_path = resource.fields[sort]
+    qs = resource.model.objects.filter(**filters)
+    query = request.GET.get('q', '').strip()
+    if query and resource.search_kind:
+        # Every match: the list is keyset-paged past the ranked top hits
+        qs = search.filter_matches(qs, resource.search_kind, query)
+
+    paths = {resource.fields[name] for name in names} | {'pk', sort_path}
+    try:
+        rows, next_cursor, _ = await pagination.apaginate(
+            qs.values(*paths), sort_path, descending, cursor=request.GET.get('cursor'), limit=limit,
+        )
+    except ValueError:
+        return error('Invalid cursor')
+    return json_response(request, {
+        'results': [serialize(resource, names, row) for row in rows],
+        'next': next_cursor,
+    })
+
+
+async def get_row(resource, pk, names):
+    paths = {resource.fields[name] for name in names} | {'pk'}
+    return await resource.model.objects.filter(pk=pk).values(*paths).afirst()
+
+
+def save(resource, user, data, instance=None):
+    """
+    Validate and save in a worker thread. Returns ``(pk, errors)``.
+    """
+    form_fields = resource.form.base_fields
+    unknown = [name for name in data if name not in form_fields]
+    if unknown:
+        return None, {name: ['Unknown or read-only field.'] for name in unknown}
+    # Omitted fields keep their current (or default) values
+    data = {**model_to_dict(instance or resource.model(), fields=list(form_fields)), **data}
+    form = resource.form(data, instance=instance)
+    if not form.is_valid():
+        return None, {name: list(messages) for name, messages in form.errors.items()}
+    with sqlite.serialized_write():
+        obj = form.save(commit=False)
+        resource.before_save(obj, user, created=instance is None)
+        obj.save()
+        form.save_m2m()
+    return obj.pk, None
+
+
+def parse_body(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    return data
+
+
+@csrf_exempt
+async def resource_list(request, resource):
+    """
+    API View: list (GET) or create (POST) rows of one resource.
+    """
+    spec = RESOURCES.get(resource)
+    if spec is None:
+        return error('Unknown resource', status=404)
+    user, rejected = await authenticate(request)
+    if rejected is not None:
+        return rejected
+
+    if request.method in SAFE_METHODS:
+        return await list_rows(request, spec)
+    if request.method != 'POST':
+        return error('Method not allowed', status=405)
+
+    try:
+        data = parse_body(request)
+    except ValueError as exc:
+        return error(str(exc))
+    pk, errors = await sync_to_async(save)(spec, user, data)
+    if errors:
+        return error('Validation failed', errors=errors)
+    return json_response(request, serialize(spec, list(spec.fields), await get_row(spec, pk, spec.fields)), status=201)
+
+
+@csrf_exempt
+async def resource_detail(request, resource, pk):
+    """
+    API View: read (GET) or partially update (PATCH) one row.
+    """
+    spec = RESOURCES.get(resource)
+    if spec is None:
+        return error('Unknown resource', status=404)
+    user, rejected = await authenticate(request)
+    if rejected is not None:
+        return rejected
+
+    if request.method in SAFE_METHODS:
+        try:
+            names = parse_fields(spec, request.GET.get('fields'))
+        except ValueError as exc:
+            return error(str(exc))
+        row = await get_row(spec, pk, names)
+        if row is None:
+            return error('Not found', status=404)
+        return json_response(request, serialize(spec, names, row))
+    if request.method != 'PATCH' or not spec.updatable:
+        return error('Method not allowed', status=405)
+
+    instance = await spec.model.objects.filter(pk=pk).afirst()
+    if instance is None:
+        return error('Not found', status=404)
+    try:
+        data = parse_body(request)
+    except ValueError as exc:
+        return error(str(exc))
+    pk, errors = await sync_to_async(save)(spec, user, data, instance)
+    if errors:
+        return error('Validation failed', errors=errors)
+    return json_response(request, serialize(spec, list(spec.fields), await get_row(spec, pk, spec.fields)))
@@ -0,0 +1,224 @@
+"""
+Workload-aware technician assignment.
+
+A per-process ``LoadIndex`` keeps each technician's open request count and
+scheduled hours (sum of ``duration``) plus team membership, built from one
+aggregate query. Every team has a min-heap keyed on load; picking the
+least-loaded eligible technician pops stale entries lazily, so a decision
+is O(log n) instead of a scan over all requests.
+
+Signals keep the index current for single-row saves; bulk writers call
+``reset()`` and the index is rebuilt on next use (or after
+``GEARGUARD_ASSIGNMENT_MAX_AGE`` seconds, so workers converge).
+"""
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Sum
+
+from . import versions
+from .models import Equipment, MaintenanceRequest, MaintenanceTeam, Technician
+
+CLOSED_STAGES = ('Repaired', 'Scrap')
+
+# Heap key for technicians without a (staffed) team
+ANY_TEAM = None
+
+
+def capacity():
+    """
+    Open requests a technician can carry at 100% utilization.
+    """
+    return getattr(settings, 'GEARGUARD_TECH_CAPACITY', 5)
+
+
+def is_open(stage):
+    return stage not in CLOSED_STAGES
+
+
+class LoadIndex:
+    def __init__(self):
+        self.loads = {}    # user id -> [open count, scheduled hours]
+        self.teams = {}    # team id -> set of user ids (ANY_TEAM -> everyone)
+        self.names = {}    # user id -> display name
+        self.heaps = {}    # team id -> [(open, hours, user id)]
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        members = {}
+        for team_id, user_id in MaintenanceTeam.members.through.objects.values_list('maintenanceteam_id', 'user_id'):
+            members.setdefault(team_id, set()).add(user_id)
+        for team_id, user_id in Technician.objects.values_list('team_id', 'user_id'):
+            members.setdefault(team_id, set()).add(user_id)
+        everyone = set().union(*members.values()) if members else set()
+        members[ANY_TEAM] = everyone
+        index.teams = members
+
+        index.loads = {user_id: [0, 0.0] for user_id in everyone}
+        open_work = (
+            MaintenanceRequest.objects
+            .filter(assigned_to__in=everyone)
+            .exclude(stage__in=CLOSED_STAGES)
+            .values('assigned_to')
+            .annotate(n=Count('id'), hours=Sum('duration'))
+        )
+        for row in open_work:
+            index.loads[row['assigned_to']] = [row['n'], row['hours'] or 0.0]
+
+        for user in User.objects.filter(pk__in=everyone).only('username', 'first_name', 'last_name'):
+            index.names[user.pk] = user.get_full_name() or user.username
+
+        for team_id, user_ids in members.items():
+            heap = [(*index.loads[user_id], user_id) for user_id in user_ids]
+            heapq.heapify(heap)
+            index.heaps[team_id] = heap
+        return index
+
+    def adjust(self, user_id, count, hours):
+        if user_id not in self.loads:
+            return
+        load = self.loads[user_id]
+        load[0] += count
+        load[1] += hours
+        entry = (*load, user_id)
+        for team_id, user_ids in self.teams.items():
+            if user_id in user_ids:
+                heapq.heappush(self.heaps[team_id], entry)
+
+    def least_loaded(self, team_id):
+        """
+        Return the least-loaded technician of ``team_id`` (falling back to
+        everyone when the team has no members), or None.
+        """
+        heap = self.heaps.get(team_id) if self.teams.get(team_id) else None
+        if heap is None:
+            heap = self.heaps.get(ANY_TEAM)
+        while heap:
+            count, hours, user_id = heap[0]
+            if self.loads[user_id] == [count, hours]:
+                return user_id
+            heapq.heappop(heap)  # stale entry
+        return None
+
+    def utilization(self):
+        """
+        Return ``[{'user_id', 'name', 'open', 'hours', 'utilization'}]``,
+        busiest first.
+        """
+        limit = capacity()
+        rows = [
+            {
+                'user_id': user_id,
+                'name': self.names.get(user_id, ''),
+                'open': count,
+                'hours': hours,
+                'utilization': int(count / limit * 100) if limit else 0,
+            }
+            for user_id, (count, hours) in self.loads.items()
+        ]
+        rows.sort(key=lambda row: (-row['utilization'], -row['hours'], row['name']))
+        return rows
+
+
+_index = None
+_lock = threading.RLock()
+
+
+def get_index():
+    global _index
+    with _lock:
+        max_age = getattr(settings, 'GEARGUARD_ASSIGNMENT_MAX_AGE', 300)
+        if _index is None or time.monotonic() - _index.built_at > max_age:
+            _index = LoadIndex.build()
+        return _index
+
+
+def reset():
+    global _index
+    with _lock:
+        _index = None
+
+
+def record_change(before, after):
+    """
+    Apply the load change between two ``(assigned_to_id, stage, duration)``
+    states of one request.
+    """
+    with _lock:
+        if _index is None:
+            return
+        for state, sign in ((before, -1), (after, 1)):
+            if state and state[0] and is_open(state[1]):
+                _index.adjust(state[0], sign, sign * (state[2] or 0.0))
+
+
+def resolve_team(req):
+    if req.team_id:
+        return req.team_id
+    if req.equipment_id:
+        return Equipment.objects.filter(pk=req.equipment_id).values_list('maintenance_team_id', flat=True).first()
+    return None
+
+
+def assign(req):
+    """
+    Set ``req.assigned_to`` (and a missing ``team``) to the least-loaded
+    eligible technician. Does not save. Returns the chosen user id or None.
+    """
+    with _lock:
+        index = get_index()
+        if not req.team_id:
+            req.team_id = resolve_team(req)
+        user_id = index.least_loaded(req.team_id)
+        if user_id is not None:
+            req.assigned_to_id = user_id
+        return user_id
+
+
+def overall_utilization(rows):
+    if not rows:
+        return 0
+    return int(sum(row['utilization'] for row in rows) / len(rows))
+
+
+def rebalance(include_assigned=False, dry_run=False, batch_size=1000):
+    """
+    Assign open, unassigned requests (and with ``include_assigned`` also
+    reassign requests still in 'New') to the least-loaded eligible
+    technicians. Returns the number of requests (re)assigned.
+    """
+    backlog = MaintenanceRequest.objects.filter(stage='New') if include_assigned else \
+        MaintenanceRequest.objects.exclude(stage__in=CLOSED_STAGES).filter(assigned_to__isnull=True)
+    backlog = backlog.order_by('scheduled_date', 'pk')
+    team_of_equipment = dict(
+        Equipment.objects.filter(requests__in=backlog).values_list('pk', 'maintenance_team_id').distinct()
+    )
+
+    with _lock:
+        index = LoadIndex.build()
+        if include_assigned:
+            for user_id, duration in backlog.filter(assigned_to__isnull=False).values_list('assigned_to_id', 'duration'):
+                index.adjust(user_id, -1, -(duration or 0.0))
+
+        changed = []
+        for req in backlog.only('id', 'team_id', 'equipment_id', 'assigned_to_id', 'duration').iterator(chunk_size=batch_size):
+            team_id = req.team_id or team_of_equipment.get(req.equipment_id)
+            user_id = index.least_loaded(team_id)
+            if user_id is None:
+                continue
+            index.adjust(user_id, 1, req.duration or 0.0)
+            if user_id != req.assigned_to_id or team_id != req.team_id:
+                req.assigned_to_id = user_id
+                req.team_id = team_id
+                changed.append(req)
+
+        if not dry_run:
+            MaintenanceRequest.objects.bulk_update(changed, ['assigned_to', 'team'], batch_size=batch_size)
+            reset()
+            versions.bump(MaintenanceRequest)
+    return len(changed)
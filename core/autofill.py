@@ -0,0 +1,159 @@
+"""
+Equipment details that auto-fill the request form.
+
+Picking equipment fills in its category, department, team and work
+center. ``details()`` and ``details_many()`` read them with one joined
+query for whatever a per-process LRU cache (``GEARGUARD_AUTOFILL_CACHE_SIZE``
+entries) does not hold. Signals drop the entries of saved or deleted
+equipment and clear the cache when a category or team changes; bulk
+writers call ``record()``. Entries older than
+``GEARGUARD_AUTOFILL_MAX_AGE`` seconds are read again, so workers that
+did not see a write converge.
+
+Offline clients keep a copy of the whole table. ``snapshot()`` returns
+every row as a compact list with a ``version``: the id of the latest
+``EquipmentChange``. ``changes(since)`` returns the rows changed after a
+version and the ids deleted since. Changes are kept for
+``GEARGUARD_AUTOFILL_CHANGE_RETENTION_DAYS`` (``prune()``, run by the
+worker); a client older than that gets None and downloads a new
+snapshot.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Equipment, EquipmentChange
+
+# Columns of a snapshot row
+FIELDS = ('id', 'name', 'category', 'department', 'team_id', 'team_name', 'work_center_id')
+
+_COLUMNS = ('pk', 'name', 'category__name', 'department', 'maintenance_team_id', 'maintenance_team__name', 'work_center_id')
+
+# Equipment fields that show up in the details
+TRACKED = ('name', 'category_id', 'department', 'maintenance_team_id', 'work_center_id')
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # pk -> (read at, details)
+
+
+def cache_size():
+    return getattr(settings, 'GEARGUARD_AUTOFILL_CACHE_SIZE', 5000)
+
+
+def max_age():
+    return getattr(settings, 'GEARGUARD_AUTOFILL_MAX_AGE', 60)
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'GEARGUARD_AUTOFILL_CHANGE_RETENTION_DAYS', 30))
+
+
+def _rows(queryset):
+    for row in queryset.order_by('pk').values_list(*_COLUMNS):
+        yield [row[0], row[1], row[2] or '', *row[3:]]
+
+
+def _as_details(row):
+    return dict(zip(FIELDS, row))
+
+
+def details_many(pks):
+    """
+    ``{pk: details}`` for the existing equipment among ``pks``.
+    """
+    found, missing = {}, []
+    now = time.monotonic()
+    with _lock:
+        for pk in pks:
+            entry = _cache.get(pk)
+            if entry is not None and now - entry[0] < max_age():
+                _cache.move_to_end(pk)
+                found[pk] = entry[1]
+            else:
+                missing.append(pk)
+    if missing:
+        fresh = {row[0]: _as_details(row) for row in _rows(Equipment.objects.filter(pk__in=missing))}
+        with _lock:
+            for pk, values in fresh.items():
+                _cache[pk] = (now, values)
+                _cache.move_to_end(pk)
+            while len(_cache) > cache_size():
+                _cache.popitem(last=False)
+        found.update(fresh)
+    return found
+
+
+def details(pk):
+    """
+    The details of equipment ``pk``, or None if it does not exist.
+    """
+    return details_many([pk]).get(pk)
+
+
+def forget(pks=None):
+    """
+    Drop the cached details of ``pks`` (default: all).
+    """
+    with _lock:
+        if pks is None:
+            _cache.clear()
+        for pk in pks or ():
+            _cache.pop(pk, None)
+
+
+def record(pks):
+    """
+    Log a change of equipment ``pks`` for delta sync and drop their
+    cached details.
+    """
+    pks = sorted(set(pks))
+    forget(pks)
+    if pks:
+        EquipmentChange.objects.bulk_create([EquipmentChange(equipment_id=pk) for pk in pks])
+
+
+def version():
+    return EquipmentChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def snapshot():
+    """
+    ``{'version', 'fields', 'rows'}`` for all equipment.
+    """
+    # Read first: a change landing meanwhile is sent again by the next sync
+    current = version()
+    return {'version': current, 'fields': FIELDS, 'rows': list(_rows(Equipment.objects.all()))}
+
+
+def changes(since):
+    """
+    ``{'version', 'fields', 'rows', 'deleted'}``: what changed after
+    version ``since``, or None when those changes are no longer kept.
+    """
+    bounds = EquipmentChange.objects.aggregate(first=Min('id'), latest=Max('id'))
+    latest = bounds['latest'] or 0
+    if since > latest or (bounds['first'] is not None and since < bounds['first'] - 1):
+        return None
+    changed = set(EquipmentChange.objects.filter(id__gt=since, id__lte=latest).values_list('equipment_id', flat=True))
+    rows = list(_rows(Equipment.objects.filter(pk__in=changed))) if changed else []
+    return {
+        'version': latest,
+        'fields': FIELDS,
+        'rows': rows,
+        'deleted': sorted(changed - {row[0] for row in rows}),
+    }
+
+
+def prune(now=None):
+    """
+    Delete changes older than the retention period. The latest change is
+    kept so that the version does not go back.
+    """
+    now = now or timezone.now()
+    latest = version()
+    return EquipmentChange.objects.filter(changed_at__lt=now - retention(), id__lt=latest).delete()[0]
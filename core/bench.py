@@ -0,0 +1,52 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks run against a throwaway test database so they never touch
+``db.sqlite3`` (or the production database).
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def scratch_database(verbosity=0, name=None):
+    """
+    Create a fresh test database for the duration of the block and
+    destroy it afterwards. ``name`` overrides the test database name,
+    e.g. to put a SQLite test database in a file that several
+    connections can share.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if name:
+        test_settings['NAME'] = name
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+
+
+def measure(fn, repeat=20):
+    """
+    Call ``fn`` ``repeat`` times and return latency percentiles in ms.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p99': samples[min(len(samples) - 1, int(round(0.99 * (len(samples) - 1))))],
+        'max': samples[-1],
+    }
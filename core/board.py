@@ -0,0 +1,193 @@
+"""
+Kanban board engine.
+
+The board is built from two queries no matter how many stages exist:
+one aggregate for the per-stage counts and one windowed query that
+returns the first ``page_size`` cards of every column. Further cards are
+fetched per column with keyset pagination on (``updated_at``, ``id``).
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import assignment, events, flow, kpis, oee, reliability, rules, search, sqlite, versions
+from .models import Equipment, MaintenanceRequest
+
+CLOSED_STAGES = ('Repaired', 'Scrap')
+
+CARD_ORDERING = ('-updated_at', '-id')
+
+
+def page_size():
+    return getattr(settings, 'GEARGUARD_BOARD_PAGE_SIZE', 20)
+
+
+def closed_window():
+    """
+    How far back closed stages reach by default, or None for all history.
+    """
+    days = getattr(settings, 'GEARGUARD_BOARD_CLOSED_DAYS', 30)
+    return timedelta(days=days) if days else None
+
+
+def board_queryset(query=None, include_history=False):
+    qs = MaintenanceRequest.objects.all()
+    if query:
+        # Every match: column totals and "Load more" page over the filter
+        qs = search.filter_matches(qs, 'request', query)
+    window = closed_window()
+    if window and not include_history:
+        qs = qs.filter(~Q(stage__in=CLOSED_STAGES) | Q(updated_at__gte=timezone.now() - window))
+    return qs
+
+
+def encode_cursor(card):
+    raw = f"{card.updated_at.isoformat()}|{card.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Return (updated_at, id) for a cursor; raises ValueError if malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, pk = raw.rsplit('|', 1)
+        updated_at = parse_datetime(updated_at)
+        pk = int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if updated_at is None:
+        raise ValueError('Invalid cursor')
+    return updated_at, pk
+
+
+def build_board(qs, limit=None):
+    """
+    Return ``[(label, cards, stage_code, total, next_cursor), ...]`` for
+    every stage using one aggregate query and one windowed card query.
+    """
+    limit = limit or page_size()
+    counts = dict(qs.order_by().values_list('stage').annotate(n=Count('id')))
+
+    cards = (
+        qs.select_related('equipment', 'assigned_to')
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('stage')],
+            order_by=[F('updated_at').desc(), F('id').desc()],
+        ))
+        .filter(position__lte=limit)
+        .order_by('stage', *CARD_ORDERING)
+    )
+    by_stage = {}
+    for card in cards:
+        by_stage.setdefault(card.stage, []).append(card)
+
+    columns = []
+    for stage_code, stage_label in MaintenanceRequest.STAGE_CHOICES:
+        stage_cards = by_stage.get(stage_code, [])
+        total = counts.get(stage_code, 0)
+        cursor = encode_cursor(stage_cards[-1]) if stage_cards and total > len(stage_cards) else None
+        columns.append((stage_label, stage_cards, stage_code, total, cursor))
+    return columns
+
+
+def column_page(qs, stage, cursor=None, limit=None):
+    """
+    Return ``(cards, next_cursor)`` for one column after ``cursor``.
+    """
+    limit = limit or page_size()
+    qs = qs.filter(stage=stage)
+    if cursor:
+        updated_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+    cards = list(qs.select_related('equipment', 'assigned_to').order_by(*CARD_ORDERING)[:limit + 1])
+    next_cursor = encode_cursor(cards[limit - 1]) if len(cards) > limit else None
+    return cards[:limit], next_cursor
+
+
+def max_moves():
+    return getattr(settings, 'GEARGUARD_BOARD_MAX_MOVES', 500)
+
+
+def apply_moves(moves):
+    """
+    Apply a batch of ``{'id': ..., 'stage': ...}`` moves.
+
+    All moves are validated up front, written with one ``bulk_update`` in
+    a single transaction, and scrap propagation to Equipment is a single
+    set-based UPDATE. Returns one ``{'id', 'status'[, 'message']}`` result
+    per move, in input order. Later moves of the same card win.
+    """
+    valid_stages = dict(MaintenanceRequest.STAGE_CHOICES)
+    results = []
+    wanted = {}
+    for move in moves:
+        pk = move.get('id') if isinstance(move, dict) else None
+        stage = move.get('stage') if isinstance(move, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            results.append({'id': pk, 'status': 'error', 'message': 'Invalid id'})
+        elif stage not in valid_stages:
+            results.append({'id': pk, 'status': 'error', 'message': 'Unknown stage'})
+        else:
+            results.append({'id': pk, 'status': 'ok'})
+            wanted[pk] = stage
+
+    with sqlite.serialized_write():
+        found = {
+            req.pk: req
+            for req in MaintenanceRequest.objects.filter(pk__in=wanted).only('id', 'stage', 'equipment_id', 'work_center_id', 'created_at', 'stage_entered_at')
+        }
+        now = timezone.now()
+        changed = []
+        repairs = []
+        closures = []
+        transitions = []
+        for pk, stage in wanted.items():
+            req = found.get(pk)
+            if req is None or req.stage == stage:
+                continue
+            events.publish_on_commit(events.BOARD, 'card', {'id': pk, 'stage': stage, 'from': req.stage})
+            if reliability.REPAIRED in (req.stage, stage):
+                repairs.append(req)
+            if (req.stage in oee.CLOSED_STAGES) != (stage in oee.CLOSED_STAGES):
+                closures.append(req)
+            previous, entered_at = req.stage, req.stage_entered_at
+            req.stage = stage
+            req.updated_at = req.stage_entered_at = now
+            transitions.append(flow.transition(req, previous, entered_at, now))
+            changed.append(req)
+        MaintenanceRequest.objects.bulk_update(changed, ['stage', 'updated_at', 'stage_entered_at'])
+        flow.record(transitions)
+
+        scrapped = {req.equipment_id for req in changed if req.stage == 'Scrap' and req.equipment_id}
+        if scrapped:
+            Equipment.objects.filter(pk__in=scrapped, is_scrapped=False).update(is_scrapped=True)
+
+    if changed:
+        # bulk_update bypasses the model signals (card events are sent above)
+        kpis.invalidate()
+        assignment.reset()
+        versions.bump(MaintenanceRequest, *([Equipment] if scrapped else []))
+        rules.forget(scrapped)
+        reliability.schedule(
+            [req.equipment_id for req in repairs],
+            [req.work_center_id for req in repairs if not req.equipment_id],
+        )
+        if closures:
+            oee.schedule(
+                [req.equipment_id for req in closures],
+                [req.work_center_id for req in closures if not req.equipment_id],
+                since=min(timezone.localdate(req.created_at) for req in closures),
+            )
+
+    for result in results:
+        if result['status'] == 'ok' and result['id'] not in found:
+            result.update(status='error', message='Not found')
+    return results
@@ -0,0 +1,355 @@
+"""
+In-process event bus behind the server-sent events stream (``/events/``).
+
+Signals and the bulk write paths publish compact deltas after their
+transaction commits:
+
+    topic 'board'           card    {id, stage, from[, html]}   moved or created
+                            card_removed {id, stage}
+                            reset   {}                           many cards changed
+    topic 'dashboard'       kpis    {counters...}                snapshot refreshed
+    topic 'request-<id>'    log     {id, request, html}          log added
+
+Every event gets an increasing id and is kept in a short backlog, so an
+``EventSource`` that reconnects with ``Last-Event-ID`` receives what it
+missed. Publishing is thread-safe and cheap when nobody listens.
+
+Pages get a signed stream URL (``stream_url()``) naming the topics they
+may follow. Under ASGI, ``route()`` serves that URL in front of Django:
+the token is checked without touching the database, and each stream is
+an asyncio queue on the event loop, so idle connections cost no thread.
+(Going through Django's handler would keep a sync worker thread alive
+for every open response.) Under WSGI and the development server the
+``event_stream`` view answers the same URL by polling: each response
+carries what is already in the backlog and returns at once, and its
+``retry`` hint (``GEARGUARD_EVENTS_POLL_INTERVAL``) makes EventSource
+ask again with Last-Event-ID. Holding the response open would tie up a
+sync worker thread per idle page.
+
+The bus is per process: run the ASGI app as one process per host (or
+pin clients to a worker) so that writes and streams share a bus.
+Publishes from other processes - ``run_worker`` tasks, the scheduler,
+rules fired by ``ingest_telemetry`` or ``rollup_telemetry`` - never
+reach a stream; those changes show when the page is reloaded.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import reverse
+
+TOKEN_SALT = 'gearguard.events'
+
+BOARD = 'board'
+DASHBOARD = 'dashboard'
+
+
+def request_topic(request_id):
+    return f'request-{request_id}'
+
+
+def token_max_age():
+    """
+    Seconds a stream URL stays valid; EventSource reconnects reuse it.
+    """
+    return getattr(settings, 'GEARGUARD_EVENTS_TOKEN_MAX_AGE', 12 * 3600)
+
+
+def stream_url(user, *topics):
+    token = signing.dumps({'user': user.pk, 'topics': list(topics)}, salt=TOKEN_SALT, compress=True)
+    return f"{reverse('event_stream')}?{urlencode({'token': token})}"
+
+
+def read_token(token):
+    """
+    Return the topics of a stream token; raises ``signing.BadSignature``
+    (or ``SignatureExpired``) if it is invalid.
+    """
+    return signing.loads(token, salt=TOKEN_SALT, max_age=token_max_age())['topics']
+
+
+def parse_last_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def backlog_size():
+    return getattr(settings, 'GEARGUARD_EVENTS_BACKLOG', 500)
+
+
+def queue_size():
+    return getattr(settings, 'GEARGUARD_EVENTS_QUEUE_SIZE', 200)
+
+
+def poll_interval():
+    """
+    Seconds between the requests of a polling (WSGI) stream.
+    """
+    return getattr(settings, 'GEARGUARD_EVENTS_POLL_INTERVAL', 3)
+
+
+def heartbeat():
+    """
+    Seconds between keep-alive comments on an idle stream.
+    """
+    return getattr(settings, 'GEARGUARD_EVENTS_HEARTBEAT', 15)
+
+
+class Event:
+    __slots__ = ('id', 'topic', 'type', 'data', '_encoded')
+
+    def __init__(self, id, topic, type, data):
+        self.id = id
+        self.topic = topic
+        self.type = type
+        self.data = data
+        self._encoded = None
+
+    def encode(self):
+        # Encoded once, however many streams send it
+        if self._encoded is None:
+            self._encoded = f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, cls=DjangoJSONEncoder)}\n\n"
+        return self._encoded
+
+
+class Subscription:
+    """
+    One stream's queue. ``lagging`` is set when the client fell so far
+    behind that events were dropped; the stream then asks it to reload.
+    """
+    def __init__(self, topics, loop, maxsize):
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.lagging = False
+        self.start_id = None
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagging = True
+
+
+# Queued to every stream once per heartbeat, by one timer per event loop
+KEEP_ALIVE = object()
+
+
+def _deliver(subs, event):
+    for sub in subs:
+        sub.offer(event)
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        # Event loops with a keep-alive timer running
+        self._ticking = set()
+        self._backlog = deque(maxlen=backlog_size())
+        self._last_id = 0
+
+    def publish(self, topic, type, data):
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, topic, type, data)
+            self._backlog.append(event)
+            targets = {}
+            for sub in self._subscriptions:
+                if topic in sub.topics:
+                    targets.setdefault(sub.loop, []).append(sub)
+        # One wake-up per event loop, not per stream
+        for loop, subs in targets.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subs, event)
+            except RuntimeError:
+                # The loop has shut down
+                for sub in subs:
+                    self.unsubscribe(sub)
+        return event
+
+    def subscribe(self, topics, last_id=None):
+        """
+        Register a stream on the running loop. Returns ``(subscription,
+        missed events)``; missed is None when ``last_id`` is older than
+        the backlog.
+        """
+        loop = asyncio.get_running_loop()
+        sub = Subscription(topics, loop, queue_size())
+        with self._lock:
+            if loop not in self._ticking:
+                self._ticking.add(loop)
+                loop.call_later(heartbeat(), self._keep_alive, loop)
+            self._subscriptions.add(sub)
+            sub.start_id = self._last_id
+            return sub, self._since(sub.topics, last_id)
+
+    def since(self, topics, last_id):
+        """
+        The backlog events on ``topics`` after ``last_id``, or None when
+        ``last_id`` is older than the backlog.
+        """
+        with self._lock:
+            return self._since(topics, last_id)
+
+    def _since(self, topics, last_id):
+        if last_id is None or last_id == self._last_id:
+            return []
+        oldest = self._backlog[0].id if self._backlog else self._last_id + 1
+        if last_id > self._last_id or last_id + 1 < oldest:
+            # From before a restart, or too old
+            return None
+        return [event for event in self._backlog if event.id > last_id and event.topic in topics]
+
+    def _keep_alive(self, loop):
+        with self._lock:
+            subs = [sub for sub in self._subscriptions if sub.loop is loop]
+            if not subs:
+                self._ticking.discard(loop)
+                return
+        for sub in subs:
+            if sub.queue.empty():
+                sub.offer(KEEP_ALIVE)
+        loop.call_later(heartbeat(), self._keep_alive, loop)
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+    def has_subscribers(self, topic):
+        with self._lock:
+            return any(topic in sub.topics for sub in self._subscriptions)
+
+    def last_id(self):
+        with self._lock:
+            return self._last_id
+
+    def clear(self):
+        with self._lock:
+            self._subscriptions.clear()
+            self._ticking.clear()
+            self._backlog = deque(maxlen=backlog_size())
+
+
+bus = EventBus()
+
+
+def publish_on_commit(topic, type, data):
+    """
+    Publish once the current transaction commits (at once outside one).
+    ``data`` may be a callable, evaluated after the commit.
+    """
+    def send():
+        bus.publish(topic, type, data() if callable(data) else data)
+    transaction.on_commit(send)
+
+
+def publish_created_cards(requests):
+    """
+    Announce requests written with ``bulk_create``. Large batches send
+    one ``reset`` instead, which makes open boards reload.
+    """
+    if len(requests) > getattr(settings, 'GEARGUARD_EVENTS_MAX_BATCH', 50):
+        publish_on_commit(BOARD, 'reset', {})
+        return
+    for req in requests:
+        publish_on_commit(BOARD, 'card', {'id': req.pk, 'stage': req.stage, 'from': None})
+
+
+async def stream(topics, last_id=None):
+    """
+    Yield SSE-encoded chunks for ``topics`` until the client disconnects.
+    """
+    sub, missed = bus.subscribe(topics, last_id)
+    try:
+        # How soon EventSource reconnects, and where a new stream starts
+        yield f"retry: 3000\nid: {sub.start_id}\n\n" if last_id is None else "retry: 3000\n\n"
+        if missed is None:
+            yield "event: reset\ndata: {}\n\n"
+            return
+        for event in missed:
+            yield event.encode()
+        while True:
+            event = await sub.queue.get()
+            if event is KEEP_ALIVE:
+                yield ": keep-alive\n\n"
+                continue
+            if sub.lagging:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            yield event.encode()
+    finally:
+        bus.unsubscribe(sub)
+
+
+def poll(topics, last_id):
+    """
+    One polling response body for WSGI servers: where a new stream
+    starts, or the events after ``last_id``. Never waits.
+    """
+    retry = f"retry: {int(poll_interval() * 1000)}\n"
+    if last_id is None:
+        return f"{retry}id: {bus.last_id()}\n\n"
+    missed = bus.since(topics, last_id)
+    if missed is None:
+        return f"{retry}event: reset\ndata: {{}}\n\n"
+    return f"{retry}\n" + ''.join(event.encode() for event in missed)
+
+
+def route(app):
+    """
+    Wrap the Django ASGI application so the event stream URL is served
+    directly on the event loop.
+    """
+    path = reverse('event_stream')
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == path:
+            return await serve(scope, receive, send)
+        return await app(scope, receive, send)
+    return application
+
+
+async def serve(scope, receive, send):
+    token = parse_qs(scope['query_string'].decode('latin-1')).get('token', [''])[0]
+    try:
+        topics = read_token(token)
+    except signing.BadSignature:
+        await send({'type': 'http.response.start', 'status': 403,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': b'Invalid or expired stream token'})
+        return
+    headers = dict(scope['headers'])
+    last_id = parse_last_id(headers.get(b'last-event-id'))
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+
+    async def pump():
+        async for chunk in stream(topics, last_id):
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = {asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())}
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,100 @@
+"""
+Streaming CSV / JSON Lines exports.
+
+Rows are read with ``.values_list().iterator(chunk_size=...)`` and written
+straight into a ``StreamingHttpResponse``, so memory use stays flat no
+matter how many rows are exported.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import Equipment, MaintenanceRequest
+
+# (column name, ORM lookup)
+EQUIPMENT_COLUMNS = [
+    ('id', 'pk'),
+    ('name', 'name'),
+    ('serial_number', 'serial_number'),
+    ('category', 'category__name'),
+    ('work_center', 'work_center__code'),
+    ('department', 'department'),
+    ('location', 'location'),
+    ('maintenance_team', 'maintenance_team__name'),
+    ('owner', 'owner__username'),
+    ('purchase_date', 'purchase_date'),
+    ('warranty_expiry', 'warranty_expiry'),
+    ('is_scrapped', 'is_scrapped'),
+    ('health', 'health'),
+]
+
+REQUEST_COLUMNS = [
+    ('id', 'pk'),
+    ('subject', 'subject'),
+    ('request_type', 'request_type'),
+    ('stage', 'stage'),
+    ('priority', 'priority'),
+    ('equipment', 'equipment__serial_number'),
+    ('work_center', 'work_center__code'),
+    ('scheduled_date', 'scheduled_date'),
+    ('duration', 'duration'),
+    ('assigned_to', 'assigned_to__username'),
+    ('team', 'team__name'),
+    ('created_by', 'created_by__username'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+EXPORTS = {
+    'equipment': (Equipment, EQUIPMENT_COLUMNS),
+    'requests': (MaintenanceRequest, REQUEST_COLUMNS),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object whose write() just returns the value, for csv.writer.
+    """
+    def write(self, value):
+        return value
+
+
+def chunk_size():
+    return getattr(settings, 'GEARGUARD_EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_rows(queryset, columns):
+    lookups = [lookup for _, lookup in columns]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size())
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows, columns):
+    names = [name for name, _ in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream(kind, fmt, queryset=None):
+    model, columns = EXPORTS[kind]
+    if queryset is None:
+        queryset = model.objects.all()
+    rows = iter_rows(queryset, columns)
+    content = iter_csv(rows, columns) if fmt == 'csv' else iter_jsonl(rows, columns)
+    response = StreamingHttpResponse(content, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
@@ -0,0 +1,197 @@
+"""
+Stage transitions and flow analytics for maintenance requests.
+
+Every stage change appends a ``StageTransition``; creation counts as
+entering the first stage. The signals in core/signals.py diff the stage
+against the value the instance was loaded with, so recording costs one
+INSERT and no extra SELECT. Bulk paths (board moves, health-rule alerts,
+the preventive scheduler, seeding) call ``record()`` themselves.
+``MaintenanceRequest.stage_entered_at`` holds the time of the latest
+transition.
+
+``StageFlow`` keeps, per stage and local day, the requests that entered
+and left the stage and the hours spent in it by those that left. The
+days touched by new transitions are rebuilt from the transitions table
+by a queued task (one per day while it waits), so the aggregates stay
+exact however often they are refreshed. From them:
+
+* ``cumulative_flow(start, end)``: requests in each stage at the end of
+  every day, for cumulative flow diagrams;
+* ``dwell(start, end)``: requests leaving each stage and their mean time
+  in it.
+
+``manage.py rebuild_stage_flow`` rebuilds every day, and with
+``--backfill`` first records a history for requests that have none.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import tasks, versions
+from .models import MaintenanceRequest, StageFlow, StageTransition
+
+STAGES = [code for code, _ in MaintenanceRequest.STAGE_CHOICES]
+
+# from_stage of a request's first transition
+CREATED = ''
+
+# Longest range cumulative_flow() answers for
+MAX_DAYS = 731
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def transition(req, previous, entered_at, at):
+    """
+    A StageTransition for ``req`` entering its current stage at ``at``,
+    from ``previous`` (``CREATED`` for a new request) which it entered at
+    ``entered_at``.
+    """
+    dwell = (at - entered_at).total_seconds() / 3600 if previous and entered_at else None
+    return StageTransition(request_id=req.pk, from_stage=previous, to_stage=req.stage, at=at, dwell_hours=dwell)
+
+
+def record(transitions):
+    """
+    Store ``transitions`` and queue a refresh of the days they fall on.
+    """
+    transitions = list(transitions)
+    if not transitions:
+        return
+    StageTransition.objects.bulk_create(transitions)
+    schedule({timezone.localdate(item.at) for item in transitions})
+
+
+def record_created(requests):
+    """
+    ``record()`` the creation of ``requests`` written with bulk_create,
+    which must have set their ``stage_entered_at``.
+    """
+    record(transition(req, CREATED, None, req.stage_entered_at) for req in requests)
+
+
+def refresh(days=None):
+    """
+    Rebuild the StageFlow rows of the local ``days`` (default: all) from
+    the transitions. Returns the number of rows written.
+    """
+    transitions = StageTransition.objects.all()
+    flows = StageFlow.objects.all()
+    if days is not None:
+        days = set(days)
+        transitions = transitions.filter(at__gte=_midnight(min(days)), at__lt=_midnight(max(days) + timedelta(days=1)))
+        flows = flows.filter(day__in=days)
+
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    grouped = (
+        transitions.values('from_stage', 'to_stage', day=TruncDate('at'))
+        .annotate(count=Count('id'), hours=Sum('dwell_hours')).order_by()
+    )
+    for row in grouped:
+        if days is not None and row['day'] not in days:
+            continue
+        totals[row['to_stage'], row['day']][0] += row['count']
+        if row['from_stage'] != CREATED:
+            left = totals[row['from_stage'], row['day']]
+            left[1] += row['count']
+            left[2] += row['hours'] or 0.0
+
+    with transaction.atomic():
+        flows.delete()
+        StageFlow.objects.bulk_create([
+            StageFlow(stage=stage, day=day, entered=entered, exited=exited, dwell_hours=hours)
+            for (stage, day), (entered, exited, hours) in totals.items()
+        ])
+        # bulk_create bypasses the model signals
+        versions.bump(StageFlow)
+    return len(totals)
+
+
+@tasks.task
+def refresh_task(days):
+    refresh([date.fromisoformat(day) for day in days])
+
+
+def schedule(days):
+    days = sorted(day.isoformat() for day in days)
+    refresh_task.enqueue(days, key=f'stage-flow:{days[0]}' if len(days) == 1 else None)
+
+
+def cumulative_flow(start, end):
+    """
+    ``[{'date': ..., <stage>: count, ...}]``: requests in each stage at the
+    end of every day from ``start`` to ``end``.
+    """
+    counts = dict.fromkeys(STAGES, 0)
+    before = StageFlow.objects.filter(day__lt=start).values('stage').annotate(
+        total_entered=Sum('entered'), total_exited=Sum('exited'),
+    ).order_by()
+    for row in before:
+        counts[row['stage']] = row['total_entered'] - row['total_exited']
+
+    changes = defaultdict(list)
+    for day, stage, entered, exited in StageFlow.objects.filter(day__gte=start, day__lte=end).values_list(
+        'day', 'stage', 'entered', 'exited',
+    ):
+        changes[day].append((stage, entered - exited))
+
+    points = []
+    day = start
+    while day <= end:
+        for stage, delta in changes.get(day, ()):
+            counts[stage] = counts.get(stage, 0) + delta
+        points.append({'date': day.isoformat(), **counts})
+        day += timedelta(days=1)
+    return points
+
+
+def dwell(start, end):
+    """
+    ``{stage: {'exits', 'mean_hours'}}`` for requests that left a stage
+    from ``start`` to ``end``.
+    """
+    rows = StageFlow.objects.filter(day__gte=start, day__lte=end).values('stage').annotate(
+        total_exited=Sum('exited'), total_hours=Sum('dwell_hours'),
+    ).order_by()
+    return {
+        row['stage']: {
+            'exits': row['total_exited'],
+            'mean_hours': row['total_hours'] / row['total_exited'] if row['total_exited'] else None,
+        }
+        for row in rows
+    }
+
+
+def backfill():
+    """
+    Record a history for requests that have no transitions: created in
+    'New', then moved to their current stage when they entered it.
+    Returns the number of transitions written.
+    """
+    # Read up front: the loop adds transitions to the rows being filtered on
+    missing = list(MaintenanceRequest.objects.filter(transitions__isnull=True).values_list(
+        'pk', 'stage', 'created_at', 'stage_entered_at',
+    ))
+    written = 0
+    batch = []
+    for pk, stage, created_at, entered_at in missing:
+        entered_at = entered_at or created_at
+        if stage == 'New':
+            batch.append(StageTransition(request_id=pk, from_stage=CREATED, to_stage=stage, at=entered_at))
+        else:
+            batch.append(StageTransition(request_id=pk, from_stage=CREATED, to_stage='New', at=created_at))
+            batch.append(StageTransition(
+                request_id=pk, from_stage='New', to_stage=stage, at=entered_at,
+                dwell_hours=(entered_at - created_at).total_seconds() / 3600,
+            ))
+        if len(batch) >= 2000:
+            written += len(StageTransition.objects.bulk_create(batch))
+            batch = []
+    written += len(StageTransition.objects.bulk_create(batch))
+    return written
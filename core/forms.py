@@ -1,4 +1,6 @@
 from django import forms
+from django.contrib.auth.models import User
+from .lookups import LookupSelect
 from .models import Equipment, MaintenanceRequest, MaintenanceTeam, Technician, WorkCenter, EquipmentCategory, MaintenanceLog
 
 class EquipmentForm(forms.ModelForm):
@@ -24,11 +26,22 @@ class MaintenanceRequestForm(forms.ModelForm):
         widgets = {
             'scheduled_date': forms.DateInput(attrs={'type': 'date'}), # Using date for simplicity, can handle datetime if needed
             'instructions': forms.Textarea(attrs={'rows': 3}),
+            # Only the selected row is rendered; see core/lookups.py
+            'equipment': LookupSelect('equipment'),
+            'work_center': LookupSelect('work-centers'),
+            'assigned_to': LookupSelect('users'),
         }
         labels = {
             'assigned_to': 'Assigned Technician'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Enough for the labels and to validate the submitted keys
+        self.fields['equipment'].queryset = Equipment.objects.only('id', 'name', 'serial_number')
+        self.fields['work_center'].queryset = WorkCenter.objects.only('id', 'name', 'code')
+        self.fields['assigned_to'].queryset = User.objects.only('id', 'username')
+
     def clean(self):
         cleaned_data = super().clean()
         equipment = cleaned_data.get('equipment')
@@ -56,3 +69,13 @@ class WorkCenterForm(forms.ModelForm):
     class Meta:
         model = WorkCenter
         fields = '__all__'
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('equipment', 'Equipment'),
+        ('work_centers', 'Work Centers'),
+    ]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES)
+    file = forms.FileField(help_text="CSV or XLSX with a header row. Equipment is matched by serial_number, work centers by code.")
+    dry_run = forms.BooleanField(required=False, label="Dry run (validate only)")
@@ -0,0 +1,332 @@
+"""
+Bulk import of equipment and work centers from CSV or XLSX.
+
+Rows are streamed in chunks. Foreign keys are resolved through lookup
+maps loaded once up front, existing rows are matched by their natural
+key (``serial_number`` / ``code``) with one query per chunk, and each
+chunk is written with ``bulk_create`` / ``bulk_update`` inside its own
+transaction. A dry run performs all the work and rolls every chunk back.
+
+Column headers match the CSV export (see core/exports.py), so an export
+can be edited and re-imported.
+"""
+import csv
+import io
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import autofill, kpis, oee, rules, search, versions
+from .models import Equipment, EquipmentCategory, MaintenanceRequest, MaintenanceTeam, WorkCenter
+
+
+class ImportReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []  # (row number, message)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'errors': [{'row': row, 'message': message} for row, message in self.errors],
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+# --- Readers ---
+
+def read_csv(fileobj):
+    """
+    Yield dicts from a CSV file opened in binary or text mode.
+    """
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(fileobj)
+
+
+def read_xlsx(fileobj):
+    """
+    Yield dicts from the first sheet of an XLSX workbook (needs openpyxl).
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ValueError('XLSX import requires the openpyxl package.') from exc
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        for values in rows:
+            yield {header: value for header, value in zip(headers, values) if header}
+    finally:
+        workbook.close()
+
+
+def clean_value(value):
+    """
+    Normalise a cell: strip strings, map blanks to ''. XLSX cells may
+    already be numbers or dates, which the model fields accept as-is.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def read_rows(fileobj, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+# --- Importers ---
+
+AMBIGUOUS = object()
+
+
+def lookup_map(rows):
+    """
+    ``{name.lower(): pk}`` from ``(pk, name)`` rows. Names are matched
+    case-insensitively, so a name shared by several rows maps to AMBIGUOUS.
+    """
+    found = {}
+    for pk, name in rows:
+        found[name.lower()] = AMBIGUOUS if name.lower() in found else pk
+    return found
+
+
+class BaseImporter:
+    model = None
+    key = None
+    # column -> model field for plain values
+    columns = {}
+    required = ()
+
+    def __init__(self, dry_run=False, chunk_size=1000):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.report = ImportReport(dry_run=dry_run)
+        self.seen = set()
+
+    def load_lookups(self):
+        pass
+
+    def build(self, row):
+        """
+        Return ``(key, field values)`` for one row; raise ValidationError.
+        Blank optional cells are left out: new rows get the field default,
+        existing rows keep their value.
+        """
+        values = {}
+        for column, field_name in self.columns.items():
+            if column not in row:
+                continue
+            raw = clean_value(row[column])
+            field = self.model._meta.get_field(field_name)
+            if raw == '':
+                if column in self.required:
+                    raise ValidationError(f"'{column}' is required.")
+                if not field.null and not field.blank and not field.has_default():
+                    raise ValidationError(f"'{column}' is required.")
+                continue
+            try:
+                # clean(), not to_python(): length, choices and range too
+                values[field_name] = field.clean(raw, None)
+            except ValidationError as exc:
+                raise ValidationError(f"'{column}': {'; '.join(exc.messages)}")
+        for column in self.required:
+            if column not in row:
+                raise ValidationError(f"'{column}' is required.")
+        return values[self.key], values
+
+    def run(self, rows):
+        self.load_lookups()
+        rows = iter(rows)
+        row_number = 1  # header
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.write_chunk(chunk, row_number + 1)
+            row_number += len(chunk)
+        return self.report.finish()
+
+    def write_chunk(self, chunk, first_row):
+        parsed = []
+        for offset, row in enumerate(chunk):
+            row_number = first_row + offset
+            self.report.rows += 1
+            try:
+                key, values = self.build(row)
+            except ValidationError as exc:
+                self.report.error(row_number, '; '.join(exc.messages))
+                continue
+            if key in self.seen:
+                self.report.error(row_number, f"Duplicate {self.key} '{key}' in file.")
+                continue
+            self.seen.add(key)
+            parsed.append(values)
+        if not parsed:
+            return
+
+        update_fields = {field for values in parsed for field in values} - {self.key}
+        with transaction.atomic():
+            # The stored values of the updated fields, for rows that leave some blank
+            existing = {
+                getattr(obj, self.key): obj
+                for obj in self.model.objects.filter(**{f'{self.key}__in': [v[self.key] for v in parsed]})
+                .only(self.key, *update_fields)
+            }
+            to_create, to_update = [], []
+            for values in parsed:
+                obj = existing.get(values[self.key])
+                if obj is None:
+                    to_create.append(self.model(**values))
+                else:
+                    for field, value in values.items():
+                        setattr(obj, field, value)
+                    to_update.append(obj)
+
+            self.model.objects.bulk_create(to_create)
+            if to_update and update_fields:
+                self.model.objects.bulk_update(to_update, sorted(update_fields))
+            self.after_write(to_create, to_update, update_fields)
+            if not self.dry_run:
+                versions.bump(self.model)
+            self.report.created += len(to_create)
+            self.report.updated += len(to_update)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+    def after_write(self, created, updated, update_fields):
+        pass
+
+
+class WorkCenterImporter(BaseImporter):
+    model = WorkCenter
+    key = 'code'
+    columns = {
+        'code': 'code',
+        'name': 'name',
+        'cost_per_hour': 'cost_per_hour',
+        'efficiency': 'efficiency',
+        'oee_target': 'oee_target',
+        'planned_hours_per_day': 'planned_hours_per_day',
+    }
+    required = ('code', 'name')
+
+    def after_write(self, created, updated, update_fields):
+        # bulk_create/bulk_update bypass the model signals
+        if self.dry_run:
+            return
+        replanned = created + (updated if 'planned_hours_per_day' in update_fields else [])
+        oee.schedule(work_center_ids=[obj.pk for obj in replanned])
+
+
+class EquipmentImporter(BaseImporter):
+    model = Equipment
+    key = 'serial_number'
+    columns = {
+        'name': 'name',
+        'serial_number': 'serial_number',
+        'department': 'department',
+        'location': 'location',
+        'description': 'description',
+        'purchase_date': 'purchase_date',
+        'warranty_expiry': 'warranty_expiry',
+        'assigned_date': 'assigned_date',
+        'scrap_date': 'scrap_date',
+        'is_scrapped': 'is_scrapped',
+        'health': 'health',
+    }
+    required = ('name', 'serial_number', 'department', 'location')
+    # column -> (model field, lookup map attribute)
+    relations = {
+        'category': ('category_id', 'categories'),
+        'work_center': ('work_center_id', 'work_centers'),
+        'maintenance_team': ('maintenance_team_id', 'teams'),
+        'owner': ('owner_id', 'users'),
+    }
+
+    def load_lookups(self):
+        # One query per related table for the whole import
+        self.categories = lookup_map(EquipmentCategory.objects.values_list('pk', 'name'))
+        self.teams = lookup_map(MaintenanceTeam.objects.values_list('pk', 'name'))
+        self.work_centers = lookup_map(WorkCenter.objects.values_list('pk', 'code'))
+        self.users = lookup_map(User.objects.values_list('pk', 'username'))
+
+    def build(self, row):
+        key, values = super().build(row)
+        for column, (field_name, attr) in self.relations.items():
+            if column not in row:
+                continue
+            raw = str(clean_value(row[column]))
+            if not raw:
+                continue
+            pk = getattr(self, attr).get(raw.lower())
+            if pk is None:
+                raise ValidationError(f"Unknown {column.replace('_', ' ')} '{raw}'.")
+            if pk is AMBIGUOUS:
+                raise ValidationError(f"Ambiguous {column.replace('_', ' ')} '{raw}': several match.")
+            values[field_name] = pk
+        return key, values
+
+    def after_write(self, created, updated, update_fields):
+        # bulk_create/bulk_update bypass the model signals
+        if self.dry_run:
+            return
+        search.index_equipment(created)
+        autofill.record([obj.pk for obj in created] + [obj.pk for obj in updated])
+        if updated:
+            # Updated instances only carry the imported columns; reindex
+            # from the stored rows (requests embed the equipment name).
+            updated_ids = [obj.pk for obj in updated]
+            search.index_equipment(Equipment.objects.filter(pk__in=updated_ids))
+            if 'name' in update_fields:
+                search.index_requests(MaintenanceRequest.objects.filter(equipment_id__in=updated_ids))
+            # Category, team or scrap status may have changed
+            rules.forget(updated_ids)
+        # Only new rows: updates carry no previous value to compare health
+        # against, so re-importing a file must not count as fresh readings.
+        rules.evaluate((obj.pk, rules.HEALTH_METRIC, obj.health) for obj in created)
+        kpis.invalidate()
+
+
+IMPORTERS = {
+    'equipment': EquipmentImporter,
+    'work_centers': WorkCenterImporter,
+}
+
+
+def import_file(fileobj, filename, kind='equipment', dry_run=False, chunk_size=1000):
+    """
+    Import ``fileobj`` and return an ImportReport. Raises ValueError for
+    unreadable files.
+    """
+    importer = IMPORTERS[kind](dry_run=dry_run, chunk_size=chunk_size)
+    return importer.run(read_rows(fileobj, filename))
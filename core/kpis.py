@@ -0,0 +1,147 @@
+"""
+Dashboard KPI snapshot.
+
+The counters shown on the dashboard are computed in one aggregate pass
+per table and kept in Django's cache. Signals mark the snapshot dirty;
+the next reader gets the previous snapshot immediately while a refresh
+runs in the background (stale-while-revalidate). Only a cold cache is
+ever computed inline.
+
+While dashboards are listening on the event stream, a change also
+schedules a refresh shortly afterwards, and every refresh is pushed to
+them (see core/events.py).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import events
+from .models import Equipment, MaintenanceRequest, Technician
+
+SNAPSHOT_KEY = 'gearguard:kpi:snapshot'
+DIRTY_KEY = 'gearguard:kpi:dirty'
+LOCK_KEY = 'gearguard:kpi:lock'
+
+CLOSED_STAGES = ('Repaired', 'Scrap')
+CRITICAL_HEALTH = 30
+
+
+def max_age():
+    """
+    Seconds after which a snapshot is refreshed even without a signal
+    (overdue counts change as time passes).
+    """
+    return getattr(settings, 'GEARGUARD_KPI_MAX_AGE', 60)
+
+
+def compute():
+    now = timezone.now()
+    open_q = ~Q(stage__in=CLOSED_STAGES)
+    requests = MaintenanceRequest.objects.aggregate(
+        open_count=Count('id', filter=open_q),
+        overdue_count=Count('id', filter=open_q & Q(scheduled_date__lt=now)),
+    )
+    equipment = Equipment.objects.aggregate(
+        critical_count=Count('id', filter=Q(health__lt=CRITICAL_HEALTH)),
+    )
+    tech_count = Technician.objects.count()
+
+    total_open = requests['open_count']
+    return {
+        'critical_count': equipment['critical_count'],
+        'open_count': total_open,
+        'overdue_count': requests['overdue_count'],
+        'pending_count': total_open - requests['overdue_count'],
+        'tech_count': tech_count,
+        'computed_at': time.time(),
+    }
+
+
+def push_delay():
+    """
+    Seconds to gather changes before a refresh is pushed to dashboards.
+    """
+    return getattr(settings, 'GEARGUARD_KPI_PUSH_DELAY', 2)
+
+
+def refresh():
+    """
+    Recompute and store the snapshot. Clears the dirty flag first so that
+    changes made while computing mark the new snapshot dirty again.
+    """
+    cache.delete(DIRTY_KEY)
+    try:
+        snapshot = compute()
+        cache.set(SNAPSHOT_KEY, snapshot, None)
+    finally:
+        cache.delete(LOCK_KEY)
+    events.bus.publish(events.DASHBOARD, 'kpis', snapshot)
+    return snapshot
+
+
+def _refresh_in_background():
+    try:
+        refresh()
+    finally:
+        connection.close()
+
+
+def schedule_refresh():
+    """
+    Start a refresh unless one is already running.
+    """
+    if not cache.add(LOCK_KEY, True, 60):
+        return
+    if getattr(settings, 'GEARGUARD_KPI_ASYNC_REFRESH', True):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+    else:
+        refresh()
+
+
+def invalidate():
+    cache.set(DIRTY_KEY, True, None)
+    if events.bus.has_subscribers(events.DASHBOARD):
+        _schedule_push()
+
+
+_push_lock = threading.Lock()
+_push_timer = None
+
+
+def _schedule_push():
+    global _push_timer
+    with _push_lock:
+        if _push_timer is not None:
+            return
+        _push_timer = threading.Timer(push_delay(), _push)
+        _push_timer.daemon = True
+        _push_timer.start()
+
+
+def _push():
+    global _push_timer
+    with _push_lock:
+        _push_timer = None
+    if cache.get(DIRTY_KEY) and cache.add(LOCK_KEY, True, 60):
+        _refresh_in_background()
+
+
+def get_snapshot():
+    """
+    Return the current snapshot, scheduling a refresh if it is stale.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return refresh()
+    if cache.get(DIRTY_KEY) or time.time() - snapshot['computed_at'] > max_age():
+        schedule_refresh()
+    return snapshot
+
+
+def age(snapshot):
+    return max(0, int(time.time() - snapshot['computed_at']))
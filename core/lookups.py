@@ -0,0 +1,93 @@
+"""
+Type-ahead lookups for the foreign keys of the request form.
+
+``LookupSelect`` renders only the selected option, so the form no longer
+loads every equipment, work center and user into its ``<select>``
+elements. The page fetches matches from ``/api/lookup/<kind>/?q=...`` as
+the user types:
+
+* ``equipment`` through the full-text index (core/search.py), best first;
+* ``work-centers`` by name or code prefix;
+* ``users`` by username or name prefix, active users only.
+
+Each answer is at most ``GEARGUARD_LOOKUP_LIMIT`` rows of ``{'id',
+'text'}``, the text being what the ``<option>`` shows.
+"""
+from django import forms
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.urls import reverse
+
+from . import search
+from .models import Equipment, WorkCenter
+
+
+def limit():
+    return getattr(settings, 'GEARGUARD_LOOKUP_LIMIT', 20)
+
+
+def _equipment(query, count):
+    rows = Equipment.objects.only('id', 'name', 'serial_number')
+    if query:
+        return search.filter_ranked(rows, 'equipment', query, count)
+    return rows.order_by('name', 'id')[:count]
+
+
+def _work_centers(query, count):
+    rows = WorkCenter.objects.only('id', 'name', 'code')
+    if query:
+        rows = rows.filter(Q(name__istartswith=query) | Q(code__istartswith=query))
+    return rows.order_by('name', 'id')[:count]
+
+
+def _users(query, count):
+    rows = User.objects.filter(is_active=True).only('id', 'username', 'first_name', 'last_name')
+    if query:
+        rows = rows.filter(
+            Q(username__istartswith=query) | Q(first_name__istartswith=query) | Q(last_name__istartswith=query)
+        )
+    return rows.order_by('username')[:count]
+
+
+KINDS = {
+    'equipment': _equipment,
+    'work-centers': _work_centers,
+    'users': _users,
+}
+
+
+def lookup(kind, query, count=None):
+    """
+    ``[{'id', 'text'}]`` of the ``kind`` rows matching ``query``; raises
+    KeyError for an unknown kind.
+    """
+    rows = KINDS[kind]((query or '').strip(), count or limit())
+    return [{'id': row.pk, 'text': str(row)} for row in rows]
+
+
+class LookupSelect(forms.Select):
+    """
+    A ``<select>`` for a ModelChoiceField that renders the empty choice and
+    the selected value only. Its ``data-lookup`` URL serves the others.
+    """
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-lookup'] = reverse('lookup', args=[self.kind])
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        # Only primary keys: a bound form may carry anything
+        chosen = [pk for pk in value if str(pk).isdigit()]
+        choices = [('', field.empty_label)] if field.empty_label is not None else []
+        if chosen:
+            choices += [self.choices.choice(row) for row in self.choices.queryset.filter(pk__in=chosen)]
+        return [
+            (None, [self.create_option(name, option, label, str(option) in value, index, attrs=attrs)], index)
+            for index, (option, label) in enumerate(choices)
+        ]
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import resource
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core import events
+from core.bench import scratch_database
+
+
+class Command(BaseCommand):
+    help = "Open many idle SSE streams on the ASGI app and measure threads, memory and fan-out latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--events', type=int, default=50, help='Events published while all streams are open.')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            user = User.objects.create_user('bench')
+            url = urlsplit(events.stream_url(user, events.BOARD, events.DASHBOARD))
+            results = asyncio.run(self.run(url, options['connections'], options['events']))
+
+        self.stdout.write(f"{results['connected']} streams open")
+        self.stdout.write(f"  threads        {results['threads_before']} before, {results['threads_after']} after")
+        self.stdout.write(f"  memory         {results['kb_per_stream']:.1f} KiB per stream (max RSS growth)")
+        self.stdout.write(
+            f"  fan-out        {results['deliveries']} deliveries, p50 {results['p50']:.2f} ms, "
+            f"p99 {results['p99']:.2f} ms, max {results['max']:.2f} ms"
+        )
+
+    async def run(self, url, connections, count):
+        from gearguard.asgi import application as app
+        latencies = []
+        connected = 0
+        all_connected = asyncio.Event()
+        disconnect = asyncio.Event()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(), 'root_path': '',
+            'query_string': url.query.encode(), 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+
+        async def stream():
+            nonlocal connected
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal connected
+                if message['type'] != 'http.response.body':
+                    return
+                chunk = message.get('body', b'')
+                if chunk.startswith(b'retry:'):
+                    connected += 1
+                    if connected == connections:
+                        all_connected.set()
+                elif chunk.startswith(b'id: '):
+                    sent = json.loads(chunk.split(b'data: ', 1)[1])['sent']
+                    latencies.append((time.perf_counter() - sent) * 1000)
+
+            await app(dict(scope), receive, send)
+
+        threads_before = threading.active_count()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tasks = [asyncio.create_task(stream()) for _ in range(connections)]
+        await asyncio.wait_for(all_connected.wait(), 120)
+        threads_after = threading.active_count()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        def publish():
+            # From a worker thread, like a sync view or signal would
+            for number in range(count):
+                events.bus.publish(events.BOARD, 'card', {'id': number, 'stage': 'New', 'sent': time.perf_counter()})
+                time.sleep(0.01)
+
+        await asyncio.to_thread(publish)
+        deadline = time.monotonic() + 10
+        while len(latencies) < connections * count and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        latencies.sort()
+        return {
+            'connected': connected,
+            'threads_before': threads_before,
+            'threads_after': threads_after,
+            'kb_per_stream': max(0, rss_after - rss_before) / connections,
+            'deliveries': len(latencies),
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p99': latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+            'max': latencies[-1] if latencies else 0.0,
+        }
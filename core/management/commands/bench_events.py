@@ -0,0 +1,64 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.bench import measure, scratch_database
+from core.models import MaintenanceRequest
+
+
+class Command(BaseCommand):
+    help = "Benchmark /api/events/ for a one-month window as the request table grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help='Comma-separated table sizes to measure at.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--per-day', type=int, default=5,
+                            help='Scheduled jobs per day; history grows backwards as rows are added.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        rng = random.Random(42)
+
+        with scratch_database():
+            user = User.objects.create_user('bench')
+            per_day = options['per_day']
+            horizon = timezone.now() + timedelta(days=60)
+            stages = [code for code, _ in MaintenanceRequest.STAGE_CHOICES]
+            priorities = [code for code, _ in MaintenanceRequest.PRIORITY_CHOICES]
+
+            window_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            window_end = window_start + timedelta(days=42)
+            params = {'start': window_start.isoformat(), 'end': window_end.isoformat()}
+            client = Client()
+            url = reverse('request_events')
+
+            self.stdout.write(f"{'rows':>10} {'events':>8} {'p50 ms':>9} {'p99 ms':>9}")
+            total = 0
+            for size in sizes:
+                # Keep density constant so the visible window always holds the
+                # same number of events: only the amount of history changes.
+                newest = total * 24 // per_day
+                oldest = max(newest + 1, size * 24 // per_day)
+                batch = [
+                    MaintenanceRequest(
+                        subject=f'Preventive check #{total + i}',
+                        request_type='Preventive',
+                        stage=rng.choice(stages),
+                        priority=rng.choice(priorities),
+                        scheduled_date=horizon - timedelta(hours=rng.randrange(newest, oldest)),
+                        created_by=user,
+                    )
+                    for i in range(size - total)
+                ]
+                MaintenanceRequest.objects.bulk_create(batch, batch_size=2000)
+                total = size
+
+                events = len(client.get(url, params).json())
+                stats = measure(lambda: client.get(url, params), repeat=options['repeat'])
+                self.stdout.write(f"{size:>10} {events:>8} {stats['p50']:>9.2f} {stats['p99']:>9.2f}")
@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core import rules
+from core.bench import measure, scratch_database
+from core.models import Equipment, EquipmentCategory, HealthRule, MaintenanceRequest
+
+
+class Command(BaseCommand):
+    help = "Benchmark health rule evaluation throughput with flapping sensors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--equipment', type=int, default=5000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--updates', type=int, default=200000)
+        parser.add_argument('--batch', type=int, default=1000,
+                            help='Values evaluated (and flushed) per call.')
+        parser.add_argument('--flapping', type=float, default=0.02,
+                            help='Share of equipment whose sensor oscillates around the threshold.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        with scratch_database():
+            user = User.objects.create_user('bench')
+            categories = EquipmentCategory.objects.bulk_create(
+                EquipmentCategory(name=f'Category {i}') for i in range(options['categories'])
+            )
+            equipment = Equipment.objects.bulk_create(
+                Equipment(
+                    name=f'Asset {i}', serial_number=f'B-{i}', department='Plant', location='Floor',
+                    category=categories[i % len(categories)],
+                )
+                for i in range(options['equipment'])
+            )
+            for category in categories:
+                HealthRule.objects.create(
+                    name=f'{category.name} overheating', category=category, metric='temperature',
+                    comparison='above', threshold=90, clear_threshold=80, trigger_after=3, created_by=user,
+                )
+            HealthRule.objects.create(
+                name='Vibration', metric='vibration', comparison='above', threshold=7.0,
+                clear_threshold=5.0, trigger_after=5, created_by=user,
+            )
+
+            ids = [e.pk for e in equipment]
+            flapping = set(rng.sample(ids, int(len(ids) * options['flapping'])))
+
+            def reading():
+                pk = rng.choice(ids)
+                if rng.random() < 0.5:
+                    value = rng.uniform(75, 105) if pk in flapping else rng.uniform(40, 85)
+                    return pk, 'temperature', value
+                value = rng.uniform(4, 10) if pk in flapping else rng.uniform(0.5, 4.5)
+                return pk, 'vibration', value
+
+            batch_size = options['batch']
+            batches = [[reading() for _ in range(batch_size)] for _ in range(options['updates'] // batch_size)]
+            queue = iter(batches)
+
+            rules.clear()
+            rules.evaluate(batches[0])  # warm the rule and equipment caches
+            started = time.perf_counter()
+            stats = measure(lambda: rules.evaluate(next(queue)), repeat=len(batches))
+            elapsed = time.perf_counter() - started
+
+            opened = MaintenanceRequest.objects.filter(rule__isnull=False).count()
+            self.stdout.write(
+                f"{len(batches) * batch_size} updates in {elapsed:.2f}s "
+                f"({len(batches) * batch_size / elapsed:,.0f}/s), batch of {batch_size}: "
+                f"p50 {stats['p50']:.2f} ms, p99 {stats['p99']:.2f} ms"
+            )
+            self.stdout.write(
+                f"{len(flapping)} flapping sensors opened {opened} requests "
+                f"(at most one open per equipment and rule)"
+            )
@@ -0,0 +1,109 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+
+from core import board, seed, sqlite
+from core.bench import scratch_database
+from core.models import MaintenanceLog, MaintenanceRequest
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent Kanban moves and log posts on SQLite, default settings vs. the tuning profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers.')
+        parser.add_argument('--ops', type=int, default=200, help='Writes per thread.')
+        parser.add_argument('--requests', type=int, default=2000, help='Maintenance requests to seed.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark needs the SQLite backend.')
+
+        self.stdout.write(f"{options['threads']} threads x {options['ops']} writes (stage moves and log posts)")
+        self.stdout.write(f"  {'profile':<10} {'writes/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'locked':>8}")
+        results = {}
+        for label, tuned in (('default', False), ('tuned', True)):
+            with tempfile.TemporaryDirectory() as tmp, override_settings(GEARGUARD_SQLITE_TUNING=tuned):
+                with scratch_database(name=os.path.join(tmp, 'bench.sqlite3')):
+                    seed.seed_plant(equipment=options['requests'] // 10, requests=options['requests'],
+                                    technicians_per_team=2, index=True)
+                    results[label] = self.run(options['threads'], options['ops'])
+            stats = results[label]
+            self.stdout.write(
+                f"  {label:<10} {stats['throughput']:>10.0f} {stats['p50']:>9.2f} "
+                f"{stats['p99']:>9.2f} {stats['locked']:>8}"
+            )
+
+        if results['default']['throughput']:
+            speedup = results['tuned']['throughput'] / results['default']['throughput']
+            self.stdout.write(self.style.SUCCESS(f"Tuned profile: {speedup:.1f}x write throughput"))
+
+    def run(self, threads, ops):
+        # Connections are per thread; close the main one so the workers
+        # do not contend with an open read transaction
+        request_ids = list(MaintenanceRequest.objects.values_list('pk', flat=True))
+        user_id = User.objects.values_list('pk', flat=True).first()
+        connection.close()
+
+        samples, locked = [], []
+        start = threading.Barrier(threads + 1)
+
+        def worker(number):
+            rng = random.Random(number)
+            start.wait()
+            try:
+                for _ in range(ops):
+                    started = time.perf_counter()
+                    try:
+                        self.write(rng, request_ids, user_id)
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        locked.append(1)
+                    else:
+                        samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+        for thread in workers:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        samples.sort()
+        return {
+            'throughput': len(samples) / elapsed,
+            'p50': statistics.median(samples) if samples else 0.0,
+            'p99': samples[int(0.99 * (len(samples) - 1))] if samples else 0.0,
+            'locked': len(locked),
+        }
+
+    def write(self, rng, request_ids, user_id):
+        pk = rng.choice(request_ids)
+        kind = rng.random()
+        if kind < 0.4:
+            # bulk_update_request_stage
+            board.apply_moves([{'id': pk, 'stage': rng.choice(['New', 'In Progress'])}])
+        elif kind < 0.6:
+            # update_request_stage
+            with sqlite.serialized_write():
+                req = MaintenanceRequest.objects.get(pk=pk)
+                req.stage = rng.choice(['New', 'In Progress'])
+                req.save()
+        else:
+            # request_update, log submission
+            req = MaintenanceRequest.objects.get(pk=pk)
+            with sqlite.serialized_write():
+                MaintenanceLog.objects.create(request=req, comment='Checked on site.', created_by_id=user_id)
@@ -0,0 +1,180 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import seed
+from core.bench import measure, scratch_database
+from core.models import Equipment, MaintenanceRequest
+
+
+def url_specs(equipment_id, request_id):
+    """
+    ``[(url name, method, path, data)]`` covering every route in core/urls.py.
+    """
+    board_move = json.dumps({'moves': [{'id': request_id, 'stage': 'In Progress'}]})
+    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month = {'start': month_start.isoformat(), 'end': (month_start + timedelta(days=42)).isoformat()}
+    return [
+        ('dashboard', 'get', reverse('dashboard'), None),
+        ('equipment_list', 'get', reverse('equipment_list'), None),
+        ('equipment_list (sort by health)', 'get', reverse('equipment_list'), {'sort': '-health'}),
+        ('equipment_list (search)', 'get', reverse('equipment_list'), {'q': 'pump'}),
+        ('export_data', 'get', reverse('export_data', args=['equipment', 'csv']), None),
+        ('equipment_create', 'get', reverse('equipment_create'), None),
+        ('equipment_import', 'get', reverse('equipment_import'), None),
+        ('equipment_detail', 'get', reverse('equipment_detail', args=[equipment_id]), None),
+        ('request_list', 'get', reverse('request_list'), None),
+        ('request_list (search)', 'get', reverse('request_list'), {'q': 'oil leak'}),
+        ('request_create', 'get', reverse('request_create'), None),
+        ('request_update', 'get', reverse('request_update', args=[request_id]), None),
+        ('request_board_column', 'get', reverse('request_board_column'), {'stage': 'Repaired'}),
+        ('bulk_update_request_stage', 'post', reverse('bulk_update_request_stage'), board_move),
+        ('update_request_stage', 'post', reverse('update_request_stage', args=[request_id]), json.dumps({'stage': 'New'})),
+        ('request_logs', 'get', reverse('request_logs', args=[request_id]), None),
+        ('lookup (equipment)', 'get', reverse('lookup', args=['equipment']), {'q': 'pump'}),
+        ('lookup (users)', 'get', reverse('lookup', args=['users']), {'q': 'tech'}),
+        ('get_equipment_details', 'get', reverse('get_equipment_details', args=[equipment_id]), None),
+        ('equipment_details_batch', 'get', reverse('equipment_details_batch'),
+         {'ids': ','.join(str(equipment_id + n) for n in range(50))}),
+        ('equipment_snapshot', 'get', reverse('equipment_snapshot'), None),
+        ('equipment_snapshot (delta)', 'get', reverse('equipment_snapshot'), {'since': '0'}),
+        ('work_center_list', 'get', reverse('work_center_list'), None),
+        ('work_center_create', 'get', reverse('work_center_create'), None),
+        ('category_list', 'get', reverse('category_list'), None),
+        ('category_create', 'get', reverse('category_create'), None),
+        ('calendar', 'get', reverse('calendar'), None),
+        ('request_events', 'get', reverse('request_events'), month),
+        ('request_flow', 'get', reverse('request_flow'), None),
+        ('ingest_telemetry', 'post', reverse('ingest_telemetry'), 'telemetry'),
+        ('metrics', 'get', reverse('metrics'), None),
+        ('task_metrics', 'get', reverse('task_metrics'), None),
+        ('api_list', 'get', reverse('api_list', args=['requests']), None),
+        ('api_list (sparse, filtered)', 'get', reverse('api_list', args=['requests']),
+         {'fields': 'id,stage,updated_at', 'stage': 'New'}),
+        ('api_detail', 'get', reverse('api_detail', args=['requests', request_id]), None),
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark every URL in core/urls.py against synthetic plants of growing size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated request counts to measure at (equipment is a tenth).')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--only', default='', help='Only URLs whose name contains this text.')
+        parser.add_argument('--output', default='bench_urls.json', help='Where to write the JSON results.')
+        parser.add_argument('--compare', help='Earlier results file to print p50 deltas against.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as fh:
+                    baseline = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        results = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': options['repeat'],
+            'sizes': {},
+        }
+
+        with scratch_database(), self.settings_for_bench():
+            results['database'] = connection.vendor
+            user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+            client = Client()
+            client.force_login(user)
+
+            seeded = 0
+            for size in sizes:
+                started = time.perf_counter()
+                seed.seed_plant(equipment=(size - seeded) // 10, requests=size - seeded, seed=size)
+                seeded = size
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{size} requests (seeded in {time.perf_counter() - started:.1f}s)"
+                ))
+                results['sizes'][str(size)] = self.run_size(client, size, options, baseline)
+
+        with open(options['output'], 'w') as fh:
+            json.dump(results, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def settings_for_bench(self):
+        # Budgets would raise under strict mode; synchronous KPI refreshes
+        # keep the measurements deterministic.
+        return override_settings(
+            GEARGUARD_QUERY_BUDGET_STRICT=False,
+            GEARGUARD_KPI_ASYNC_REFRESH=False,
+            GEARGUARD_TELEMETRY_TOKEN='bench',
+        )
+
+    def run_size(self, client, size, options, baseline):
+        equipment_id = Equipment.objects.order_by('pk').values_list('pk', flat=True).first()
+        request_id = MaintenanceRequest.objects.filter(stage='New').order_by('-pk').values_list('pk', flat=True).first()
+        serial = Equipment.objects.filter(pk=equipment_id).values_list('serial_number', flat=True).first()
+        previous = (baseline or {}).get('sizes', {}).get(str(size), {})
+
+        self.stdout.write(f"  {'url':<42} {'status':>6} {'queries':>8} {'p50 ms':>9} {'p99 ms':>9} {'vs base':>8}")
+        rows = {}
+        for name, method, path, data in url_specs(equipment_id, request_id):
+            if options['only'] not in name:
+                continue
+            call = self.request_for(client, method, path, data, serial)
+            queries = []
+            with connection.execute_wrapper(lambda execute, *args: queries.append(1) or execute(*args)):
+                response = call()
+            stats = measure(call, repeat=options['repeat'])
+            rows[name] = {
+                'status': response.status_code,
+                'queries': len(queries),
+                **{key: round(value, 3) for key, value in stats.items()},
+            }
+            delta = ''
+            if name in previous and previous[name]['p50']:
+                delta = f"{(stats['p50'] / previous[name]['p50'] - 1) * 100:+.0f}%"
+            self.stdout.write(
+                f"  {name:<42} {response.status_code:>6} {len(queries):>8} "
+                f"{stats['p50']:>9.2f} {stats['p99']:>9.2f} {delta:>8}"
+            )
+        return rows
+
+    def request_for(self, client, method, path, data, serial):
+        if data == 'telemetry':
+            body = '\n'.join(json.dumps({'serial': serial, 'metric': 'temperature', 'value': 60}) for _ in range(100))
+            return lambda: client.post(path, body, content_type='application/x-ndjson', HTTP_AUTHORIZATION='Bearer bench')
+        if method == 'post':
+            return lambda: client.post(path, data, content_type='application/json')
+
+        def get():
+            response = client.get(path, data)
+            if response.streaming:
+                # Exports do their work while streaming
+                b''.join(response.streaming_content)
+            return response
+        return get
@@ -0,0 +1,106 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from core import board, kpis
+from core.models import Equipment, MaintenanceRequest, TelemetryReading, TelemetryRollup
+
+# Plan lines that mean a table is read in full or sorted without an index
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (core_\w+)(?!\w| USING)|USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'Seq Scan on (core_\w+)'),
+}
+
+
+def hot_queries():
+    """
+    ``[(label, queryset)]`` mirroring the queries issued by the views,
+    the board and the background jobs.
+    """
+    now = timezone.now()
+    open_q = ~Q(stage__in=kpis.CLOSED_STAGES)
+    requests = MaintenanceRequest.objects.all()
+    equipment = Equipment.objects.select_related('category', 'work_center', 'maintenance_team')
+    month = (now, now + timedelta(days=42))
+
+    queries = [
+        ('dashboard: open requests', requests.filter(open_q).values('id')),
+        ('dashboard: overdue requests', requests.filter(open_q, scheduled_date__lt=now).values('id')),
+        ('dashboard: critical equipment', Equipment.objects.filter(health__lt=kpis.CRITICAL_HEALTH).values('id')),
+        ('dashboard: recent activity', requests.select_related('equipment').order_by('-updated_at')[:5]),
+    ]
+    for field in ('name', 'serial_number', 'department', 'location', 'health'):
+        queries.append((f'equipment list: sort by {field}', equipment.order_by(field, 'pk')[:50]))
+    queries += [
+        ('equipment list: next page by health', equipment.filter(
+            Q(health__gt=50) | Q(health=50, pk__gt=100)).order_by('health', 'pk')[:50]),
+        ('equipment detail: request count', requests.filter(equipment_id=1).values('id')),
+        ('board: column page', requests.filter(stage='New').order_by(*board.CARD_ORDERING)[:21]),
+        ('board: closed column window', requests.filter(
+            stage='Repaired', updated_at__gte=now - timedelta(days=30)).order_by(*board.CARD_ORDERING)[:21]),
+        ('calendar: month window', requests.filter(
+            scheduled_date__gte=month[0], scheduled_date__lt=month[1]).order_by('scheduled_date')),
+        ('calendar: month window by priority', requests.filter(
+            scheduled_date__gte=month[0], scheduled_date__lt=month[1], priority__in=['High', 'Critical'])),
+        ('assignment: open load per technician', requests.filter(open_q, assigned_to__in=[1, 2, 3])
+            .values('assigned_to', 'duration')),
+        ('scheduler: category targets', Equipment.objects.filter(is_scrapped=False, category_id=1).values('id')),
+        ('scheduler: existing occurrences', requests.filter(
+            plan_id=1, scheduled_date__gte=month[0], scheduled_date__lte=month[1]).values('equipment_id')),
+        ('rules: open alerts', requests.filter(rule_id__in=[1], equipment_id__in=[1, 2]).filter(open_q)),
+        ('telemetry: rollup window', TelemetryReading.objects.filter(recorded_at__gte=now - timedelta(hours=2))),
+        ('telemetry: equipment history', TelemetryReading.objects.filter(
+            equipment_id=1, metric='health', recorded_at__gte=now - timedelta(days=1))),
+        ('telemetry: hourly buckets', TelemetryRollup.objects.filter(
+            bucket='hour', bucket_start__gte=now - timedelta(days=7))),
+    ]
+    return queries
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN plans for the hot queries (SQLite and PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Run EXPLAIN ANALYZE (PostgreSQL only).')
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if a plan scans a core table or sorts without an index.')
+        parser.add_argument('--filter', default='',
+                            help='Only explain queries whose label contains this text.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN:
+            self.stderr.write(f"Plans are only checked on SQLite and PostgreSQL, not {vendor}.")
+        explain_options = {}
+        if options['analyze'] and vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        if options['check'] and vendor == 'postgresql':
+            # Small tables make sequential scans cheapest; ask whether an
+            # index could be used at all.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        regressions = []
+        for label, queryset in hot_queries():
+            if options['filter'] not in label:
+                continue
+            plan = queryset.explain(**explain_options)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write('  ' + plan.replace('\n', '\n  '))
+            pattern = FULL_SCAN.get(vendor)
+            if pattern and pattern.search(plan):
+                regressions.append(label)
+
+        if options['check'] and vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+        if options['check'] and regressions:
+            raise CommandError('Full scans or unindexed sorts in: ' + ', '.join(regressions))
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS('No full scans in the hot queries.'))
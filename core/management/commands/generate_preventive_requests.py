@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import scheduler
+
+
+class Command(BaseCommand):
+    help = "Materialize preventive maintenance plans into requests over a rolling horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--every', type=int, default=0, metavar='SECONDS',
+                            help='Keep running as a worker, generating every SECONDS.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            stats = scheduler.generate(horizon_days=options['horizon_days'], batch_size=options['batch_size'])
+            self.stdout.write(
+                f"{stats['plans']} plans: {stats['created']} requests created, "
+                f"{stats['existing']} already scheduled ({time.perf_counter() - started:.2f}s)"
+            )
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importers
+
+
+class Command(BaseCommand):
+    help = "Bulk import equipment or work centers from a CSV or XLSX file (upsert by serial number / code)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=sorted(importers.IMPORTERS), default='equipment')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and roll back every chunk.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = importers.import_file(
+                    fileobj, options['path'], kind=options['kind'],
+                    dry_run=options['dry_run'], chunk_size=options['chunk_size'],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report.as_dict(), indent=2))
+            return
+
+        for row, message in report.errors:
+            self.stderr.write(f"Row {row}: {message}")
+        prefix = '[dry run] ' if report.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report.rows} rows: {report.created} created, {report.updated} updated, "
+            f"{len(report.errors)} errors in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s)"
+        ))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import telemetry
+
+
+class Command(BaseCommand):
+    help = "Ingest NDJSON telemetry readings from a file, optionally tailing it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--follow', action='store_true', help='Keep reading lines appended to the file.')
+        parser.add_argument('--from-end', action='store_true', help='Skip existing content (with --follow).')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds between flushes while following.')
+
+    def handle(self, *args, **options):
+        size = options['batch_size'] or telemetry.batch_size()
+        totals = {'accepted': 0, 'rejected': 0}
+
+        with open(options['path']) as stream:
+            if options['from_end']:
+                stream.seek(0, 2)
+            lines = []
+            last_flush = time.monotonic()
+            partial = ''
+            while True:
+                line = stream.readline()
+                if line and not line.endswith('\n') and options['follow']:
+                    # Writer has not finished this line yet
+                    partial += line
+                    line = ''
+                elif line:
+                    line, partial = partial + line, ''
+                    if line.strip():
+                        lines.append(line)
+
+                idle = not line
+                if len(lines) >= size or (lines and idle and (
+                        not options['follow'] or time.monotonic() - last_flush >= options['interval'])):
+                    self.flush(lines, totals)
+                    lines = []
+                    last_flush = time.monotonic()
+
+                if idle:
+                    if not options['follow']:
+                        break
+                    time.sleep(min(options['interval'], 0.2))
+
+        self.stdout.write(self.style.SUCCESS(f"{totals['accepted']} readings accepted, {totals['rejected']} rejected."))
+
+    def flush(self, lines, totals):
+        # Line by line, so one malformed line does not drop the batch
+        records, line_numbers = [], []
+        for number, line in enumerate(lines, 1):
+            try:
+                parsed = telemetry.parse_payload(line)
+            except ValueError as exc:
+                self.stderr.write(f"Line {number} of batch: {exc}")
+                totals['rejected'] += 1
+                continue
+            records += parsed
+            line_numbers += [number] * len(parsed)
+        if not records:
+            return
+        result = telemetry.ingest(records)
+        totals['accepted'] += result['accepted']
+        totals['rejected'] += result['rejected']
+        for index, message in result['errors']:
+            self.stderr.write(f"Line {line_numbers[index]} of batch: {message}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core import assignment
+
+
+class Command(BaseCommand):
+    help = "Assign the open request backlog to the least-loaded eligible technicians."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--include-assigned', action='store_true',
+                            help="Also redistribute requests still in 'New' that already have a technician.")
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = assignment.rebalance(
+            include_assigned=options['include_assigned'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{count} requests (re)assigned."))
+        for row in assignment.get_index().utilization():
+            self.stdout.write(f"  {row['name']:<30} {row['open']:>5} open {row['hours']:>8.1f}h {row['utilization']:>4}%")
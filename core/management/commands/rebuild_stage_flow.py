@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import flow
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily stage flow aggregates from the stage transitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help="First record a history for requests that have no transitions.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['backfill']:
+            self.stdout.write(f"Backfilled {flow.backfill()} transitions.")
+        rows = flow.refresh()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} stage flow rows in {elapsed:.1f}s."))
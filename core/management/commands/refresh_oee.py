@@ -0,0 +1,27 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import oee
+
+
+class Command(BaseCommand):
+    help = "Recompute work center OEE buckets (see core/oee.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=0,
+                            help='Only recompute the periods covering the last DAYS days (default: all history).')
+        parser.add_argument('--every', type=int, default=0, metavar='SECONDS',
+                            help='Keep running as a worker, refreshing every SECONDS.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            since = timezone.localdate() - timedelta(days=options['days']) if options['days'] else None
+            written = oee.refresh(since=since)
+            self.stdout.write(f"Wrote {written} OEE buckets ({time.perf_counter() - started:.2f}s)")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import reliability
+
+
+class Command(BaseCommand):
+    help = "Recompute the MTBF/MTTR and maintenance cost summaries of all equipment, categories and work centers."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = reliability.refresh()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {counts['equipment']} equipment, {counts['category']} category and "
+            f"{counts['work_center']} work center summaries in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import telemetry
+
+
+class Command(BaseCommand):
+    help = "Roll telemetry up into minute/hour/day buckets, update equipment health and prune old data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, metavar='SECONDS',
+                            help='Keep running as a worker, rolling up every SECONDS.')
+        parser.add_argument('--no-prune', action='store_true', help='Skip retention pruning.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            written = telemetry.rollup()
+            summary = ', '.join(f"{count} {bucket}" for bucket, count in written.items())
+            if not options['no_prune']:
+                deleted = telemetry.prune()
+                summary += '; pruned ' + ', '.join(f"{count} {level}" for level, count in deleted.items())
+            self.stdout.write(f"Rolled up {summary} ({time.perf_counter() - started:.2f}s)")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import autofill, tasks
+
+# Seconds between pruning finished tasks and old equipment changes
+PRUNE_EVERY = 3600
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (see core/tasks.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the tasks that are due, then exit.')
+        parser.add_argument('--batch', type=int, default=10, help='Tasks claimed per round.')
+        parser.add_argument('--sleep', type=float, default=1.0, metavar='SECONDS',
+                            help='Pause when the queue is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        pruned_at = 0.0
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() - pruned_at > PRUNE_EVERY:
+                    pruned = tasks.prune()
+                    changes = autofill.prune()
+                    pruned_at = time.monotonic()
+                    if (pruned or changes) and options['verbosity'] > 1:
+                        self.stdout.write(f"Pruned {pruned} finished tasks and {changes} equipment changes")
+                ran = tasks.run_pending(options['batch'])
+                total += ran
+                if ran:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Ran {total} tasks")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import seed
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic plant: equipment, teams, technicians, requests and logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--equipment', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--logs-per-request', type=float, default=0.5)
+        parser.add_argument('--technicians-per-team', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip rebuilding the search index (run rebuild_search_index later).')
+
+    def handle(self, *args, **options):
+        counts = seed.seed_plant(
+            equipment=options['equipment'],
+            requests=options['requests'],
+            logs_per_request=options['logs_per_request'],
+            technicians_per_team=options['technicians_per_team'],
+            seed=options['seed'],
+            index=not options['no_index'],
+            progress=self.stdout.write,
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
@@ -0,0 +1,207 @@
+"""
+Per-view request metrics.
+
+``core.middleware.MetricsMiddleware`` records, for every request, the
+number of SQL queries, the time spent in the database and rendering
+templates, and the total latency, tagged by URL name. Totals are kept per
+process in ``registry`` and served in the Prometheus text format at
+/metrics/; every request is also logged as one JSON line on the
+``gearguard.metrics`` logger.
+
+Views listed in ``GEARGUARD_QUERY_BUDGETS`` have a query budget. Going
+over it logs a warning, or raises ``QueryBudgetExceeded`` when
+``GEARGUARD_QUERY_BUDGET_STRICT`` is on (``gearguard.test_runner``
+turns it on), so an N+1 fails the test that triggers it.
+
+Streaming responses (exports) are measured up to the first byte.
+"""
+import contextvars
+import functools
+import threading
+import time
+
+from django.conf import settings
+from django.template.backends.django import Template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNRESOLVED = 'unresolved'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+_current = contextvars.ContextVar('gearguard_request_stats', default=None)
+
+
+def start():
+    """
+    Begin collecting for the current request. Returns ``(stats, token)``.
+    """
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    ``connection.execute_wrapper`` hook: count and time queries.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_counter(connection):
+    """
+    Add ``record_query`` to ``connection`` for good (core/signals.py does
+    it as each connection opens). Connections belong to one thread, and
+    the async ORM queries through a worker thread's own connection, so a
+    wrapper added around the request would not see those queries.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """
+    Time top-level template renders by wrapping the Django backend's
+    Template.render once per process (includes are part of their parent).
+    """
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None or stats.rendering:
+            return original(self, context, request)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.rendering = False
+            stats.template_time += time.perf_counter() - started
+
+    Template.render = render
+    _template_timer_installed = True
+
+
+def budget_for(view):
+    return getattr(settings, 'GEARGUARD_QUERY_BUDGETS', {}).get(view)
+
+
+def strict_budgets():
+    return getattr(settings, 'GEARGUARD_QUERY_BUDGET_STRICT', False)
+
+
+# --- Registry ---
+
+class ViewTotals:
+    __slots__ = ('requests', 'duration', 'buckets', 'queries', 'db_time', 'template_time', 'over_budget')
+
+    def __init__(self):
+        self.requests = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.over_budget = 0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}  # (view, method, status) -> ViewTotals
+
+    def record(self, view, method, status, stats, duration, over_budget=False):
+        with self.lock:
+            totals = self.totals.get((view, method, status))
+            if totals is None:
+                totals = self.totals[(view, method, status)] = ViewTotals()
+            totals.requests += 1
+            totals.duration += duration
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    totals.buckets[position] += 1
+            totals.queries += stats.queries
+            totals.db_time += stats.db_time
+            totals.template_time += stats.template_time
+            totals.over_budget += over_budget
+
+    def reset(self):
+        with self.lock:
+            self.totals = {}
+
+    def render(self):
+        """
+        Return all totals in the Prometheus text exposition format.
+        """
+        series = {
+            'gearguard_requests_total': ('counter', 'Requests handled.', []),
+            'gearguard_request_duration_seconds': ('histogram', 'Request latency.', []),
+            'gearguard_db_queries_total': ('counter', 'SQL queries executed.', []),
+            'gearguard_db_duration_seconds_total': ('counter', 'Time spent in SQL queries.', []),
+            'gearguard_template_duration_seconds_total': ('counter', 'Time spent rendering templates.', []),
+            'gearguard_query_budget_exceeded_total': ('counter', 'Requests over their view query budget.', []),
+        }
+        with self.lock:
+            items = sorted(self.totals.items())
+            self._collect(items, series)
+
+        lines = []
+        for name, (kind, help_text, samples) in series.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{sample}' for sample in samples)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _collect(items, series):
+        for (view, method, status), totals in items:
+            labels = f'view="{_escape(view)}",method="{method}",status="{status}"'
+            series['gearguard_requests_total'][2].append(f'{{{labels}}} {totals.requests}')
+            histogram = series['gearguard_request_duration_seconds'][2]
+            for bound, count in zip(LATENCY_BUCKETS, totals.buckets):
+                histogram.append(f'_bucket{{{labels},le="{bound}"}} {count}')
+            histogram.append(f'_bucket{{{labels},le="+Inf"}} {totals.requests}')
+            histogram.append(f'_sum{{{labels}}} {totals.duration:.6f}')
+            histogram.append(f'_count{{{labels}}} {totals.requests}')
+            series['gearguard_db_queries_total'][2].append(f'{{{labels}}} {totals.queries}')
+            series['gearguard_db_duration_seconds_total'][2].append(f'{{{labels}}} {totals.db_time:.6f}')
+            series['gearguard_template_duration_seconds_total'][2].append(f'{{{labels}}} {totals.template_time:.6f}')
+            series['gearguard_query_budget_exceeded_total'][2].append(f'{{{labels}}} {totals.over_budget}')
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = Registry()
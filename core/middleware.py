@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, routers
+
+logger = logging.getLogger('gearguard.metrics')
+
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class MetricsMiddleware:
+    """
+    Record query count, DB time, template time and latency per request,
+    tagged by URL name (see core/metrics.py). Place it first in
+    MIDDLEWARE so the latency covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'GEARGUARD_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        metrics.install_template_timer()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        view = (match.view_name if match else '') or metrics.UNRESOLVED
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        budget = metrics.budget_for(view)
+        over_budget = budget is not None and stats.queries > budget
+        metrics.registry.record(view, method, str(response.status_code), stats, duration, over_budget)
+
+        logger.info(json.dumps({
+            'view': view,
+            'method': method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+        }))
+        if over_budget:
+            message = f"{view} ran {stats.queries} queries (budget {budget}) for {request.method} {request.path}"
+            if metrics.strict_budgets():
+                raise metrics.QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let GETs to the views in ``GEARGUARD_REPLICA_VIEWS`` read from a
+    replica (see core/routers.py). After a write the client gets a short
+    pin cookie, so it reads its own writes from the primary until the
+    replicas have caught up.
+    """
+    cookie_name = 'gg_pin_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = routers.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset(token)
+        return self.pin(request, response)
+
+    def pin(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and routers.replicas():
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=getattr(settings, 'GEARGUARD_REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not routers.replicas() or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.COOKIES.get(self.cookie_name):
+            return None
+        if request.resolver_match.view_name in getattr(settings, 'GEARGUARD_REPLICA_VIEWS', ()):
+            routers.use_replica()
+        return None
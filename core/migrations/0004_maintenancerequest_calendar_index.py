@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_workcenter_equipment_assigned_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['scheduled_date', 'stage', 'priority'], name='core_req_sched_stage_prio'),
+        ),
+    ]
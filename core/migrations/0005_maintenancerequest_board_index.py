@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_maintenancerequest_calendar_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['stage', '-updated_at', '-id'], name='core_req_stage_updated'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5("
+            "kind UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS core_search_index ("
+            "id bigint PRIMARY KEY, "
+            "kind smallint NOT NULL, "
+            "title text NOT NULL, "
+            "body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', body), 'B')) STORED)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS core_search_index_document "
+            "ON core_search_index USING GIN (document)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_maintenancerequest_board_index'),
+    ]
+
+    operations = [
+        # Filled with the existing rows by 0017_populate_search_index
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
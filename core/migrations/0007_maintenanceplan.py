@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenancePlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('interval_type', models.CharField(choices=[('calendar', 'Calendar (every N days)'), ('usage', 'Usage (every N operating hours)')], default='calendar', max_length=20)),
+                ('interval_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('interval_hours', models.FloatField(blank=True, help_text='Operating hours between services', null=True)),
+                ('usage_hours_per_day', models.FloatField(default=8.0, help_text='Expected operating hours per day (usage plans)')),
+                ('start_date', models.DateTimeField(help_text='First occurrence; later ones follow at the interval')),
+                ('subject', models.CharField(blank=True, help_text='Defaults to the plan name', max_length=200)),
+                ('instructions', models.TextField(blank=True)),
+                ('priority', models.CharField(choices=[('Low', 'Low'), ('Medium', 'Medium'), ('High', 'High'), ('Critical', 'Critical')], default='Medium', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_plans', to='core.equipmentcategory')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_plans', to=settings.AUTH_USER_MODEL)),
+                ('equipment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_plans', to='core.equipment')),
+                ('team', models.ForeignKey(blank=True, help_text="Defaults to the equipment's maintenance team", null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.maintenanceteam')),
+                ('work_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_plans', to='core.workcenter')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_requests', to='core.maintenanceplan'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['plan', 'scheduled_date'], name='core_req_plan_sched'),
+        ),
+    ]
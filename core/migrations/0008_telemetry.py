@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_maintenanceplan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(default='health', max_length=32)),
+                ('value', models.FloatField()),
+                ('recorded_at', models.DateTimeField()),
+                ('equipment', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='core.equipment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['equipment', 'metric', 'recorded_at'], name='core_reading_eq_metric_ts'), models.Index(fields=['recorded_at'], name='core_reading_ts')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=32)),
+                ('bucket', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('sum_value', models.FloatField()),
+                ('equipment', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core.equipment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'bucket_start'], name='core_rollup_bucket_start')],
+                'constraints': [models.UniqueConstraint(fields=('equipment', 'metric', 'bucket', 'bucket_start'), name='core_rollup_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_telemetry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('metric', models.CharField(default='health', max_length=32)),
+                ('comparison', models.CharField(choices=[('below', 'Below threshold'), ('above', 'Above threshold')], default='below', max_length=10)),
+                ('threshold', models.FloatField()),
+                ('clear_threshold', models.FloatField(blank=True, help_text='Value that re-arms the rule (hysteresis); defaults to the threshold', null=True)),
+                ('trigger_after', models.PositiveIntegerField(default=1, help_text='Consecutive breaching values before triggering')),
+                ('cooldown_minutes', models.PositiveIntegerField(default=60, help_text='Minimum time between requests for the same equipment')),
+                ('priority', models.CharField(choices=[('Low', 'Low'), ('Medium', 'Medium'), ('High', 'High'), ('Critical', 'Critical')], default='High', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, help_text='Leave empty to apply to all equipment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='health_rules', to='core.equipmentcategory')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='triggered_requests', to='core.healthrule'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['rule', 'equipment', 'stage'], name='core_req_rule_equipment'),
+        ),
+    ]
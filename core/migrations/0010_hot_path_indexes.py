@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_healthrule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['name', 'id'], name='core_eq_name'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['department', 'id'], name='core_eq_department'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['location', 'id'], name='core_eq_location'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['health', 'id'], name='core_eq_health'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['-updated_at'], name='core_req_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(condition=models.Q(('stage__in', ['Repaired', 'Scrap']), _negated=True), fields=['scheduled_date'], name='core_req_open_sched'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(condition=models.Q(('stage__in', ['Repaired', 'Scrap']), _negated=True), fields=['assigned_to', 'duration'], name='core_req_open_assignee'),
+        ),
+    ]
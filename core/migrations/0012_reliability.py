@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReliabilitySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failures', models.PositiveIntegerField(default=0, help_text='Corrective requests')),
+                ('repairs', models.PositiveIntegerField(default=0, help_text='Corrective requests repaired')),
+                ('downtime_hours', models.FloatField(default=0.0, help_text='Reported to repaired, summed over repairs')),
+                ('uptime_hours', models.FloatField(default=0.0, help_text='Repaired to next failure, summed over intervals')),
+                ('intervals', models.PositiveIntegerField(default=0)),
+                ('labour_hours', models.FloatField(default=0.0, help_text='Duration of all repaired requests')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('mtbf_hours', models.FloatField(blank=True, null=True)),
+                ('mttr_hours', models.FloatField(blank=True, null=True)),
+                ('last_failure_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['equipment', 'request_type', 'created_at'], name='core_req_equipment_type'),
+        ),
+        migrations.AddField(
+            model_name='reliabilitysummary',
+            name='category',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reliability', to='core.equipmentcategory'),
+        ),
+        migrations.AddField(
+            model_name='reliabilitysummary',
+            name='equipment',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reliability', to='core.equipment'),
+        ),
+        migrations.AddField(
+            model_name='reliabilitysummary',
+            name='work_center',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reliability', to='core.workcenter'),
+        ),
+    ]
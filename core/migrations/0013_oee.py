@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_reliability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workcenter',
+            name='planned_hours_per_day',
+            field=models.FloatField(default=24.0, help_text='Planned production hours per day'),
+        ),
+        migrations.CreateModel(
+            name='OeeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('bucket_start', models.DateField()),
+                ('planned_hours', models.FloatField()),
+                ('downtime_hours', models.FloatField()),
+                ('work_center', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='oee_buckets', to='core.workcenter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'bucket_start'], name='core_oee_bucket_start')],
+                'constraints': [models.UniqueConstraint(fields=('work_center', 'bucket', 'bucket_start'), name='core_oee_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_stage_entered_at(apps, schema_editor):
+    # Best known value for existing rows; record their history with
+    # `manage.py rebuild_stage_flow --backfill`
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+    MaintenanceRequest.objects.filter(stage_entered_at__isnull=True).update(stage_entered_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_oee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='stage_entered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_stage_entered_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='StageFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=20)),
+                ('day', models.DateField()),
+                ('entered', models.PositiveIntegerField(default=0)),
+                ('exited', models.PositiveIntegerField(default=0)),
+                ('dwell_hours', models.FloatField(default=0.0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'stage'), name='core_flow_unique_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StageTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_stage', models.CharField(blank=True, max_length=20)),
+                ('to_stage', models.CharField(max_length=20)),
+                ('at', models.DateTimeField()),
+                ('dwell_hours', models.FloatField(blank=True, help_text='Hours spent in from_stage', null=True)),
+                ('request', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='core.maintenancerequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['request', 'at'], name='core_transition_request'), models.Index(fields=['at'], name='core_transition_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_stage_flow'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['request', 'created_at', 'id'], name='core_log_request_created'),
+        ),
+        # The new index covers request lookups, so the plain one can go
+        migrations.AlterField(
+            model_name='maintenancelog',
+            name='request',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='core.maintenancerequest'),
+        ),
+    ]
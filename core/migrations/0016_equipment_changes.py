@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_log_pages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_id', models.IntegerField()),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['changed_at'], name='core_eqchange_changed')],
+            },
+        ),
+    ]
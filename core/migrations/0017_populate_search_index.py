@@ -0,0 +1,75 @@
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+
+# Frozen copies of the core/search.py layout as of this migration: the row
+# id encodes the kind and the primary key (pk * 2 + kind).
+EQUIPMENT, REQUEST = 0, 1
+
+
+def _join(*parts):
+    return ' '.join(filter(None, parts))
+
+
+def _chunks(queryset):
+    chunk = []
+    for obj in queryset.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(obj)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def populate_search_index(apps, schema_editor):
+    # Rows written before the index existed were never indexed (later
+    # ones are, by the signals), so search returned nothing until a
+    # manual `rebuild_search_index`.
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        insert = "INSERT INTO core_search_index (rowid, kind, title, body) VALUES (%s, %s, %s, %s)"
+    elif connection.vendor == 'postgresql':
+        insert = "INSERT INTO core_search_index (id, kind, title, body) VALUES (%s, %s, %s, %s)"
+    else:
+        # No index table: the fallback backend searches the models
+        return
+    db = connection.alias
+    Equipment = apps.get_model('core', 'Equipment')
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+    MaintenanceLog = apps.get_model('core', 'MaintenanceLog')
+
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM core_search_index")
+        for chunk in _chunks(Equipment.objects.using(db).order_by('pk')):
+            cursor.executemany(insert, [
+                (e.pk * 2 + EQUIPMENT, EQUIPMENT, f"{e.name} {e.serial_number}", _join(e.department, e.location, e.description))
+                for e in chunk
+            ])
+        for chunk in _chunks(MaintenanceRequest.objects.using(db).order_by('pk')):
+            comments = {}
+            for request_id, comment in MaintenanceLog.objects.using(db).filter(
+                request_id__in=[req.pk for req in chunk],
+            ).order_by('pk').values_list('request_id', 'comment'):
+                comments.setdefault(request_id, []).append(comment)
+            names = dict(Equipment.objects.using(db).filter(
+                pk__in={req.equipment_id for req in chunk if req.equipment_id},
+            ).values_list('pk', 'name'))
+            cursor.executemany(insert, [
+                (
+                    req.pk * 2 + REQUEST, REQUEST, req.subject,
+                    _join(req.instructions, names.get(req.equipment_id, ''), *comments.get(req.pk, [])),
+                )
+                for req in chunk
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_equipment_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
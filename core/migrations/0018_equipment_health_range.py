@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_populate_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='health',
+            field=models.IntegerField(default=100, help_text='Equipment health percentage (0-100)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def mark_generated(apps, schema_editor):
+    # Plans generated before this field matched on scheduled_date; start
+    # the mark at their latest generated request
+    MaintenancePlan = apps.get_model('core', 'MaintenancePlan')
+    db = schema_editor.connection.alias
+    for plan in MaintenancePlan.objects.using(db).annotate(latest=Max('generated_requests__scheduled_date')):
+        if plan.latest:
+            MaintenancePlan.objects.using(db).filter(pk=plan.pk).update(generated_until=plan.latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_equipment_health_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenanceplan',
+            name='generated_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_generated, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+from datetime import timedelta
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -37,6 +40,7 @@ class WorkCenter(models.Model):
     cost_per_hour = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     efficiency = models.FloatField(default=100.0, help_text="Efficiency percentage")
     oee_target = models.FloatField(default=85.0, help_text="OEE Target percentage")
+    planned_hours_per_day = models.FloatField(default=24.0, help_text="Planned production hours per day")
     
     def __str__(self):
         return f"{self.name} ({self.code})"
@@ -65,13 +69,29 @@ class Equipment(models.Model):
     
     maintenance_team = models.ForeignKey(MaintenanceTeam, on_delete=models.SET_NULL, null=True, related_name='assigned_equipment')
     is_scrapped = models.BooleanField(default=False)
-    health = models.IntegerField(default=100, help_text="Equipment health percentage (0-100)")
+    health = models.IntegerField(
+        default=100, validators=[MinValueValidator(0), MaxValueValidator(100)],
+        help_text="Equipment health percentage (0-100)",
+    )
+
+    class Meta:
+        indexes = [
+            # Equipment list: keyset pagination on (sort field, id);
+            # serial_number is covered by its unique index
+            models.Index(fields=['name', 'id'], name='core_eq_name'),
+            models.Index(fields=['department', 'id'], name='core_eq_department'),
+            models.Index(fields=['location', 'id'], name='core_eq_location'),
+            # Also serves the dashboard's critical health count
+            models.Index(fields=['health', 'id'], name='core_eq_health'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.serial_number})"
 
 # --- Maintenance Workflow Models ---
 
+OPEN_REQUESTS = ~models.Q(stage__in=['Repaired', 'Scrap'])
+
 class MaintenanceRequest(models.Model):
     TYPE_CHOICES = [
         ('Corrective', 'Corrective (Breakdown)'),
@@ -111,9 +131,36 @@ class MaintenanceRequest(models.Model):
     
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_requests')
     instructions = models.TextField(blank=True)
+
+    # Set for requests generated from a preventive plan
+    plan = models.ForeignKey('MaintenancePlan', on_delete=models.SET_NULL, null=True, blank=True, related_name='generated_requests')
+    # Set for corrective requests opened by a health rule
+    rule = models.ForeignKey('HealthRule', on_delete=models.SET_NULL, null=True, blank=True, related_name='triggered_requests')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the stage changes (see core/flow.py); updated_at moves on any edit
+    stage_entered_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Calendar feed: date-windowed scans filtered by stage/priority
+            models.Index(fields=['scheduled_date', 'stage', 'priority'], name='core_req_sched_stage_prio'),
+            # Kanban columns: keyset pagination on (updated_at, id) per stage
+            models.Index(fields=['stage', '-updated_at', '-id'], name='core_req_stage_updated'),
+            # Preventive scheduler: existing occurrences per plan
+            models.Index(fields=['plan', 'scheduled_date'], name='core_req_plan_sched'),
+            # Health rules: open alert per equipment and rule
+            models.Index(fields=['rule', 'equipment', 'stage'], name='core_req_rule_equipment'),
+            # Dashboard recent activity
+            models.Index(fields=['-updated_at'], name='core_req_updated'),
+            # Reliability: failures of each equipment in order, and its history
+            models.Index(fields=['equipment', 'request_type', 'created_at'], name='core_req_equipment_type'),
+            # Partial indexes over open requests only (stage not Repaired/Scrap):
+            # dashboard open/overdue counts and the technician load index
+            models.Index(fields=['scheduled_date'], condition=OPEN_REQUESTS, name='core_req_open_sched'),
+            models.Index(fields=['assigned_to', 'duration'], condition=OPEN_REQUESTS, name='core_req_open_assignee'),
+        ]
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -125,10 +172,355 @@ class MaintenanceRequest(models.Model):
         return f"[{self.stage}] {self.subject} - {target}"
 
 class MaintenanceLog(models.Model):
-    request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='logs')
+    # Indexed with created_at below
+    request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='logs', db_index=False)
     comment = models.TextField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first pages of a request's logs
+            models.Index(fields=['request', 'created_at', 'id'], name='core_log_request_created'),
+        ]
+
     def __str__(self):
         return f"Log by {self.created_by} on {self.request}"
+
+# --- Preventive Planning ---
+
+class MaintenancePlan(models.Model):
+    """
+    Recurring preventive maintenance. A plan targets one Equipment, every
+    active Equipment of a Category, or a Work Center, and is materialized
+    into MaintenanceRequest rows by `manage.py generate_preventive_requests`.
+
+    Usage plans are calendar projections: no meter or telemetry feeds
+    them, the operating hours are spread at ``usage_hours_per_day``.
+    """
+    INTERVAL_CHOICES = [
+        ('calendar', 'Calendar (every N days)'),
+        ('usage', 'Usage (every N operating hours)'),
+    ]
+
+    name = models.CharField(max_length=200)
+
+    # Exactly one target
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, null=True, blank=True, related_name='maintenance_plans')
+    category = models.ForeignKey(EquipmentCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='maintenance_plans')
+    work_center = models.ForeignKey(WorkCenter, on_delete=models.CASCADE, null=True, blank=True, related_name='maintenance_plans')
+
+    interval_type = models.CharField(max_length=20, choices=INTERVAL_CHOICES, default='calendar')
+    interval_days = models.PositiveIntegerField(null=True, blank=True)
+    interval_hours = models.FloatField(null=True, blank=True, help_text="Operating hours between services")
+    usage_hours_per_day = models.FloatField(default=8.0, help_text="Expected operating hours per day (usage plans)")
+    start_date = models.DateTimeField(help_text="First occurrence; later ones follow at the interval")
+
+    # Template for generated requests
+    subject = models.CharField(max_length=200, blank=True, help_text="Defaults to the plan name")
+    instructions = models.TextField(blank=True)
+    priority = models.CharField(max_length=20, choices=MaintenanceRequest.PRIORITY_CHOICES, default='Medium')
+    team = models.ForeignKey(MaintenanceTeam, on_delete=models.SET_NULL, null=True, blank=True,
+                             help_text="Defaults to the equipment's maintenance team")
+
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='maintenance_plans')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Latest occurrence materialized; later runs only generate past it
+    generated_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        targets = [self.equipment_id, self.category_id, self.work_center_id]
+        if sum(1 for target in targets if target) != 1:
+            raise ValidationError("Select exactly one of Equipment, Category or Work Center.")
+        if self.interval_type == 'calendar' and not self.interval_days:
+            raise ValidationError({'interval_days': "Calendar plans need an interval in days."})
+        if self.interval_type == 'usage' and not (self.interval_hours and self.usage_hours_per_day):
+            raise ValidationError({'interval_hours': "Usage plans need operating hours and hours per day."})
+
+    def interval(self):
+        """
+        The plan's period as a timedelta (usage plans are projected onto
+        the calendar using usage_hours_per_day), or None when the fields
+        it needs are missing, as for a plan saved without ``clean()``.
+        """
+        if self.interval_type == 'usage':
+            if not (self.interval_hours and self.usage_hours_per_day):
+                return None
+            return timedelta(days=self.interval_hours / self.usage_hours_per_day)
+        if not self.interval_days:
+            return None
+        return timedelta(days=self.interval_days)
+
+    def __str__(self):
+        return self.name
+
+# --- Telemetry ---
+
+class TelemetryReading(models.Model):
+    """
+    Append-only raw sensor reading. Kept for a short retention window;
+    TelemetryRollup holds the downsampled history.
+    """
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name='readings', db_index=False)
+    metric = models.CharField(max_length=32, default='health')
+    value = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['equipment', 'metric', 'recorded_at'], name='core_reading_eq_metric_ts'),
+            # Rollup windows and retention pruning
+            models.Index(fields=['recorded_at'], name='core_reading_ts'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}={self.value} @ {self.recorded_at}"
+
+class TelemetryRollup(models.Model):
+    BUCKET_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name='rollups', db_index=False)
+    metric = models.CharField(max_length=32)
+    bucket = models.CharField(max_length=10, choices=BUCKET_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    sum_value = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['equipment', 'metric', 'bucket', 'bucket_start'], name='core_rollup_unique_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'bucket_start'], name='core_rollup_bucket_start'),
+        ]
+
+    @property
+    def avg_value(self):
+        return self.sum_value / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.equipment_id} {self.metric} {self.bucket} {self.bucket_start}"
+
+# --- Health Rules ---
+
+class HealthRule(models.Model):
+    """
+    Opens a Corrective request when an equipment value crosses a threshold.
+    Rules watch ``Equipment.health`` (metric 'health') or a raw telemetry
+    metric, and are evaluated incrementally by core.rules as values arrive.
+    """
+    COMPARISON_CHOICES = [
+        ('below', 'Below threshold'),
+        ('above', 'Above threshold'),
+    ]
+
+    name = models.CharField(max_length=200)
+    category = models.ForeignKey(EquipmentCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='health_rules',
+                                 help_text="Leave empty to apply to all equipment")
+    metric = models.CharField(max_length=32, default='health')
+    comparison = models.CharField(max_length=10, choices=COMPARISON_CHOICES, default='below')
+    threshold = models.FloatField()
+    clear_threshold = models.FloatField(null=True, blank=True,
+                                        help_text="Value that re-arms the rule (hysteresis); defaults to the threshold")
+    trigger_after = models.PositiveIntegerField(default=1, help_text="Consecutive breaching values before triggering")
+    cooldown_minutes = models.PositiveIntegerField(default=60, help_text="Minimum time between requests for the same equipment")
+
+    priority = models.CharField(max_length=20, choices=MaintenanceRequest.PRIORITY_CHOICES, default='High')
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='health_rules')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.clear_threshold is None:
+            return
+        if self.comparison == 'below' and self.clear_threshold < self.threshold:
+            raise ValidationError({'clear_threshold': "Must be at or above the threshold for 'below' rules."})
+        if self.comparison == 'above' and self.clear_threshold > self.threshold:
+            raise ValidationError({'clear_threshold': "Must be at or below the threshold for 'above' rules."})
+
+    def __str__(self):
+        return self.name
+
+# --- Stage flow ---
+
+class StageTransition(models.Model):
+    """
+    Append-only record of a request entering a stage, written by
+    core.flow. ``from_stage`` is blank when the request was created.
+    """
+    request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='transitions', db_index=False)
+    from_stage = models.CharField(max_length=20, blank=True)
+    to_stage = models.CharField(max_length=20)
+    at = models.DateTimeField()
+    dwell_hours = models.FloatField(null=True, blank=True, help_text="Hours spent in from_stage")
+
+    class Meta:
+        indexes = [
+            # A request's history
+            models.Index(fields=['request', 'at'], name='core_transition_request'),
+            # Date-range scans for the flow aggregates
+            models.Index(fields=['at'], name='core_transition_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.request_id}: {self.from_stage or '-'} -> {self.to_stage}"
+
+class StageFlow(models.Model):
+    """
+    Per stage and local day: requests that entered and left the stage,
+    and the hours those leaving had spent in it. Rebuilt from
+    StageTransition by core.flow.
+    """
+    stage = models.CharField(max_length=20)
+    day = models.DateField()
+    entered = models.PositiveIntegerField(default=0)
+    exited = models.PositiveIntegerField(default=0)
+    dwell_hours = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'stage'], name='core_flow_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.stage} {self.day}"
+
+# --- Equipment auto-fill ---
+
+class EquipmentChange(models.Model):
+    """
+    One write that changed what the auto-fill lookup returns for an
+    equipment (core.autofill); offline clients sync from the ids after
+    their snapshot's version.
+    """
+    # Not a foreign key: deleted equipment is a change too
+    equipment_id = models.IntegerField()
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Pruning old changes
+            models.Index(fields=['changed_at'], name='core_eqchange_changed'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} equipment {self.equipment_id}"
+
+# --- Reliability and OEE ---
+
+class ReliabilitySummary(models.Model):
+    """
+    Materialized reliability figures for one equipment, category or work
+    center (exactly one of the three is set), maintained by core.reliability.
+    Sums are kept alongside the means so that roll-ups stay exact.
+    """
+    equipment = models.OneToOneField(Equipment, on_delete=models.CASCADE, null=True, blank=True, related_name='reliability')
+    category = models.OneToOneField(EquipmentCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='reliability')
+    work_center = models.OneToOneField(WorkCenter, on_delete=models.CASCADE, null=True, blank=True, related_name='reliability')
+
+    failures = models.PositiveIntegerField(default=0, help_text="Corrective requests")
+    repairs = models.PositiveIntegerField(default=0, help_text="Corrective requests repaired")
+    downtime_hours = models.FloatField(default=0.0, help_text="Reported to repaired, summed over repairs")
+    uptime_hours = models.FloatField(default=0.0, help_text="Repaired to next failure, summed over intervals")
+    intervals = models.PositiveIntegerField(default=0)
+    labour_hours = models.FloatField(default=0.0, help_text="Duration of all repaired requests")
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    mtbf_hours = models.FloatField(null=True, blank=True)
+    mttr_hours = models.FloatField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        if self.equipment_id:
+            return f"Reliability of equipment {self.equipment_id}"
+        if self.category_id:
+            return f"Reliability of category {self.category_id}"
+        return f"Reliability of work center {self.work_center_id}"
+
+class OeeBucket(models.Model):
+    """
+    Planned production time and the part of it lost to maintenance for
+    one work center over a day, week or month, maintained by core.oee.
+    """
+    BUCKET_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    work_center = models.ForeignKey(WorkCenter, on_delete=models.CASCADE, related_name='oee_buckets', db_index=False)
+    bucket = models.CharField(max_length=10, choices=BUCKET_CHOICES)
+    bucket_start = models.DateField()
+    planned_hours = models.FloatField()
+    downtime_hours = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['work_center', 'bucket', 'bucket_start'], name='core_oee_unique_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'bucket_start'], name='core_oee_bucket_start'),
+        ]
+
+    @property
+    def availability(self):
+        """
+        Share of planned time not lost to maintenance, in percent.
+        """
+        if not self.planned_hours:
+            return None
+        return max(0.0, 100.0 * (self.planned_hours - self.downtime_hours) / self.planned_hours)
+
+    def __str__(self):
+        return f"{self.work_center_id} {self.bucket} {self.bucket_start}"
+
+# --- Background tasks ---
+
+class Task(models.Model):
+    """
+    A queued call of a function registered with ``core.tasks.task``, run
+    by ``manage.py run_worker``. While a task with a ``key`` is queued,
+    enqueueing the same key again is a no-op.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, null=True, blank=True, help_text="Idempotency key")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='queued'), name='core_task_queued_key'),
+        ]
+        indexes = [
+            # Workers claim due tasks; metrics count by status
+            models.Index(fields=['status', 'run_after'], name='core_task_due'),
+            # Pruning finished tasks
+            models.Index(fields=['finished_at'], name='core_task_finished'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}]"
@@ -0,0 +1,279 @@
+"""
+Overall equipment effectiveness (OEE) per work center.
+
+Availability is planned production time (``planned_hours_per_day``) less
+the part of it lost to maintenance:
+
+* a Corrective request stops its work center from being reported until
+  it is closed (enters Repaired or Scrap, see ``stage_entered_at``);
+  open ones are still stopped. Overlapping stops count once, and each
+  hour stopped costs ``planned_hours_per_day / 24`` planned hours,
+  production being assumed to be spread over the day;
+* a Preventive request costs its ``duration`` on the day it is repaired.
+
+    availability = (planned - downtime) / planned
+    OEE          = availability x performance (``efficiency``) x quality
+
+Quality is not tracked and counts as 100%. Requests count against their
+equipment's work center, or their own when they have no equipment.
+
+Figures are stored per local day, week (from Monday) and month in
+``OeeBucket``, so pages read the current windows with one query.
+``refresh()`` rebuilds them from one pass over the requests: downtime is
+merged and split into days in memory, and weeks and months are summed
+from the days. With ``since``, only the buckets from the start of that
+month on are recomputed, which is what request changes queue (see
+``core/signals.py``). ``manage.py refresh_oee`` rebuilds the
+``GEARGUARD_OEE_HISTORY_DAYS`` window, or keeps the current periods up
+to date with ``--every``, as open stops keep growing.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from . import tasks, versions
+from .models import Equipment, MaintenanceRequest, OeeBucket, WorkCenter
+
+BUCKETS = ('day', 'week', 'month')
+
+# Rows per executemany() in a full rebuild
+INSERT_BATCH = 5000
+
+FAILURE = 'Corrective'
+PREVENTIVE = 'Preventive'
+REPAIRED = 'Repaired'
+CLOSED_STAGES = ('Repaired', 'Scrap')
+
+
+def history_days():
+    return getattr(settings, 'GEARGUARD_OEE_HISTORY_DAYS', 730)
+
+
+def period_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _midnight(day, tz=None):
+    return timezone.make_aware(datetime.combine(day, time.min), tz)
+
+
+def _hours(start, end):
+    return (end - start).total_seconds() / 3600
+
+
+def _calendar(first_day, now, tz):
+    """
+    ``(day, next midnight, hours in the day, share of it elapsed, period
+    starts)`` for each local day from ``first_day`` to today.
+    """
+    days = []
+    day, midnight = first_day, _midnight(first_day, tz)
+    while midnight < now:
+        next_midnight = _midnight(day + timedelta(days=1), tz)
+        length = _hours(midnight, next_midnight)
+        # Today only counts the planned time so far
+        elapsed = _hours(midnight, min(next_midnight, now)) / length
+        days.append((day, next_midnight, length, elapsed, tuple(period_start(day, bucket) for bucket in BUCKETS)))
+        day, midnight = day + timedelta(days=1), next_midnight
+    return days
+
+
+def _requests(work_center_ids, start):
+    """
+    ``(work center, type, stage, created_at, stage_entered_at, duration)`` of
+    the requests that cost time from ``start`` on.
+    """
+    requests = MaintenanceRequest.objects.annotate(
+        target=Case(When(equipment__isnull=False, then=F('equipment__work_center_id')), default=F('work_center_id')),
+    ).filter(
+        Q(request_type=FAILURE) & (~Q(stage__in=CLOSED_STAGES) | Q(stage_entered_at__gte=start))
+        | Q(request_type=PREVENTIVE, stage=REPAIRED, stage_entered_at__gte=start),
+        target__isnull=False,
+    )
+    if work_center_ids is not None:
+        requests = requests.filter(target__in=work_center_ids)
+    return requests.order_by().values_list('target', 'request_type', 'stage', 'created_at', 'stage_entered_at', 'duration')
+
+
+def _downtime(rows, start, now, days, tz):
+    """
+    Hours stopped (wall clock) and hours of preventive work per work
+    center and local day.
+    """
+    stops = defaultdict(list)
+    work = defaultdict(lambda: defaultdict(float))
+    for target, request_type, stage, created_at, entered_at, duration in rows:
+        if request_type == FAILURE:
+            end = entered_at if stage in CLOSED_STAGES else now
+            begin, end = max(created_at, start), min(end, now)
+            if begin < end:
+                stops[target].append((begin, end))
+        elif duration:
+            work[target][entered_at.astimezone(tz).date()] += duration
+
+    next_midnight = {day: midnight for day, midnight, *_ in days}
+    stopped = defaultdict(lambda: defaultdict(float))
+    for target, intervals in stops.items():
+        intervals.sort()
+        merged = [list(intervals[0])]
+        for begin, end in intervals[1:]:
+            if begin <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([begin, end])
+        for begin, end in merged:
+            day = begin.astimezone(tz).date()
+            while begin < end:
+                boundary = min(end, next_midnight[day])
+                stopped[target][day] += _hours(begin, boundary)
+                begin, day = boundary, day + timedelta(days=1)
+    return stopped, work
+
+
+def _buckets(work_center_id, planned_per_day, first_day, days, stopped, work):
+    """
+    ``(work center, bucket, start, planned hours, downtime hours)`` rows.
+    """
+    totals = [defaultdict(lambda: [0.0, 0.0]) for _ in BUCKETS]
+    for day, _, length, elapsed, starts in days:
+        planned = planned_per_day * elapsed
+        lost = min(planned, stopped.get(day, 0.0) * planned_per_day / length + work.get(day, 0.0))
+        for sums, start in zip(totals, starts):
+            sums = sums[start]
+            sums[0] += planned
+            sums[1] += lost
+    return [
+        (work_center_id, bucket, start, planned, lost)
+        for bucket, sums in zip(BUCKETS, totals)
+        for start, (planned, lost) in sums.items()
+        # Periods that began before first_day are only partly covered
+        if start >= first_day
+    ]
+
+
+def _replace(work_center_ids, rows):
+    """
+    Replace all buckets of ``work_center_ids`` with ``rows``, written
+    with executemany() rather than model instances: a full rebuild writes
+    hundreds of rows per work center.
+    """
+    OeeBucket.objects.filter(work_center_id__in=work_center_ids).delete()
+    table = OeeBucket._meta.db_table
+    adapt = connection.ops.adapt_datefield_value
+    sql = (
+        f'INSERT INTO {table} (work_center_id, bucket, bucket_start, planned_hours, downtime_hours) '
+        'VALUES (%s, %s, %s, %s, %s)'
+    )
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), INSERT_BATCH):
+            cursor.executemany(sql, [
+                (work_center_id, bucket, adapt(start), planned, lost)
+                for work_center_id, bucket, start, planned, lost in rows[offset:offset + INSERT_BATCH]
+            ])
+
+
+def refresh(work_center_ids=None, equipment_ids=(), since=None, now=None):
+    """
+    Recompute the buckets of ``work_center_ids`` and of the work centers
+    of ``equipment_ids`` (default: all work centers) from the month of the
+    ``since`` date on (default: the whole history window). Returns the
+    number of buckets written.
+    """
+    tz = timezone.get_current_timezone()
+    now = now or timezone.now()
+    first_day = timezone.localdate(now, tz) - timedelta(days=history_days() - 1)
+    full = since is None
+    if not full:
+        # Whole weeks and months, so their buckets are complete
+        first_day = max(first_day, period_start(period_start(since, 'month'), 'week'))
+
+    work_centers = WorkCenter.objects.all()
+    if work_center_ids is not None or equipment_ids:
+        ids = set(work_center_ids or ())
+        ids.update(Equipment.objects.filter(pk__in=equipment_ids, work_center__isnull=False).values_list('work_center_id', flat=True))
+        if not ids:
+            return 0
+        work_center_ids = sorted(ids)
+        work_centers = work_centers.filter(pk__in=work_center_ids)
+    planned = dict(work_centers.values_list('pk', 'planned_hours_per_day'))
+
+    start = _midnight(first_day, tz)
+    days = _calendar(first_day, now, tz)
+    stopped, work = _downtime(_requests(work_center_ids, start), start, now, days, tz)
+    rows = []
+    for work_center_id, planned_per_day in planned.items():
+        rows.extend(_buckets(
+            work_center_id, planned_per_day, first_day, days,
+            stopped.get(work_center_id, {}), work.get(work_center_id, {}),
+        ))
+
+    with transaction.atomic():
+        if full:
+            _replace(list(planned), rows)
+        else:
+            OeeBucket.objects.bulk_create(
+                [
+                    OeeBucket(work_center_id=work_center_id, bucket=bucket, bucket_start=start,
+                              planned_hours=planned_hours, downtime_hours=lost)
+                    for work_center_id, bucket, start, planned_hours, lost in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['work_center', 'bucket', 'bucket_start'],
+                update_fields=['planned_hours', 'downtime_hours'],
+            )
+        # Neither path sends model signals
+        versions.bump(OeeBucket)
+    return len(rows)
+
+
+@tasks.task
+def refresh_task(work_center_ids, equipment_ids, since):
+    refresh(work_center_ids, equipment_ids, date.fromisoformat(since) if since else None)
+
+
+def schedule(equipment_ids=(), work_center_ids=(), since=None):
+    """
+    Queue a refresh of the work centers of ``equipment_ids`` and of
+    ``work_center_ids`` from the ``since`` date on (None: all history).
+    """
+    equipment_ids = sorted({pk for pk in equipment_ids if pk})
+    work_center_ids = sorted({pk for pk in work_center_ids if pk})
+    if not (equipment_ids or work_center_ids):
+        return
+    since = since.isoformat() if since else None
+    key = None
+    if len(equipment_ids) + len(work_center_ids) == 1:
+        target = f'equipment:{equipment_ids[0]}' if equipment_ids else f'work-center:{work_center_ids[0]}'
+        key = f'oee:{target}:{since or "all"}'
+    refresh_task.enqueue(work_center_ids, equipment_ids, since, key=key)
+
+
+def current(work_centers, now=None):
+    """
+    Attach ``windows`` to each of ``work_centers``: ``{'day'|'week'|'month':
+    {'availability', 'oee'}}`` for the current periods, in percent.
+    """
+    today = timezone.localdate(now or timezone.now())
+    periods = Q()
+    for bucket in BUCKETS:
+        periods |= Q(bucket=bucket, bucket_start=period_start(today, bucket))
+    found = defaultdict(dict)
+    for row in OeeBucket.objects.filter(periods, work_center__in=[wc.pk for wc in work_centers]):
+        found[row.work_center_id][row.bucket] = row
+    for wc in work_centers:
+        wc.windows = {}
+        for bucket, row in found[wc.pk].items():
+            availability = row.availability
+            wc.windows[bucket] = {
+                'availability': availability,
+                'oee': None if availability is None else availability * wc.efficiency / 100,
+            }
+    return work_centers
@@ -0,0 +1,135 @@
+"""
+Keyset (seek) pagination helpers.
+
+A cursor is an opaque, URL-safe encoding of the sort value and primary
+key of the last row on a page. The next page is fetched with a
+``WHERE (field, id) > (value, pk)`` style predicate, so every page costs
+the same no matter how deep the user scrolls. NULLs of a nullable sort
+field come after every value.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder cuts times to milliseconds, which would skip
+        # rows sharing the millisecond of the last one on a page
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value, pk], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Return ``(value, pk)``; raises ValueError if the cursor is malformed.
+    """
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(decoded, list):
+            raise TypeError(type(decoded))
+        value, pk = decoded
+        return value, int(pk)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError('Invalid cursor') from exc
+
+
+def parse_sort(sort, allowed, default):
+    """
+    Validate a ``?sort=`` value such as ``name`` or ``-health``.
+    Returns ``(field, descending)``.
+    """
+    sort = sort or default
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in allowed:
+        field, descending = default.lstrip('-'), default.startswith('-')
+    return field, descending
+
+
+def paginate(queryset, field, descending=False, cursor=None, limit=50, backwards=False):
+    """
+    Return ``(rows, next_cursor, prev_cursor)`` for one page of ``queryset``
+    ordered by ``(field, pk)``.
+
+    ``cursor`` is the cursor of a neighbouring page: with ``backwards``
+    the page *before* it is returned.
+    """
+    page = _page_queryset(queryset, field, descending, cursor, limit, backwards)
+    return _page_result(list(page), field, cursor, limit, backwards)
+
+
+async def apaginate(queryset, field, descending=False, cursor=None, limit=50, backwards=False):
+    """
+    ``paginate()`` for async views. ``queryset`` may also be a
+    ``values()`` queryset that includes ``pk`` and ``field``.
+    """
+    page = _page_queryset(queryset, field, descending, cursor, limit, backwards)
+    return _page_result([row async for row in page], field, cursor, limit, backwards)
+
+
+def _nullable(model, path):
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field.null
+
+
+def _page_queryset(queryset, field, descending, cursor, limit, backwards):
+    forward_desc = descending != backwards
+    lookup = 'lt' if forward_desc else 'gt'
+    # NULLs sort after every value, so a page can end on them and go on
+    nullable = _nullable(queryset.model, field)
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        after_value = Q(**{field: value, f'pk__{lookup}': pk})
+        if value is None:
+            if not nullable:
+                raise ValueError('Invalid cursor')
+            if forward_desc:
+                after_value |= Q(**{f'{field}__isnull': False})
+        else:
+            after_value |= Q(**{f'{field}__{lookup}': value})
+            if nullable and not forward_desc:
+                after_value |= Q(**{f'{field}__isnull': True})
+        try:
+            queryset = queryset.filter(after_value)
+        except ValidationError as exc:
+            # A value of the wrong type for the field
+            raise ValueError('Invalid cursor') from exc
+    if nullable:
+        ordering = F(field).desc(nulls_first=True) if forward_desc else F(field).asc(nulls_last=True)
+    else:
+        ordering = f"{'-' if forward_desc else ''}{field}"
+    return queryset.order_by(ordering, f"{'-' if forward_desc else ''}pk")[:limit + 1]
+
+
+def _page_result(rows, field, cursor, limit, backwards):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        if isinstance(row, dict):
+            return encode_cursor(row[field], row['pk'])
+        return encode_cursor(getattr(row, field), row.pk)
+
+    if not rows:
+        return rows, None, None
+    more_after = has_more if not backwards else bool(cursor)
+    more_before = has_more if backwards else bool(cursor)
+    next_cursor = cursor_for(rows[-1]) if more_after else None
+    prev_cursor = cursor_for(rows[0]) if more_before else None
+    return rows, next_cursor, prev_cursor
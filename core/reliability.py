@@ -0,0 +1,274 @@
+"""
+Reliability metrics per equipment, category and work center.
+
+A *failure* is a Corrective request; it is *repaired* when the request
+reaches 'Repaired', at its ``stage_entered_at``. From those:
+
+    downtime    hours from a failure being reported to its repair
+    MTTR        downtime / repaired failures
+    uptime      hours from a repair to the next failure of the same asset
+    MTBF        uptime / intervals (one per failure preceded by a repair)
+    labour      ``duration`` summed over all repaired requests
+    cost        labour x ``cost_per_hour`` of the request's work center,
+                or else of its equipment's work center
+
+Equipment figures come from one windowed query (``LAG`` over each
+equipment's failures) plus one grouped aggregate for labour and cost.
+Categories and work centers are rolled up from the stored equipment rows
+with grouped sums, and work centers add the requests filed against the
+work center itself. Everything is stored in ``ReliabilitySummary``.
+
+``refresh()`` with no arguments rebuilds every row (``manage.py
+refresh_reliability``). Request changes refresh only the equipment and
+work center involved, plus their category and work center roll-ups
+(see ``core/signals.py``). Moving equipment to another category or work
+center is picked up by the next full refresh.
+"""
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Max, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import tasks, versions
+from .models import Equipment, MaintenanceRequest, ReliabilitySummary
+
+FAILURE = 'Corrective'
+REPAIRED = 'Repaired'
+
+# SQL for the hours between two timestamps, per database vendor
+HOURS_BETWEEN = {
+    'sqlite': "(julianday({end}) - julianday({start})) * 24",
+    'postgresql': "EXTRACT(EPOCH FROM ({end} - {start})) / 3600",
+    'mysql': "TIMESTAMPDIFF(MICROSECOND, {start}, {end}) / 3600000000",
+}
+
+FAILURES_SQL = """
+SELECT {column}, COUNT(*),
+       SUM(CASE WHEN stage = %s THEN 1 ELSE 0 END),
+       SUM(CASE WHEN stage = %s THEN {downtime} ELSE 0 END),
+       SUM(CASE WHEN gap < 0 THEN 0 ELSE gap END),
+       COUNT(gap),
+       MAX(created_at)
+FROM (
+    SELECT {column}, stage, created_at, stage_entered_at, {gap} AS gap
+    FROM {table}
+    WHERE request_type = %s AND {where}
+) failures
+GROUP BY {column}
+"""
+
+SUMMED = ('failures', 'repairs', 'downtime_hours', 'uptime_hours', 'intervals', 'labour_hours', 'cost')
+STORED = SUMMED + ('mtbf_hours', 'mttr_hours', 'last_failure_at', 'refreshed_at')
+
+
+def _hours(end, start):
+    return HOURS_BETWEEN.get(connection.vendor, HOURS_BETWEEN['postgresql']).format(end=end, start=start)
+
+
+def _as_datetime(value):
+    # Raw cursors return SQLite timestamps as text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _failures(column, ids, where):
+    """
+    Failure counts, downtime and uptime intervals per ``column`` value.
+    """
+    previous_repair = f"LAG(CASE WHEN stage = %s THEN stage_entered_at END) OVER (PARTITION BY {column} ORDER BY created_at, id)"
+    params = [REPAIRED, REPAIRED, REPAIRED, FAILURE]
+    if ids is not None:
+        where += f" AND {column} IN ({', '.join(['%s'] * len(ids))})"
+        params += list(ids)
+    sql = FAILURES_SQL.format(
+        column=column,
+        table=MaintenanceRequest._meta.db_table,
+        downtime=_hours('stage_entered_at', 'created_at'),
+        gap=_hours('created_at', previous_repair),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {
+            key: {
+                'failures': failures,
+                'repairs': repairs or 0,
+                'downtime_hours': float(downtime or 0),
+                'uptime_hours': float(uptime or 0),
+                'intervals': intervals,
+                'last_failure_at': _as_datetime(last_failure_at),
+            }
+            for key, failures, repairs, downtime, uptime, intervals, last_failure_at in cursor.fetchall()
+        }
+
+
+def _labour(column, ids, **filters):
+    """
+    Labour hours and cost of repaired requests per ``column`` value.
+    """
+    rate = Coalesce('work_center__cost_per_hour', 'equipment__work_center__cost_per_hour', Value(Decimal('0')))
+    requests = MaintenanceRequest.objects.filter(stage=REPAIRED, **filters)
+    if ids is not None:
+        requests = requests.filter(**{f'{column}__in': ids})
+    return {
+        row[column]: {'labour_hours': row['labour_hours'] or 0.0, 'cost': row['cost'] or 0.0}
+        for row in requests.values(column).annotate(
+            labour_hours=Sum('duration'),
+            cost=Sum(F('duration') * Cast(rate, FloatField())),
+        )
+    }
+
+
+def _combine(*sources):
+    totals = {}
+    for source in sources:
+        for key, values in source.items():
+            row = totals.setdefault(key, dict.fromkeys(SUMMED, 0))
+            for name, value in values.items():
+                if name == 'last_failure_at':
+                    if value and (row.get(name) is None or value > row[name]):
+                        row[name] = value
+                else:
+                    # Stored costs come back as Decimal, fresh ones as float
+                    row[name] += float(value) if isinstance(value, Decimal) else value or 0
+    return totals
+
+
+def _summary(field, key, values):
+    now = timezone.now()
+    return ReliabilitySummary(
+        **{f'{field}_id': key},
+        failures=values['failures'],
+        repairs=values['repairs'],
+        downtime_hours=values['downtime_hours'],
+        uptime_hours=values['uptime_hours'],
+        intervals=values['intervals'],
+        labour_hours=values['labour_hours'],
+        cost=Decimal(str(round(float(values['cost']), 2))),
+        mtbf_hours=values['uptime_hours'] / values['intervals'] if values['intervals'] else None,
+        mttr_hours=values['downtime_hours'] / values['repairs'] if values['repairs'] else None,
+        last_failure_at=values.get('last_failure_at'),
+        refreshed_at=now,
+    )
+
+
+def _store(field, ids, totals):
+    """
+    Replace the stored rows of ``field`` (only those of ``ids``, if given)
+    with ``totals``; rows left without data are dropped.
+    """
+    rows = [_summary(field, key, values) for key, values in totals.items()]
+    if ids is None:
+        ReliabilitySummary.objects.filter(**{f'{field}__isnull': False}).delete()
+        ReliabilitySummary.objects.bulk_create(rows)
+        return len(rows)
+    if rows:
+        ReliabilitySummary.objects.bulk_create(rows, update_conflicts=True, unique_fields=[field], update_fields=STORED)
+    stale = set(ids) - set(totals)
+    if stale:
+        ReliabilitySummary.objects.filter(**{f'{field}__in': stale}).delete()
+    return len(rows)
+
+
+def _rollup(group, ids):
+    """
+    Sum the stored equipment rows per category or work center.
+    """
+    rows = ReliabilitySummary.objects.filter(**{f'equipment__{group}__isnull': False})
+    if ids is not None:
+        rows = rows.filter(**{f'equipment__{group}__in': ids})
+    sums = rows.values(f'equipment__{group}').annotate(
+        **{f'total_{name}': Sum(name) for name in SUMMED}, latest_failure_at=Max('last_failure_at'),
+    )
+    return {
+        row[f'equipment__{group}']: {
+            **{name: row[f'total_{name}'] for name in SUMMED},
+            'last_failure_at': row['latest_failure_at'],
+        }
+        for row in sums
+    }
+
+
+def refresh(equipment_ids=None, work_center_ids=None):
+    """
+    Recompute the summaries of ``equipment_ids`` and of the requests filed
+    against ``work_center_ids``, and the category and work center roll-ups
+    they belong to. With no arguments, recompute everything. Returns the
+    number of rows stored per scope.
+    """
+    full = equipment_ids is None and work_center_ids is None
+    equipment_ids = None if full else sorted(set(equipment_ids or ()))
+    work_center_ids = None if full else set(work_center_ids or ())
+    category_ids = None
+    if not full:
+        category_ids = set()
+        for category_id, work_center_id in Equipment.objects.filter(pk__in=equipment_ids).values_list('category_id', 'work_center_id'):
+            category_ids.add(category_id)
+            work_center_ids.add(work_center_id)
+        category_ids = sorted(category_ids - {None})
+        work_center_ids = sorted(work_center_ids - {None})
+
+    with transaction.atomic():
+        counts = {'equipment': 0, 'category': 0, 'work_center': 0}
+        if full or equipment_ids:
+            equipment = _combine(
+                _failures('equipment_id', equipment_ids, 'equipment_id IS NOT NULL'),
+                _labour('equipment_id', equipment_ids, equipment__isnull=False),
+            )
+            counts['equipment'] = _store('equipment', equipment_ids, equipment)
+        if full or category_ids:
+            counts['category'] = _store('category', category_ids, _rollup('category', category_ids))
+        if full or work_center_ids:
+            work_centers = _combine(
+                _rollup('work_center', work_center_ids),
+                # Requests filed against the work center itself
+                _failures('work_center_id', work_center_ids, 'equipment_id IS NULL AND work_center_id IS NOT NULL'),
+                _labour('work_center_id', work_center_ids, equipment__isnull=True, work_center__isnull=False),
+            )
+            counts['work_center'] = _store('work_center', work_center_ids, work_centers)
+        # bulk_create bypasses the model signals
+        versions.bump(ReliabilitySummary)
+    return counts
+
+
+@tasks.task
+def refresh_task(equipment_ids, work_center_ids):
+    refresh(equipment_ids, work_center_ids)
+
+
+def schedule(equipment_ids=(), work_center_ids=()):
+    """
+    Queue a refresh for requests that changed on ``equipment_ids`` or
+    directly on ``work_center_ids``.
+    """
+    equipment_ids = sorted({pk for pk in equipment_ids if pk})
+    work_center_ids = sorted({pk for pk in work_center_ids if pk})
+    if not (equipment_ids or work_center_ids):
+        return
+    key = None
+    if len(equipment_ids) + len(work_center_ids) == 1:
+        key = f'reliability:equipment:{equipment_ids[0]}' if equipment_ids else f'reliability:work-center:{work_center_ids[0]}'
+    refresh_task.enqueue(equipment_ids, work_center_ids, key=key)
+
+
+def schedule_for(states):
+    """
+    ``schedule()`` for request states as kept by the signals:
+    ``(equipment_id, work_center_id, ...)`` tuples or None.
+    """
+    equipment_ids, work_center_ids = set(), set()
+    for state in states:
+        if state is None:
+            continue
+        if state[0]:
+            equipment_ids.add(state[0])
+        else:
+            work_center_ids.add(state[1])
+    schedule(equipment_ids, work_center_ids)
@@ -0,0 +1,68 @@
+"""
+Read replica routing.
+
+Reads go to the primary unless the current request was marked
+replica-safe by ``core.middleware.ReplicaRoutingMiddleware`` (a GET to
+one of ``GEARGUARD_REPLICA_VIEWS`` from a client that has not written
+recently). Any write pins the rest of the request to the primary, so
+background jobs, management commands and write flows never read stale
+data.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_use_replica = contextvars.ContextVar('gearguard_use_replica', default=False)
+
+
+def replicas():
+    return getattr(settings, 'GEARGUARD_READ_REPLICAS', [])
+
+
+def start():
+    """
+    Begin a request on the primary. Returns a token for ``reset()``.
+    """
+    return _use_replica.set(False)
+
+
+def reset(token):
+    _use_replica.reset(token)
+
+
+def use_replica():
+    """
+    Allow the rest of the current request to read from a replica.
+    """
+    _use_replica.set(True)
+
+
+def pin_primary():
+    _use_replica.set(False)
+
+
+def reading_from_replica():
+    return _use_replica.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and _use_replica.get():
+            return random.choice(aliases)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Later reads in this request must see the write
+        pin_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any of them relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
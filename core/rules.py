@@ -0,0 +1,261 @@
+"""
+Health rules: incremental threshold evaluation.
+
+A per-process ``RuleEngine`` keeps the active ``HealthRule`` rows indexed
+by ``(category, metric)`` and a cached profile (category, team, name) per
+equipment, so evaluating a value is a few dict lookups and comparisons
+with no query. Per (equipment, rule) state implements:
+
+* debounce   - ``trigger_after`` consecutive breaching values are needed,
+* hysteresis - a triggered rule stays latched until the value crosses
+  back over ``clear_threshold``,
+* cooldown   - at most one request per ``cooldown_minutes``.
+
+Triggers are queued and written by ``flush()`` in one batch; equipment
+that already has an open (or recent) request for the rule is skipped, so
+requests are deduplicated across processes too.
+
+Rules on the ``health`` metric watch ``Equipment.health``; other metrics
+are evaluated against raw telemetry readings.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import assignment, events, flow, kpis, oee, reliability, search, versions
+from .models import Equipment, HealthRule, MaintenanceRequest
+
+HEALTH_METRIC = 'health'
+
+CLOSED_STAGES = ('Repaired', 'Scrap')
+
+
+class RuleState:
+    __slots__ = ('streak', 'latched', 'fired_at')
+
+    def __init__(self):
+        self.streak = 0
+        self.latched = False
+        self.fired_at = None
+
+
+class RuleEngine:
+    def __init__(self):
+        self.rules = {}      # (category id or None, metric) -> [HealthRule]
+        self.metrics = set()
+        self.equipment = {}  # equipment id -> (category id, team id, name); None if scrapped or missing
+        self.state = {}      # (equipment id, rule id) -> RuleState
+        self.pending = {}    # (equipment id, rule id) -> (HealthRule, value, time)
+        self.loaded_at = None
+
+    def load(self):
+        """
+        (Re)load rules and drop cached equipment profiles. Debounce and
+        latch state survives for rules that still exist.
+        """
+        rules = {}
+        for rule in HealthRule.objects.filter(is_active=True):
+            rules.setdefault((rule.category_id, rule.metric), []).append(rule)
+        self.rules = rules
+        self.metrics = {metric for _, metric in rules}
+        rule_ids = {rule.pk for group in rules.values() for rule in group}
+        self.state = {key: state for key, state in self.state.items() if key[1] in rule_ids}
+        self.equipment = {}
+        self.loaded_at = time.monotonic()
+
+    def load_equipment(self, ids):
+        missing = [pk for pk in ids if pk not in self.equipment]
+        if not missing:
+            return
+        self.equipment.update(dict.fromkeys(missing))
+        rows = Equipment.objects.filter(pk__in=missing).values_list(
+            'pk', 'category_id', 'maintenance_team_id', 'name', 'is_scrapped',
+        )
+        for pk, category_id, team_id, name, is_scrapped in rows:
+            if not is_scrapped:
+                self.equipment[pk] = (category_id, team_id, name)
+
+    def evaluate_many(self, values, now=None):
+        """
+        Evaluate ``(equipment id, metric, value)`` tuples in order and queue
+        any triggers. Returns the number of queued triggers.
+        """
+        now = now or timezone.now()
+        values = [row for row in values if row[1] in self.metrics]
+        if values:
+            self.load_equipment({row[0] for row in values})
+            for equipment_id, metric, value in values:
+                self.evaluate(equipment_id, metric, value, now)
+        return len(self.pending)
+
+    def evaluate(self, equipment_id, metric, value, now):
+        profile = self.equipment.get(equipment_id)
+        if profile is None:
+            return
+        category_id = profile[0]
+        for rule in self.rules.get((None, metric), ()):
+            self.step(equipment_id, rule, value, now)
+        if category_id is not None:
+            for rule in self.rules.get((category_id, metric), ()):
+                self.step(equipment_id, rule, value, now)
+
+    def step(self, equipment_id, rule, value, now):
+        key = (equipment_id, rule.pk)
+        clear = rule.threshold if rule.clear_threshold is None else rule.clear_threshold
+        if rule.comparison == 'above':
+            breach, cleared = value > rule.threshold, value <= clear
+        else:
+            breach, cleared = value < rule.threshold, value >= clear
+
+        state = self.state.get(key)
+        if state is None:
+            if not breach:
+                return  # no state is kept for healthy pairs
+            state = self.state[key] = RuleState()
+
+        if state.latched:
+            if cleared:
+                state.latched = False
+                state.streak = 0
+            return
+        if not breach:
+            if state.fired_at is None:
+                del self.state[key]
+            else:
+                state.streak = 0
+            return
+
+        state.streak += 1
+        if state.streak < rule.trigger_after:
+            return
+        if state.fired_at is not None and now - state.fired_at < timedelta(minutes=rule.cooldown_minutes):
+            return
+        state.latched = True
+        state.fired_at = now
+        self.pending[key] = (rule, value, now)
+
+    def flush(self):
+        """
+        Open a Corrective request for every queued trigger that has no open
+        request (or one inside the rule's cooldown) yet. Returns the
+        created requests.
+        """
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return []
+
+        now = max(at for _, _, at in pending.values())
+        longest = max(rule.cooldown_minutes for rule, _, _ in pending.values())
+        blocked = set()
+        existing = (
+            MaintenanceRequest.objects
+            .filter(rule_id__in={rule_id for _, rule_id in pending},
+                    equipment_id__in={equipment_id for equipment_id, _ in pending})
+            .filter(~Q(stage__in=CLOSED_STAGES) | Q(created_at__gte=now - timedelta(minutes=longest)))
+            .values_list('equipment_id', 'rule_id', 'stage', 'created_at')
+        )
+        for equipment_id, rule_id, stage, created_at in existing:
+            rule = pending.get((equipment_id, rule_id), (None,))[0]
+            if rule is None:
+                continue
+            if stage not in CLOSED_STAGES or now - created_at < timedelta(minutes=rule.cooldown_minutes):
+                blocked.add((equipment_id, rule_id))
+
+        requests = []
+        for key, (rule, value, at) in pending.items():
+            profile = self.equipment.get(key[0])
+            if key in blocked or profile is None:
+                continue
+            _, team_id, name = profile
+            requests.append(MaintenanceRequest(
+                subject=f"{rule.name}: {name}"[:200],
+                equipment_id=key[0],
+                request_type='Corrective',
+                priority=rule.priority,
+                scheduled_date=at,
+                team_id=team_id,
+                created_by_id=rule.created_by_id,
+                instructions=describe(rule, value),
+                rule=rule,
+            ))
+        if not requests:
+            return []
+
+        entered_at = timezone.now()
+        for req in requests:
+            req.stage_entered_at = entered_at
+            if assignment.assign(req) is not None:
+                assignment.record_change(None, (req.assigned_to_id, req.stage, req.duration))
+        MaintenanceRequest.objects.bulk_create(requests)
+        # bulk_create bypasses the model signals
+        flow.record_created(requests)
+        search.index_requests(requests)
+        events.publish_created_cards(requests)
+        kpis.invalidate()
+        versions.bump(MaintenanceRequest)
+        reliability.schedule([req.equipment_id for req in requests])
+        oee.schedule([req.equipment_id for req in requests], since=timezone.localdate(min(req.created_at for req in requests)))
+        return requests
+
+
+def describe(rule, value):
+    return (
+        f"Opened automatically by health rule '{rule.name}': "
+        f"{rule.metric} {value:g} is {rule.comparison} the threshold of {rule.threshold:g}."
+    )
+
+
+_engine = None
+_lock = threading.RLock()
+
+
+def get_engine():
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = RuleEngine()
+        max_age = getattr(settings, 'GEARGUARD_RULES_MAX_AGE', 300)
+        if _engine.loaded_at is None or time.monotonic() - _engine.loaded_at > max_age:
+            _engine.load()
+        return _engine
+
+
+def reset():
+    """
+    Reload rules and equipment profiles on next use (evaluation state is kept).
+    """
+    with _lock:
+        if _engine is not None:
+            _engine.loaded_at = None
+
+
+def clear():
+    """
+    Drop the engine entirely, including debounce and latch state.
+    """
+    global _engine
+    with _lock:
+        _engine = None
+
+
+def forget(equipment_ids):
+    with _lock:
+        if _engine is not None:
+            for pk in equipment_ids:
+                _engine.equipment.pop(pk, None)
+
+
+def evaluate(values, now=None):
+    """
+    Evaluate ``(equipment id, metric, value)`` tuples and open requests for
+    any triggered rules. Returns the created requests.
+    """
+    with _lock:
+        engine = get_engine()
+        if not engine.evaluate_many(values, now):
+            return []
+        return engine.flush()
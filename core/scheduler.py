@@ -0,0 +1,120 @@
+"""
+Preventive maintenance scheduler.
+
+Materializes MaintenancePlan occurrences into MaintenanceRequest rows over
+a rolling horizon, written with ``bulk_create``. Each plan records the
+latest occurrence it generated (``generated_until``) and later runs only
+generate past it, so re-running is idempotent and cheap, and a generated
+request that was rescheduled or deleted is not created again. Equipment
+joining a category plan gets the occurrences after that mark.
+
+Usage plans are projected onto the calendar at the plan's expected
+operating hours per day; no usage data feeds them.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import assignment, events, flow, kpis, search, versions
+from .models import Equipment, MaintenancePlan, MaintenanceRequest
+
+
+def occurrences(plan, window_start, window_end):
+    """
+    Yield the plan's occurrence datetimes within [window_start, window_end].
+    """
+    interval = plan.interval()
+    if interval is None or interval <= timedelta(0):
+        return
+    step = 0
+    if plan.start_date < window_start:
+        step = math.ceil((window_start - plan.start_date) / interval)
+    when = plan.start_date + step * interval
+    while when <= window_end:
+        yield when
+        step += 1
+        when = plan.start_date + step * interval
+
+
+def targets(plan):
+    """
+    Return ``[(equipment_id, work_center_id, team_id), ...]`` for a plan.
+    """
+    if plan.work_center_id:
+        return [(None, plan.work_center_id, plan.team_id)]
+    equipment = Equipment.objects.filter(is_scrapped=False)
+    if plan.equipment_id:
+        equipment = equipment.filter(pk=plan.equipment_id)
+    else:
+        equipment = equipment.filter(category_id=plan.category_id)
+    return [
+        (equipment_id, None, plan.team_id or team_id)
+        for equipment_id, team_id in equipment.values_list('pk', 'maintenance_team_id').iterator(chunk_size=5000)
+    ]
+
+
+def generate(horizon_days=90, now=None, batch_size=2000):
+    """
+    Create missing preventive requests for every active plan up to
+    ``horizon_days`` ahead. Returns ``{'plans', 'created', 'existing'}``.
+    """
+    now = now or timezone.now()
+    window_end = now + timedelta(days=horizon_days)
+    stats = {'plans': 0, 'created': 0, 'existing': 0}
+
+    for plan in MaintenancePlan.objects.filter(is_active=True).order_by('pk').iterator():
+        stats['plans'] += 1
+        dates = list(occurrences(plan, now, window_end))
+        done = [when for when in dates if plan.generated_until and when <= plan.generated_until]
+        dates = dates[len(done):]
+        if not dates and not done:
+            continue
+        plan_targets = targets(plan)
+        stats['existing'] += len(done) * len(plan_targets)
+        if not dates or not plan_targets:
+            continue
+
+        pending = []
+        with transaction.atomic():
+            for equipment_id, work_center_id, team_id in plan_targets:
+                for when in dates:
+                    pending.append(MaintenanceRequest(
+                        subject=plan.subject or plan.name,
+                        request_type='Preventive',
+                        priority=plan.priority,
+                        instructions=plan.instructions,
+                        equipment_id=equipment_id,
+                        work_center_id=work_center_id,
+                        team_id=team_id,
+                        scheduled_date=when,
+                        created_by_id=plan.created_by_id,
+                        plan=plan,
+                    ))
+                    if len(pending) >= batch_size:
+                        stats['created'] += _write(pending)
+                        pending = []
+            stats['created'] += _write(pending)
+            MaintenancePlan.objects.filter(pk=plan.pk).update(generated_until=dates[-1])
+
+    if stats['created']:
+        kpis.invalidate()
+        assignment.reset()
+        versions.bump(MaintenanceRequest)
+    return stats
+
+
+def _write(batch):
+    if not batch:
+        return 0
+    entered_at = timezone.now()
+    for req in batch:
+        req.stage_entered_at = entered_at
+    with transaction.atomic():
+        created = MaintenanceRequest.objects.bulk_create(batch)
+        # bulk_create bypasses the model signals
+        flow.record_created(created)
+        search.index_requests(created)
+        events.publish_created_cards(created)
+    return len(created)
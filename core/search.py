@@ -0,0 +1,323 @@
+"""
+Full-text search over equipment and maintenance requests.
+
+Documents live in a single ``core_search_index`` table whose row id
+encodes the object kind and primary key, so upserts and deletes are
+primary-key operations. The storage engine is pluggable:
+
+* ``SQLiteFTSBackend`` - FTS5 virtual table ranked with bm25 (default on SQLite)
+* ``PostgresBackend``  - ``tsvector`` column with a GIN index ranked with ts_rank
+* ``SimpleBackend``    - ``icontains`` fallback for other databases
+
+Select one with ``GEARGUARD_SEARCH_BACKEND`` (``'auto'`` picks by database
+vendor, or give a dotted path to a backend class).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Equipment, MaintenanceLog, MaintenanceRequest
+
+TABLE = 'core_search_index'
+
+KINDS = {
+    'equipment': 0,
+    'request': 1,
+}
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return _token_re.findall(query or '')
+
+
+def doc_id(kind, pk):
+    return pk * len(KINDS) + KINDS[kind]
+
+
+def object_id(doc):
+    return doc // len(KINDS)
+
+
+# --- Documents ---
+
+def equipment_document(equipment):
+    title = f"{equipment.name} {equipment.serial_number}"
+    body = ' '.join(filter(None, [equipment.department, equipment.location, equipment.description]))
+    return title, body
+
+
+def request_document(req, comments=None, equipment_name=None):
+    """
+    Build a request document. ``comments`` and ``equipment_name`` can be
+    passed in by bulk callers to avoid a query per request.
+    """
+    if comments is None:
+        comments = req.logs.values_list('comment', flat=True)
+    if equipment_name is None:
+        equipment_name = req.equipment.name if req.equipment_id else ''
+    body = ' '.join(filter(None, [req.instructions, equipment_name, *comments]))
+    return req.subject, body
+
+
+# --- Backends ---
+
+class SearchBackend:
+    def index(self, kind, rows):
+        """
+        Upsert documents. ``rows`` is an iterable of ``(pk, title, body)``.
+        """
+        raise NotImplementedError
+
+    def remove(self, kind, pks):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, kind, query, limit):
+        """
+        Return primary keys of ``kind`` matching ``query``, best first.
+        """
+        raise NotImplementedError
+
+    def filter_matches(self, queryset, kind, tokens):
+        """
+        Restrict ``queryset`` to every document of ``kind`` matching all
+        ``tokens``, in one query.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    def index(self, kind, rows):
+        rows = [(doc_id(kind, pk), KINDS[kind], title, body) for pk, title, body in rows]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(f"INSERT INTO {TABLE} (rowid, kind, title, body) VALUES (%s, %s, %s, %s)", rows)
+
+    def remove(self, kind, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(doc_id(kind, pk),) for pk in pks])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    @staticmethod
+    def _match(tokens):
+        # Every token must match, each as a prefix: "pump"* "hyd"*
+        return ' '.join('"%s"*' % token for token in tokens)
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        match = self._match(tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s "
+                f"ORDER BY bm25({TABLE}, 0.0, 10.0, 1.0) LIMIT %s",
+                [match, KINDS[kind], limit],
+            )
+            return [object_id(row[0]) for row in cursor.fetchall()]
+
+    def filter_matches(self, queryset, kind, tokens):
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid / {len(KINDS)} FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s",
+            [self._match(tokens), KINDS[kind]],
+        ))
+
+
+class PostgresBackend(SearchBackend):
+    def index(self, kind, rows):
+        rows = [(doc_id(kind, pk), KINDS[kind], title, body) for pk, title, body in rows]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (id, kind, title, body) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body",
+                rows,
+            )
+
+    def remove(self, kind, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE id = ANY(%s)", [[doc_id(kind, pk) for pk in pks]])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {TABLE}")
+
+    @staticmethod
+    def _tsquery(tokens):
+        return ' & '.join('%s:*' % token for token in tokens)
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        tsquery = self._tsquery(tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {TABLE}, to_tsquery('simple', %s) query "
+                "WHERE kind = %s AND document @@ query "
+                "ORDER BY ts_rank(document, query) DESC LIMIT %s",
+                [tsquery, KINDS[kind], limit],
+            )
+            return [object_id(row[0]) for row in cursor.fetchall()]
+
+    def filter_matches(self, queryset, kind, tokens):
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT id / {len(KINDS)} FROM {TABLE} WHERE kind = %s AND document @@ to_tsquery('simple', %s)",
+            [KINDS[kind], self._tsquery(tokens)],
+        ))
+
+
+class SimpleBackend(SearchBackend):
+    """
+    No index: filters the models directly. Correct but unranked and slow.
+    """
+    def index(self, kind, rows):
+        pass
+
+    def remove(self, kind, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    @staticmethod
+    def _matching(kind, tokens):
+        if kind == 'equipment':
+            qs = Equipment.objects.all()
+            fields = ['name', 'serial_number', 'department', 'location', 'description']
+        else:
+            qs = MaintenanceRequest.objects.all()
+            fields = ['subject', 'instructions', 'equipment__name', 'logs__comment']
+        for token in tokens:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': token})
+            qs = qs.filter(condition)
+        return qs.values_list('pk', flat=True).distinct()
+
+    def search(self, kind, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return list(self._matching(kind, tokens)[:limit])
+
+    def filter_matches(self, queryset, kind, tokens):
+        return queryset.filter(pk__in=self._matching(kind, tokens))
+
+
+_backends = {}
+
+
+def get_backend():
+    path = getattr(settings, 'GEARGUARD_SEARCH_BACKEND', 'auto')
+    if path == 'auto':
+        path = {
+            'sqlite': 'core.search.SQLiteFTSBackend',
+            'postgresql': 'core.search.PostgresBackend',
+        }.get(connection.vendor, 'core.search.SimpleBackend')
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+# --- Public API ---
+
+def search(kind, query, limit=None):
+    if limit is None:
+        limit = getattr(settings, 'GEARGUARD_SEARCH_LIMIT', 500)
+    return get_backend().search(kind, query, limit)
+
+
+def filter_matches(queryset, kind, query):
+    """
+    Restrict ``queryset`` to every search hit, unranked. Unlike
+    ``search()`` this is not capped at ``GEARGUARD_SEARCH_LIMIT``, for
+    exports, filters and keyset-paged lists that must see all matches.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+    return get_backend().filter_matches(queryset, kind, tokens)
+
+
+def filter_ranked(queryset, kind, query, limit=None):
+    """
+    Restrict ``queryset`` to the best ``limit`` search hits, ordered by
+    relevance.
+    """
+    ids = search(kind, query, limit)
+    if not ids:
+        return queryset.none()
+    ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+    return queryset.filter(pk__in=ids).order_by(ranking)
+
+
+def index_equipment(equipment_list):
+    get_backend().index('equipment', [(e.pk, *equipment_document(e)) for e in equipment_list])
+
+
+def index_requests(requests):
+    """
+    Index requests, fetching log comments and equipment names in bulk.
+    """
+    requests = list(requests)
+    if not requests:
+        return
+    ids = [req.pk for req in requests]
+    comments = {}
+    for request_id, comment in MaintenanceLog.objects.filter(request_id__in=ids).values_list('request_id', 'comment'):
+        comments.setdefault(request_id, []).append(comment)
+    equipment_names = dict(
+        Equipment.objects.filter(pk__in={req.equipment_id for req in requests if req.equipment_id})
+        .values_list('pk', 'name')
+    )
+    get_backend().index('request', [
+        (req.pk, *request_document(req, comments.get(req.pk, []), equipment_names.get(req.equipment_id, '')))
+        for req in requests
+    ])
+
+
+def remove(kind, pks):
+    get_backend().remove(kind, list(pks))
+
+
+def rebuild(chunk_size=2000):
+    """
+    Rebuild the whole index. Returns ``(equipment_count, request_count)``.
+    """
+    backend = get_backend()
+    backend.clear()
+    counts = []
+    for queryset, indexer in (
+        (Equipment.objects.order_by('pk'), index_equipment),
+        (MaintenanceRequest.objects.order_by('pk'), index_requests),
+    ):
+        count = 0
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                # One transaction per chunk: in autocommit mode every
+                # executemany() row would be committed (and synced) alone
+                with transaction.atomic():
+                    indexer(chunk)
+                count += len(chunk)
+                chunk = []
+        with transaction.atomic():
+            indexer(chunk)
+        counts.append(count + len(chunk))
+    return tuple(counts)
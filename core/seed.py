@@ -0,0 +1,252 @@
+"""
+Synthetic plant data for load tests and benchmarks.
+
+``seed_plant()`` creates categories, work centers, teams with technicians,
+equipment, maintenance requests and logs with ``bulk_create`` in chunks,
+from a seeded random generator so runs are reproducible. It can be called
+repeatedly to grow an existing data set: equipment serial numbers and
+usernames continue from what is already there.
+"""
+import math
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from . import assignment, autofill, flow, kpis, oee, reliability, search, versions
+from .models import (
+    Equipment, EquipmentCategory, MaintenanceLog, MaintenanceRequest, MaintenanceTeam, Technician, WorkCenter,
+)
+
+# category -> (serial prefix, maintenance team)
+CATEGORIES = {
+    'CNC Machines': ('CNC', 'Mechanics'),
+    'Hydraulic Presses': ('HPR', 'Mechanics'),
+    'Conveyors': ('CNV', 'Mechanics'),
+    'Pumps': ('PMP', 'Mechanics'),
+    'Compressors': ('CMP', 'Mechanics'),
+    'Electrical Panels': ('ELP', 'Electricians'),
+    'Generators': ('GEN', 'Electricians'),
+    'Industrial Robots': ('ROB', 'Robotics'),
+    'HVAC Units': ('HVC', 'HVAC'),
+    'Forklifts': ('FLT', 'Mechanics'),
+    'Computers': ('PC', 'IT Support'),
+    'Printers': ('PRN', 'IT Support'),
+}
+
+TEAMS = ('Mechanics', 'Electricians', 'Robotics', 'HVAC', 'IT Support')
+
+DEPARTMENTS = ('Machining', 'Assembly', 'Packaging', 'Warehouse', 'Utilities', 'Quality', 'Office')
+
+FAULTS = (
+    'Unusual noise', 'Oil leak', 'Overheating', 'Does not start', 'Vibration above limit',
+    'Sensor fault', 'Belt worn', 'Pressure drop', 'Intermittent power loss', 'Calibration drift',
+)
+
+CHECKS = ('Lubrication', 'Filter replacement', 'Safety inspection', 'Calibration', 'Belt tension check')
+
+COMMENTS = (
+    'Inspected on site.', 'Waiting for spare parts.', 'Replaced the worn component.',
+    'Tested under load, running normally.', 'Escalated to the vendor.', 'Cleaned and re-lubricated.',
+)
+
+PRIORITY_WEIGHTS = (('Low', 30), ('Medium', 45), ('High', 20), ('Critical', 5))
+
+CHUNK_SIZE = 5000
+
+
+def chunks(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def seed_plant(equipment=1000, requests=10000, logs_per_request=0.5, technicians_per_team=8,
+               seed=42, now=None, index=True, progress=None):
+    """
+    Add ``equipment`` machines and ``requests`` maintenance requests (with
+    about ``logs_per_request`` logs each) to the database. Returns the
+    number of rows created per model.
+    """
+    rng = random.Random(seed)
+    now = now or timezone.now()
+    progress = progress or (lambda message: None)
+    counts = {}
+    started = time.perf_counter()
+
+    planner, _ = User.objects.get_or_create(username='planner', defaults={'first_name': 'Plant', 'last_name': 'Planner'})
+
+    categories = {}
+    for name in CATEGORIES:
+        categories[name], _ = EquipmentCategory.objects.get_or_create(name=name)
+    teams = {}
+    for name in TEAMS:
+        teams[name], _ = MaintenanceTeam.objects.get_or_create(name=name)
+
+    members = _seed_technicians(teams, technicians_per_team, counts)
+    work_centers = _seed_work_centers(max(3, equipment // 200), counts)
+    progress(f"reference data ready ({time.perf_counter() - started:.1f}s)")
+
+    equipment_rows = _seed_equipment(rng, equipment, categories, teams, work_centers, now, counts)
+    progress(f"{counts['equipment']} equipment ({time.perf_counter() - started:.1f}s)")
+
+    if not equipment_rows:
+        equipment_rows = list(Equipment.objects.values_list('pk', 'maintenance_team_id'))
+    if equipment_rows:
+        _seed_requests(rng, requests, logs_per_request, equipment_rows, members, planner, now, counts)
+    progress(f"{counts.get('requests', 0)} requests, {counts.get('logs', 0)} logs ({time.perf_counter() - started:.1f}s)")
+
+    # bulk_create bypasses the model signals
+    if index:
+        search.rebuild()
+        progress(f"search index rebuilt ({time.perf_counter() - started:.1f}s)")
+    kpis.invalidate()
+    assignment.reset()
+    autofill.forget()
+    versions.bump(MaintenanceTeam, Technician, EquipmentCategory, WorkCenter, Equipment, MaintenanceRequest, User)
+    flow.backfill()
+    flow.refresh()
+    reliability.refresh()
+    oee.refresh()
+    progress(f"stage flow, reliability and OEE refreshed ({time.perf_counter() - started:.1f}s)")
+    return counts
+
+
+def _seed_technicians(teams, per_team, counts):
+    """
+    Ensure every team has ``per_team`` technicians. Returns
+    ``{team id: [user id, ...]}``.
+    """
+    members = {}
+    created = 0
+    for name, team in teams.items():
+        slug = name.lower().replace(' ', '_')
+        users = []
+        for number in range(1, per_team + 1):
+            user, was_created = User.objects.get_or_create(
+                username=f'{slug}_{number}', defaults={'first_name': name, 'last_name': f'Tech {number}'},
+            )
+            if was_created:
+                Technician.objects.create(user=user, team=team)
+                created += 1
+            users.append(user)
+        team.members.add(*users)
+        members[team.pk] = [user.pk for user in users]
+    counts['technicians'] = created
+    return members
+
+
+def _seed_work_centers(count, counts):
+    existing = set(WorkCenter.objects.values_list('code', flat=True))
+    new = [
+        WorkCenter(name=f'Line {number}', code=f'WC-{number:03d}', cost_per_hour=40 + number % 7 * 5,
+                   efficiency=90.0, oee_target=85.0)
+        for number in range(1, count + 1) if f'WC-{number:03d}' not in existing
+    ]
+    WorkCenter.objects.bulk_create(new)
+    counts['work_centers'] = len(new)
+    return list(WorkCenter.objects.values_list('pk', flat=True))
+
+
+def _seed_equipment(rng, count, categories, teams, work_centers, now, counts):
+    offset = Equipment.objects.count()
+    names = list(CATEGORIES)
+    today = now.date()
+
+    def build(number):
+        category = names[number % len(names)]
+        prefix, team = CATEGORIES[category]
+        purchased = today - timedelta(days=rng.randrange(30, 3650))
+        # Most machines are healthy; a tail is degraded
+        health = max(0, min(100, int(rng.gauss(82, 15))))
+        return Equipment(
+            name=f'{category.rstrip("s")} {number + 1}',
+            serial_number=f'{prefix}-{number + 1:07d}',
+            category=categories[category],
+            work_center_id=rng.choice(work_centers),
+            department=rng.choice(DEPARTMENTS),
+            location=f'Hall {rng.randrange(1, 9)}, Bay {rng.randrange(1, 40)}',
+            purchase_date=purchased,
+            warranty_expiry=purchased + timedelta(days=730),
+            maintenance_team=teams[team],
+            health=health,
+            is_scrapped=health < 5 and rng.random() < 0.5,
+        )
+
+    rows = []
+    for chunk in chunks(build(number) for number in range(offset, offset + count)):
+        with transaction.atomic():
+            Equipment.objects.bulk_create(chunk)
+        rows.extend((obj.pk, obj.maintenance_team_id) for obj in chunk)
+    counts['equipment'] = len(rows)
+    return rows
+
+
+def _seed_requests(rng, count, logs_per_request, equipment_rows, members, planner, now, counts):
+    priorities = [code for code, _ in PRIORITY_WEIGHTS]
+    weights = [weight for _, weight in PRIORITY_WEIGHTS]
+    counts['requests'] = counts['logs'] = 0
+
+    def build(_):
+        equipment_id, team_id = rng.choice(equipment_rows)
+        # Two years of history and two months of upcoming work
+        scheduled = now + timedelta(hours=rng.randrange(-2 * 365 * 24, 60 * 24))
+        preventive = rng.random() < 0.4
+        if scheduled > now:
+            stage = 'New'
+        else:
+            stage = rng.choices(['Repaired', 'Scrap', 'In Progress', 'New'], [88, 1, 6, 5])[0]
+        team_members = members.get(team_id) or []
+        return MaintenanceRequest(
+            subject=rng.choice(CHECKS) if preventive else rng.choice(FAULTS),
+            equipment_id=equipment_id,
+            request_type='Preventive' if preventive else 'Corrective',
+            stage=stage,
+            priority=rng.choices(priorities, weights)[0],
+            scheduled_date=scheduled,
+            duration=round(rng.uniform(0.5, 8), 1) if stage in ('Repaired', 'Scrap') else 0.0,
+            assigned_to_id=rng.choice(team_members) if team_members and rng.random() < 0.9 else None,
+            team_id=team_id,
+            created_by=planner,
+        )
+
+    for chunk in chunks(build(number) for number in range(count)):
+        with transaction.atomic():
+            MaintenanceRequest.objects.bulk_create(chunk)
+            # auto_now(_add) stamps every row with the current time; spread
+            # them out so the board's recently-closed window stays realistic
+            created_at = Least(F('scheduled_date') - timedelta(days=7), Value(now))
+            updated_at = Least(F('scheduled_date') + timedelta(hours=4), Value(now))
+            MaintenanceRequest.objects.filter(pk__in=[req.pk for req in chunk]).update(
+                created_at=created_at,
+                updated_at=updated_at,
+                stage_entered_at=Case(When(stage='New', then=created_at), default=updated_at),
+            )
+            logs = []
+            for req in chunk:
+                for _ in range(_poisson(rng, logs_per_request)):
+                    logs.append(MaintenanceLog(
+                        request_id=req.pk, comment=rng.choice(COMMENTS),
+                        created_by_id=req.assigned_to_id or planner.pk,
+                    ))
+            MaintenanceLog.objects.bulk_create(logs)
+        counts['requests'] += len(chunk)
+        counts['logs'] += len(logs)
+
+
+def _poisson(rng, mean):
+    # Knuth's method; means here are small
+    if mean <= 0:
+        return 0
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
@@ -1,14 +1,396 @@
-from django.db.models.signals import post_save
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import MaintenanceRequest
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .models import (
+    Equipment, EquipmentCategory, HealthRule, MaintenanceLog, MaintenanceRequest, MaintenanceTeam, Technician,
+    WorkCenter,
+)
+from . import assignment, autofill, events, flow, kpis, metrics, oee, reliability, rules, search, sqlite, tasks, versions
+
+@tasks.task(max_attempts=5)
+def mark_equipment_scrapped(equipment_id):
+    equipment = Equipment.objects.filter(pk=equipment_id).first()
+    if equipment and not equipment.is_scrapped:
+        equipment.is_scrapped = True
+        equipment.save()
 
 @receiver(post_save, sender=MaintenanceRequest)
 def check_scrap_condition(sender, instance, created, **kwargs):
     """
     If a request is moved to 'Scrap', mark the equipment as scrapped.
     """
-    if instance.stage == 'Scrap':
-        equipment = instance.equipment
-        if not equipment.is_scrapped:
-            equipment.is_scrapped = True
-            equipment.save()
+    if instance.stage == 'Scrap' and instance.equipment_id:
+        mark_equipment_scrapped.enqueue(instance.equipment_id, key=f'scrap:{instance.equipment_id}')
+
+
+@receiver([post_save, post_delete], sender=MaintenanceRequest)
+@receiver([post_save, post_delete], sender=Equipment)
+@receiver([post_save, post_delete], sender=Technician)
+def invalidate_kpis(sender, **kwargs):
+    """
+    Mark the dashboard KPI snapshot stale; it is rebuilt on the next read.
+    """
+    kpis.invalidate()
+
+
+# --- Loaded values ---
+#
+# The post_save handlers below act on what changed since an instance was
+# loaded or last saved, so each instance keeps one snapshot of the fields
+# they compare. It is read from __dict__ so deferred fields are not
+# fetched: a field the query left out is absent from the snapshot, and
+# the handlers treat it as unknown. It is refreshed by refresh_snapshot,
+# connected after every other post_save handler at the end of this module.
+
+SNAPSHOT_FIELDS = {
+    MaintenanceRequest: (
+        'stage', 'stage_entered_at', 'assigned_to_id', 'equipment_id', 'work_center_id', 'request_type', 'duration',
+    ),
+    Equipment: ('health', *autofill.TRACKED),
+    WorkCenter: ('planned_hours_per_day',),
+    EquipmentCategory: ('name',),
+    MaintenanceTeam: ('name',),
+}
+
+def _snapshot(sender, instance):
+    fields = instance.__dict__
+    return {name: fields[name] for name in SNAPSHOT_FIELDS[sender] if name in fields}
+
+@receiver(post_init, sender=MaintenanceRequest)
+@receiver(post_init, sender=Equipment)
+@receiver(post_init, sender=WorkCenter)
+@receiver(post_init, sender=EquipmentCategory)
+@receiver(post_init, sender=MaintenanceTeam)
+def take_snapshot(sender, instance, **kwargs):
+    # A new instance has nothing stored to compare against
+    instance._loaded = _snapshot(sender, instance) if instance.pk else {}
+
+
+# --- Version stamps (core/versions.py) ---
+
+@receiver([post_save, post_delete], sender=Equipment)
+@receiver([post_save, post_delete], sender=EquipmentCategory)
+@receiver([post_save, post_delete], sender=WorkCenter)
+@receiver([post_save, post_delete], sender=MaintenanceTeam)
+@receiver([post_save, post_delete], sender=MaintenanceRequest)
+@receiver([post_save, post_delete], sender=Technician)
+@receiver([post_save, post_delete], sender=User)
+def bump_version(sender, update_fields=None, **kwargs):
+    # Logging in saves last_login, which no cached page shows
+    if sender is User and update_fields == frozenset({'last_login'}):
+        return
+    versions.bump(sender)
+
+
+# --- Search index ---
+
+@tasks.task
+def reindex_equipment_requests(equipment_id):
+    search.index_requests(MaintenanceRequest.objects.filter(equipment_id=equipment_id))
+
+@receiver(post_save, sender=Equipment)
+def index_equipment(sender, instance, **kwargs):
+    search.index_equipment([instance])
+    # Request documents embed the equipment name
+    previous = instance._loaded.get('name')
+    if previous is not None and previous != instance.name:
+        reindex_equipment_requests.enqueue(instance.pk, key=f'reindex-requests:{instance.pk}')
+
+@receiver(post_save, sender=MaintenanceRequest)
+def index_request(sender, instance, **kwargs):
+    search.index_requests([instance])
+
+@receiver([post_save, post_delete], sender=MaintenanceLog)
+def index_log(sender, instance, **kwargs):
+    req = MaintenanceRequest.objects.filter(pk=instance.request_id).first()
+    if req:
+        search.index_requests([req])
+
+@receiver(post_delete, sender=Equipment)
+def unindex_equipment(sender, instance, **kwargs):
+    search.remove('equipment', [instance.pk])
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def unindex_request(sender, instance, **kwargs):
+    search.remove('request', [instance.pk])
+
+
+# --- Technician load index ---
+
+def _load_state(fields):
+    if 'assigned_to_id' not in fields or 'stage' not in fields:
+        return None
+    return (fields['assigned_to_id'], fields['stage'], fields.get('duration') or 0.0)
+
+@receiver(post_save, sender=MaintenanceRequest)
+def update_technician_load(sender, instance, created, update_fields=None, **kwargs):
+    previous, state = _load_state(instance._loaded), _load_state(instance.__dict__)
+    if state is None or (not created and previous is None):
+        assignment.reset()
+    else:
+        assignment.record_change(None if created else previous, state)
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def release_technician_load(sender, instance, **kwargs):
+    assignment.record_change(_load_state(instance._loaded), None)
+
+@receiver([post_save, post_delete], sender=Technician)
+def technicians_changed(sender, **kwargs):
+    assignment.reset()
+
+@receiver(m2m_changed, sender=MaintenanceTeam.members.through)
+def team_members_changed(sender, **kwargs):
+    assignment.reset()
+
+
+# --- Health rules ---
+
+@receiver(post_save, sender=Equipment)
+def evaluate_health_rules(sender, instance, created, **kwargs):
+    rules.forget([instance.pk])
+    health = instance.__dict__.get('health')
+    if health is not None and (created or health != instance._loaded.get('health')):
+        rules.evaluate([(instance.pk, rules.HEALTH_METRIC, health)])
+
+@receiver(post_delete, sender=Equipment)
+def forget_equipment_rules(sender, instance, **kwargs):
+    rules.forget([instance.pk])
+
+@receiver([post_save, post_delete], sender=HealthRule)
+def health_rules_changed(sender, **kwargs):
+    rules.reset()
+
+
+# --- Stage transitions (core/flow.py) ---
+
+@receiver(pre_save, sender=MaintenanceRequest)
+def stamp_stage_change(sender, instance, **kwargs):
+    instance._flow_transition = None
+    stage = instance.__dict__.get('stage')
+    if stage is None:
+        return
+    if instance._state.adding:
+        previous, entered_at = flow.CREATED, None
+    else:
+        previous, entered_at = instance._loaded.get('stage'), instance._loaded.get('stage_entered_at')
+        if previous is None or stage == previous:
+            # Unchanged, or not loaded so there is nothing to diff against
+            return
+    now = timezone.now()
+    instance._flow_transition = (previous, entered_at, now)
+    instance.stage_entered_at = now
+
+@receiver(post_save, sender=MaintenanceRequest)
+def record_stage_change(sender, instance, **kwargs):
+    transition, instance._flow_transition = getattr(instance, '_flow_transition', None), None
+    if transition is None:
+        return
+    previous, entered_at, at = transition
+    flow.record([flow.transition(instance, previous, entered_at, at)])
+
+@receiver(pre_delete, sender=MaintenanceRequest)
+def remember_flow_days(sender, instance, **kwargs):
+    # The transitions go with the request; their days need rebuilding
+    instance._flow_days = {timezone.localdate(at) for at in instance.transitions.values_list('at', flat=True)}
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def forget_stage_changes(sender, instance, **kwargs):
+    if getattr(instance, '_flow_days', None):
+        flow.schedule(instance._flow_days)
+
+
+# --- Reliability summaries (core/reliability.py) ---
+
+RELIABILITY_FIELDS = ('equipment_id', 'work_center_id', 'request_type', 'stage', 'duration')
+
+def _reliability_state(fields):
+    """
+    What the summaries depend on: the asset, whether the request is a
+    failure, whether it is repaired and, once it is, its duration.
+    """
+    if any(name not in fields for name in RELIABILITY_FIELDS):
+        return None
+    repaired = fields['stage'] == reliability.REPAIRED
+    return (
+        fields['equipment_id'], fields['work_center_id'], fields['request_type'] == reliability.FAILURE,
+        repaired, fields['duration'] if repaired else None,
+    )
+
+@receiver(post_save, sender=MaintenanceRequest)
+def refresh_reliability(sender, instance, created, **kwargs):
+    previous, state = _reliability_state(instance._loaded), _reliability_state(instance.__dict__)
+    if state is not None and state == previous:
+        return
+    # A new request counts once it is a failure or has been repaired
+    if created and state is not None and not (state[2] or state[3]):
+        return
+    reliability.schedule_for([previous, state or (instance.equipment_id, instance.work_center_id)])
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def forget_reliability(sender, instance, **kwargs):
+    reliability.schedule_for([(instance.equipment_id, instance.work_center_id)])
+
+
+# --- OEE buckets (core/oee.py) ---
+
+def _oee_state(fields):
+    """
+    What the buckets depend on: the target, whether the request is a
+    stop, whether it is closed and, once a preventive one is repaired,
+    its duration.
+    """
+    if any(name not in fields for name in RELIABILITY_FIELDS):
+        return None
+    failure = fields['request_type'] == oee.FAILURE
+    repaired = fields['request_type'] == oee.PREVENTIVE and fields['stage'] == oee.REPAIRED
+    return (
+        fields['equipment_id'], fields['work_center_id'], failure,
+        fields['stage'] in oee.CLOSED_STAGES, fields['duration'] if repaired else None,
+    )
+
+def _schedule_oee(instance, states):
+    created_at = instance.__dict__.get('created_at')
+    since = timezone.localdate(created_at) if created_at else None
+    equipment_ids, work_center_ids = set(), set()
+    for state in states:
+        if state is None:
+            continue
+        if state[0]:
+            equipment_ids.add(state[0])
+        else:
+            work_center_ids.add(state[1])
+    oee.schedule(equipment_ids, work_center_ids, since)
+
+@receiver(post_save, sender=MaintenanceRequest)
+def refresh_oee(sender, instance, created, **kwargs):
+    previous, state = _oee_state(instance._loaded), _oee_state(instance.__dict__)
+    if state is not None and state == previous:
+        return
+    # A new request costs time once it is a stop or repaired preventive work
+    if created and state is not None and not (state[2] or state[4]):
+        return
+    _schedule_oee(instance, [previous, state or (instance.equipment_id, instance.work_center_id)])
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def forget_oee(sender, instance, **kwargs):
+    _schedule_oee(instance, [(instance.equipment_id, instance.work_center_id)])
+
+@receiver(post_save, sender=Equipment)
+def move_equipment_downtime(sender, instance, created, **kwargs):
+    work_center_id, previous = instance.__dict__.get('work_center_id'), instance._loaded.get('work_center_id')
+    # New equipment has no requests yet
+    if not created and previous != work_center_id and 'work_center_id' in instance.__dict__:
+        oee.schedule(work_center_ids=[previous, work_center_id])
+
+@receiver(post_save, sender=WorkCenter)
+def replan_work_center(sender, instance, created, **kwargs):
+    planned = instance.__dict__.get('planned_hours_per_day')
+    if planned is not None and (created or planned != instance._loaded.get('planned_hours_per_day')):
+        oee.schedule(work_center_ids=[instance.pk])
+
+
+# --- Equipment auto-fill (core/autofill.py) ---
+
+def _autofill_state(fields):
+    return tuple(fields.get(name) for name in autofill.TRACKED)
+
+def _equipment_in(sender, pk):
+    field = 'category_id' if sender is EquipmentCategory else 'maintenance_team_id'
+    return Equipment.objects.filter(**{field: pk}).values_list('pk', flat=True)
+
+@receiver(post_save, sender=Equipment)
+def record_equipment_change(sender, instance, created, **kwargs):
+    if created or _autofill_state(instance.__dict__) != _autofill_state(instance._loaded):
+        autofill.record([instance.pk])
+
+@receiver(post_delete, sender=Equipment)
+def record_equipment_removal(sender, instance, **kwargs):
+    autofill.record([instance.pk])
+
+@receiver(post_save, sender=EquipmentCategory)
+@receiver(post_save, sender=MaintenanceTeam)
+def record_group_rename(sender, instance, created, **kwargs):
+    name = instance.__dict__.get('name')
+    if not created and name is not None and name != instance._loaded.get('name'):
+        autofill.record(_equipment_in(sender, instance.pk))
+
+@receiver(pre_delete, sender=EquipmentCategory)
+@receiver(pre_delete, sender=MaintenanceTeam)
+def record_group_removal(sender, instance, **kwargs):
+    # Before the equipment is set to NULL, which sends no signals
+    autofill.record(_equipment_in(sender, instance.pk))
+
+
+# --- SQLite tuning ---
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    sqlite.configure(connection)
+
+
+# --- Eager tasks (core/tasks.py) ---
+
+@receiver(request_started)
+def defer_eager_tasks(sender, **kwargs):
+    tasks.defer()
+
+
+@receiver(request_finished)
+def run_eager_tasks(sender, **kwargs):
+    # Sent once the response has gone out (HttpResponse.close())
+    tasks.run_deferred()
+
+
+# --- Request metrics (core/metrics.py) ---
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    metrics.install_query_counter(connection)
+
+
+# --- Live updates (core/events.py) ---
+
+@receiver(post_save, sender=MaintenanceRequest)
+def publish_card(sender, instance, created, **kwargs):
+    previous = instance._loaded.get('stage')
+    if created:
+        def data():
+            card = {'id': instance.pk, 'stage': instance.stage, 'from': None}
+            # Only render for open boards; replayed creations just bump counts
+            if events.bus.has_subscribers(events.BOARD):
+                card['html'] = render_to_string('core/kanban_card.html', {'req': instance})
+            return card
+        events.publish_on_commit(events.BOARD, 'card', data)
+    elif previous is not None and previous != instance.stage:
+        events.publish_on_commit(events.BOARD, 'card', {'id': instance.pk, 'stage': instance.stage, 'from': previous})
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def publish_card_removed(sender, instance, **kwargs):
+    events.publish_on_commit(events.BOARD, 'card_removed', {'id': instance.pk, 'stage': instance.stage})
+
+@receiver(post_save, sender=MaintenanceLog)
+def publish_log(sender, instance, created, **kwargs):
+    if not created:
+        return
+    topic = events.request_topic(instance.request_id)
+    events.publish_on_commit(topic, 'log', lambda: {
+        'id': instance.pk,
+        'request': instance.request_id,
+        'html': render_to_string('core/log_entry.html', {'log': instance}),
+    })
+
+
+# --- Loaded values, refreshed ---
+
+@receiver(post_save, sender=MaintenanceRequest)
+@receiver(post_save, sender=Equipment)
+@receiver(post_save, sender=WorkCenter)
+@receiver(post_save, sender=EquipmentCategory)
+@receiver(post_save, sender=MaintenanceTeam)
+def refresh_snapshot(sender, instance, **kwargs):
+    # Connected last, so every handler above compared against the old values
+    instance._loaded = _snapshot(sender, instance)
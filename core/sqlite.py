@@ -0,0 +1,81 @@
+"""
+Opt-in SQLite tuning for single-node deployments.
+
+With ``GEARGUARD_SQLITE_TUNING = True`` every new SQLite connection is
+configured with ``GEARGUARD_SQLITE_PRAGMAS`` (WAL journal, relaxed
+fsync, memory-mapped reads, a larger page cache and a busy timeout), so
+readers no longer block the writer and a waiting writer retries instead
+of failing with "database is locked".
+
+WAL alone does not help read-then-write transactions: a deferred
+transaction that read before another connection committed cannot be
+upgraded to a write lock and fails at once, without waiting on the busy
+timeout. ``serialized_write()`` wraps the hot write paths (Kanban moves
+and maintenance logs) so they take the write lock up front with
+``BEGIN IMMEDIATE``, queueing behind a per-process lock rather than
+spinning on the database file.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable across application crashes; only an OS crash or power loss
+    # can roll back the last transactions
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+_write_lock = threading.RLock()
+
+
+def enabled():
+    return getattr(settings, 'GEARGUARD_SQLITE_TUNING', False)
+
+
+def pragmas():
+    return {**DEFAULT_PRAGMAS, **getattr(settings, 'GEARGUARD_SQLITE_PRAGMAS', {})}
+
+
+def configure(connection):
+    """
+    Apply the tuning PRAGMAs to a freshly opened SQLite connection.
+    """
+    if connection.vendor != 'sqlite' or not enabled():
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def serialized_write(using=DEFAULT_DB_ALIAS):
+    """
+    ``transaction.atomic()`` for write paths. With SQLite tuning on, the
+    outermost block begins with ``BEGIN IMMEDIATE`` while holding a
+    per-process lock; otherwise it is a plain atomic block.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not enabled() or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    with _write_lock:
+        connection.ensure_connection()
+        previous = connection.transaction_mode
+        connection.transaction_mode = 'IMMEDIATE'
+        try:
+            with transaction.atomic(using=using):
+                # BEGIN has been issued; nested blocks use savepoints
+                connection.transaction_mode = previous
+                yield
+        finally:
+            connection.transaction_mode = previous
@@ -0,0 +1,279 @@
+"""
+Database-backed background tasks.
+
+A function decorated with ``@task`` is queued with
+``func.enqueue(*args, key=None, delay=0, **kwargs)``. The call is stored
+as a ``core.models.Task`` row inside the caller's transaction, so it is
+queued only if the write that caused it commits, and ``manage.py
+run_worker`` picks it up from there. A failing task is retried with
+exponential backoff until ``max_attempts``, then marked failed with its
+traceback.
+
+Arguments must be JSON-serializable: pass primary keys, not instances.
+A ``key`` makes enqueueing idempotent: while a task with the same key is
+queued, further calls are dropped. A call made while it is already
+running queues one more run, so the task sees the change that asked for it.
+
+With ``GEARGUARD_TASKS_EAGER`` (on by default, off in the production
+profile) tasks run inline when enqueued, so development and tests need
+no worker. Tasks enqueued while serving a request wait until the
+response has been sent (the ``request_finished`` signal, see
+core/signals.py): the client does not wait for them, the view's query
+budget covers the view alone, and a failing task is logged instead of
+turning a committed write into an error response.
+
+Workers claim tasks with a conditional UPDATE, so any number of them can
+share the table. A task left running longer than
+``GEARGUARD_TASKS_TIMEOUT`` (its worker died) is queued again.
+"""
+import contextvars
+import logging
+import statistics
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger('gearguard.tasks')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_registry = {}
+
+# Eager calls held back until the end of the current request
+_deferred = contextvars.ContextVar('gearguard_deferred_tasks', default=None)
+
+
+def eager():
+    return getattr(settings, 'GEARGUARD_TASKS_EAGER', True)
+
+
+def timeout():
+    """
+    Seconds after which a running task is presumed lost and queued again.
+    """
+    return getattr(settings, 'GEARGUARD_TASKS_TIMEOUT', 300)
+
+
+def retention():
+    """
+    How long finished tasks are kept.
+    """
+    return timedelta(days=getattr(settings, 'GEARGUARD_TASKS_RETENTION_DAYS', 7))
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, key=None, delay=0, **kwargs):
+        """
+        Queue a call. Returns the Task, or None if it ran eagerly or a
+        task with ``key`` is already queued.
+        """
+        if eager():
+            deferred = _deferred.get()
+            if deferred is None:
+                self.func(*args, **kwargs)
+            elif key is None or key not in deferred:
+                deferred[key if key is not None else object()] = (self, args, kwargs)
+            return None
+        try:
+            # A savepoint, so a duplicate key does not break the caller's transaction
+            with transaction.atomic():
+                return Task.objects.create(
+                    name=self.name, args=list(args), kwargs=kwargs, key=key,
+                    max_attempts=self.max_attempts,
+                    run_after=timezone.now() + timedelta(seconds=delay),
+                )
+        except IntegrityError:
+            if key is None:
+                raise
+            return None
+
+
+def defer():
+    """
+    Hold back the eager tasks of the current request until ``run_deferred()``.
+    """
+    _deferred.set({})
+
+
+def run_deferred():
+    """
+    Run the eager tasks held back by ``defer()``, in order. Failures are
+    logged: the response they belong to has already been sent.
+    """
+    calls = _deferred.get()
+    _deferred.set(None)
+    for func, args, kwargs in (calls or {}).values():
+        try:
+            func.func(*args, **kwargs)
+        except Exception:
+            logger.exception("Eager task %s failed after its request", func.name)
+
+
+def task(func=None, *, name=None, max_attempts=3, retry_delay=10):
+    """
+    Register ``func`` as a task. Retries wait ``retry_delay`` seconds,
+    doubling after each failed attempt.
+    """
+    def register(func):
+        wrapped = TaskFunction(func, name or f'{func.__module__}.{func.__qualname__}', max_attempts, retry_delay)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+    return register(func) if func is not None else register
+
+
+def requeue_lost(now=None):
+    now = now or timezone.now()
+    lost = Task.objects.filter(status=RUNNING, started_at__lt=now - timedelta(seconds=timeout()))
+    queued_keys = Task.objects.filter(status=QUEUED, key__isnull=False).values('key')
+    # A queued task with the same key will do the work
+    lost.filter(key__in=queued_keys).update(status=FAILED, finished_at=now, last_error='Lost by its worker')
+    # So will the first of several lost tasks sharing a key: only one may be queued
+    first = lost.filter(key__isnull=False).values('key').annotate(first=Min('pk')).values('first')
+    lost.filter(key__isnull=False).exclude(pk__in=first).update(status=FAILED, finished_at=now, last_error='Lost by its worker')
+    return lost.update(status=QUEUED, run_after=now)
+
+
+def claim(limit, now=None):
+    """
+    Mark up to ``limit`` due tasks as running for this worker and return them.
+    """
+    now = now or timezone.now()
+    due = list(
+        Task.objects.filter(status=QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in due
+        # Another worker may have taken it since
+        if Task.objects.filter(pk=pk, status=QUEUED).update(status=RUNNING, started_at=now, attempts=F('attempts') + 1)
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_after', 'id'))
+
+
+def run(task):
+    func = _registry.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task '{task.name}'")
+        with transaction.atomic():
+            func.func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if task.attempts < task.max_attempts:
+            delay = (func.retry_delay if func else 10) * 2 ** (task.attempts - 1)
+            logger.warning("Task %s #%s failed (attempt %s), retrying in %ss", task.name, task.pk, task.attempts, delay)
+            try:
+                Task.objects.filter(pk=task.pk).update(
+                    status=QUEUED, run_after=now + timedelta(seconds=delay), last_error=error,
+                )
+                return False
+            except IntegrityError:
+                # The same key was queued again meanwhile; that run retries
+                pass
+        else:
+            logger.error("Task %s #%s failed after %s attempts", task.name, task.pk, task.attempts)
+        Task.objects.filter(pk=task.pk).update(status=FAILED, finished_at=now, last_error=error)
+        return False
+    Task.objects.filter(pk=task.pk).update(status=DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def run_pending(limit=10):
+    """
+    Run up to ``limit`` due tasks. Returns how many were run.
+    """
+    requeue_lost()
+    claimed = claim(limit)
+    for task in claimed:
+        run(task)
+    return len(claimed)
+
+
+def prune(now=None):
+    """
+    Delete tasks that finished longer ago than the retention period.
+    """
+    now = now or timezone.now()
+    return Task.objects.filter(status__in=[DONE, FAILED], finished_at__lt=now - retention()).delete()[0]
+
+
+# --- Metrics ---
+
+def stats(window=300, now=None):
+    """
+    Queue depth by task and status, the age of the oldest due task, and
+    wait/run time percentiles over tasks finished in the last ``window``
+    seconds.
+    """
+    now = now or timezone.now()
+    depth = {
+        (row['name'], row['status']): row['count']
+        for row in Task.objects.values('name', 'status').annotate(count=Count('id'))
+    }
+    oldest = Task.objects.filter(status=QUEUED, run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    recent = Task.objects.filter(status=DONE, finished_at__gte=now - timedelta(seconds=window)).values_list(
+        'run_after', 'started_at', 'finished_at',
+    )[:5000]
+    waits, runs = [], []
+    for run_after, started_at, finished_at in recent:
+        waits.append(max(0.0, (started_at - run_after).total_seconds()))
+        runs.append((finished_at - started_at).total_seconds())
+    return {
+        'depth': depth,
+        'oldest_due_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+        'wait_seconds': _quantiles(waits),
+        'run_seconds': _quantiles(runs),
+    }
+
+
+def _quantiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {0.5: value, 0.95: value}
+    cuts = statistics.quantiles(samples, n=20)
+    return {0.5: statistics.median(samples), 0.95: cuts[18]}
+
+
+def render_metrics(window=300):
+    """
+    ``stats()`` in the Prometheus text format.
+    """
+    current = stats(window)
+    lines = [
+        '# HELP gearguard_tasks Tasks in the queue table.',
+        '# TYPE gearguard_tasks gauge',
+    ]
+    lines.extend(
+        f'gearguard_tasks{{name="{name}",status="{status}"}} {count}'
+        for (name, status), count in sorted(current['depth'].items())
+    )
+    lines += [
+        '# HELP gearguard_task_oldest_due_seconds Age of the oldest task waiting for a worker.',
+        '# TYPE gearguard_task_oldest_due_seconds gauge',
+        f"gearguard_task_oldest_due_seconds {current['oldest_due_seconds']:.3f}",
+    ]
+    for series, help_text in (('wait_seconds', 'Time from due to picked up'), ('run_seconds', 'Run time')):
+        name = f'gearguard_task_{series}'
+        lines.append(f'# HELP {name} {help_text}, tasks finished in the last {window}s.')
+        lines.append(f'# TYPE {name} summary')
+        lines.extend(f'{name}{{quantile="{q}"}} {value:.6f}' for q, value in current[series].items())
+    return '\n'.join(lines) + '\n'
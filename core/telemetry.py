@@ -0,0 +1,254 @@
+"""
+Equipment telemetry: ingestion, rollups, health updates and retention.
+
+Readings are appended to ``TelemetryReading`` in batches. ``rollup()``
+downsamples them into minute buckets, minute buckets into hours and hours
+into days (``TelemetryRollup``), upserting each bucket so re-runs over
+the same window are idempotent. The latest minute average of the
+``health`` metric becomes ``Equipment.health``. ``prune()`` enforces the
+per-level retention from ``GEARGUARD_TELEMETRY_RETENTION``.
+"""
+import json
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import kpis, rules, versions
+from .models import Equipment, TelemetryReading, TelemetryRollup
+
+HEALTH_METRIC = 'health'
+
+BUCKETS = ('minute', 'hour', 'day')
+
+MAX_REPORTED_ERRORS = 100
+
+
+def batch_size():
+    return getattr(settings, 'GEARGUARD_TELEMETRY_BATCH_SIZE', 5000)
+
+
+def retention():
+    defaults = {'raw': 7, 'minute': 30, 'hour': 365, 'day': None}
+    return {**defaults, **getattr(settings, 'GEARGUARD_TELEMETRY_RETENTION', {})}
+
+
+# --- Ingestion ---
+
+def parse_payload(body):
+    """
+    Accept a JSON array, ``{"readings": [...]}`` or NDJSON (one reading
+    per line). Raises ValueError for malformed input.
+    """
+    text = body.decode() if isinstance(body, bytes) else body
+    try:
+        data = json.loads(text)
+    except ValueError:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        if isinstance(data, dict):
+            data = data['readings'] if 'readings' in data else [data]
+        if not isinstance(data, list):
+            raise ValueError('Expected readings')
+        records = data
+    # Other bad fields reject their reading; these would break the batch lookups
+    if any(isinstance(r, dict) and r.get('serial') is not None and not isinstance(r['serial'], str) for r in records):
+        raise ValueError('Expected a string serial')
+    return records
+
+
+def ingest(records, now=None):
+    """
+    Validate and append readings. Each record has ``equipment`` (id) or
+    ``serial``, an optional ``metric`` (default ``health``), a numeric
+    ``value`` and an optional ISO ``ts`` (default now).
+
+    Non-health readings are passed to the health rules (health rules
+    watch ``Equipment.health``, which the rollup updates).
+
+    Returns ``{'accepted', 'rejected', 'triggered', 'errors': [(index, message)]}``.
+    """
+    now = now or timezone.now()
+    result = {'accepted': 0, 'rejected': 0, 'triggered': 0, 'errors': []}
+    records = list(records)
+
+    serials = {r.get('serial') for r in records if isinstance(r, dict) and r.get('serial')}
+    ids = {r.get('equipment') for r in records if isinstance(r, dict) and isinstance(r.get('equipment'), int)}
+    by_serial = dict(Equipment.objects.filter(serial_number__in=serials).values_list('serial_number', 'pk'))
+    known_ids = set(Equipment.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    readings = []
+    for position, record in enumerate(records):
+        try:
+            readings.append(_build_reading(record, by_serial, known_ids, now))
+        except (KeyError, TypeError, ValueError) as exc:
+            result['rejected'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append((position, str(exc) or type(exc).__name__))
+
+    TelemetryReading.objects.bulk_create(readings, batch_size=batch_size())
+    result['accepted'] = len(readings)
+
+    readings.sort(key=lambda reading: reading.recorded_at)
+    triggered = rules.evaluate(
+        (reading.equipment_id, reading.metric, reading.value)
+        for reading in readings if reading.metric != HEALTH_METRIC
+    )
+    result['triggered'] = len(triggered)
+    return result
+
+
+def _build_reading(record, by_serial, known_ids, now):
+    if not isinstance(record, dict):
+        raise ValueError('Reading must be an object')
+    if record.get('serial'):
+        equipment_id = by_serial.get(record['serial'])
+    else:
+        equipment_id = record.get('equipment')
+        if equipment_id not in known_ids:
+            equipment_id = None
+    if equipment_id is None:
+        raise ValueError('Unknown equipment')
+
+    value = record['value']
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('value must be a number')
+    # json.loads() accepts NaN, Infinity and integers beyond a float; the
+    # column and the health rollup do not
+    try:
+        finite = math.isfinite(value)
+    except OverflowError:
+        finite = False
+    if not finite:
+        raise ValueError('value must be finite')
+
+    metric = str(record.get('metric') or HEALTH_METRIC)[:32]
+
+    recorded_at = now
+    if record.get('ts'):
+        recorded_at = parse_datetime(str(record['ts']))
+        if recorded_at is None:
+            raise ValueError('Invalid ts')
+        if timezone.is_naive(recorded_at):
+            recorded_at = timezone.make_aware(recorded_at)
+
+    return TelemetryReading(equipment_id=equipment_id, metric=metric, value=float(value), recorded_at=recorded_at)
+
+
+# --- Rollups ---
+
+def floor(moment, bucket):
+    # Match Trunc(), which truncates in the current time zone
+    moment = timezone.localtime(moment).replace(second=0, microsecond=0)
+    if bucket in ('hour', 'day'):
+        moment = moment.replace(minute=0)
+    if bucket == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _aggregate(bucket, start):
+    """
+    Aggregate the level below ``bucket`` from ``start`` into bucket rows.
+    """
+    if bucket == 'minute':
+        return (
+            TelemetryReading.objects.filter(recorded_at__gte=start)
+            .values('equipment_id', 'metric', start_at=Trunc('recorded_at', 'minute'))
+            .annotate(n=Count('id'), low=Min('value'), high=Max('value'), total=Sum('value'))
+        )
+    source = BUCKETS[BUCKETS.index(bucket) - 1]
+    return (
+        TelemetryRollup.objects.filter(bucket=source, bucket_start__gte=start)
+        .values('equipment_id', 'metric', start_at=Trunc('bucket_start', bucket))
+        .annotate(n=Sum('count'), low=Min('min_value'), high=Max('max_value'), total=Sum('sum_value'))
+    )
+
+
+def rollup(since=None, now=None):
+    """
+    Recompute every bucket that overlaps ``[since, now]`` (default: the
+    configured lookback) and update equipment health. Returns the number
+    of buckets written per level.
+    """
+    now = now or timezone.now()
+    if since is None:
+        since = now - timedelta(minutes=getattr(settings, 'GEARGUARD_TELEMETRY_LOOKBACK_MINUTES', 120))
+
+    written = {}
+    latest_health = {}
+    with transaction.atomic():
+        for bucket in BUCKETS:
+            rows = [
+                TelemetryRollup(
+                    equipment_id=row['equipment_id'], metric=row['metric'], bucket=bucket,
+                    bucket_start=row['start_at'], count=row['n'],
+                    min_value=row['low'], max_value=row['high'], sum_value=row['total'],
+                )
+                for row in _aggregate(bucket, floor(since, bucket)).order_by()
+            ]
+            TelemetryRollup.objects.bulk_create(
+                rows,
+                batch_size=batch_size(),
+                update_conflicts=True,
+                unique_fields=['equipment', 'metric', 'bucket', 'bucket_start'],
+                update_fields=['count', 'min_value', 'max_value', 'sum_value'],
+            )
+            written[bucket] = len(rows)
+
+            if bucket == 'minute':
+                for rollup_row in rows:
+                    if rollup_row.metric != HEALTH_METRIC:
+                        continue
+                    current = latest_health.get(rollup_row.equipment_id)
+                    if current is None or rollup_row.bucket_start > current.bucket_start:
+                        latest_health[rollup_row.equipment_id] = rollup_row
+
+        apply_health({pk: row.avg_value for pk, row in latest_health.items()})
+    return written
+
+
+def apply_health(values):
+    """
+    Write ``{equipment_id: health}`` to Equipment, clamped to 0-100, only
+    where it changed, and evaluate the health rules for the changes.
+    Returns the updated Equipment instances.
+    """
+    if not values:
+        return []
+    changed = []
+    for equipment in Equipment.objects.filter(pk__in=values).only('id', 'health'):
+        health = max(0, min(100, int(round(values[equipment.pk]))))
+        if equipment.health != health:
+            equipment.health = health
+            changed.append(equipment)
+    Equipment.objects.bulk_update(changed, ['health'], batch_size=batch_size())
+    if changed:
+        # bulk_update bypasses the model signals
+        kpis.invalidate()
+        versions.bump(Equipment)
+        rules.evaluate((equipment.pk, rules.HEALTH_METRIC, equipment.health) for equipment in changed)
+    return changed
+
+
+def prune(now=None):
+    """
+    Delete raw readings and rollups past their retention. Returns the
+    number of rows deleted per level.
+    """
+    now = now or timezone.now()
+    deleted = {}
+    for level, days in retention().items():
+        if not days:
+            continue
+        cutoff = now - timedelta(days=days)
+        if level == 'raw':
+            deleted[level] = TelemetryReading.objects.filter(recorded_at__lt=cutoff).delete()[0]
+        else:
+            deleted[level] = TelemetryRollup.objects.filter(bucket=level, bucket_start__lt=cutoff).delete()[0]
+    return deleted
@@ -1,3 +1,1442 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from . import (
+    assignment, autofill, board, events, flow, importers, kpis, lookups, metrics, oee, pagination, reliability, routers, rules, scheduler,
+    search, seed, sqlite, tasks, telemetry, versions,
+)
+from .middleware import ReplicaRoutingMiddleware
+
+from .models import (
+    Equipment, EquipmentCategory, EquipmentChange, HealthRule, MaintenanceLog, MaintenancePlan, MaintenanceRequest, MaintenanceTeam,
+    OeeBucket, ReliabilitySummary, StageFlow, StageTransition, Task, Technician, TelemetryReading, TelemetryRollup, WorkCenter,
+)
+
+
+class RequestEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner')
+        cls.team = MaintenanceTeam.objects.create(name='Mechanics')
+        cls.work_center = WorkCenter.objects.create(name='Press Line', code='PL1')
+        cls.equipment = Equipment.objects.create(
+            name='Press', serial_number='P-1', department='Stamping', location='Hall A',
+            work_center=cls.work_center,
+        )
+
+        def make(day, **kwargs):
+            return MaintenanceRequest.objects.create(
+                subject=f'Check {day}', created_by=cls.user,
+                scheduled_date=datetime(2026, 3, day, 9, tzinfo=dt_timezone.utc), **kwargs
+            )
+
+        cls.inside = make(10, team=cls.team, priority='Critical')
+        cls.on_equipment = make(12, equipment=cls.equipment)
+        cls.outside = make(28)
+
+    def get(self, **params):
+        params.setdefault('start', '2026-03-01T00:00:00+00:00')
+        params.setdefault('end', '2026-03-20')
+        response = self.client.get(reverse('request_events'), params)
+        self.assertEqual(response.status_code, 200)
+        return [event['title'] for event in response.json()]
+
+    def test_window(self):
+        self.assertEqual(self.get(), ['Check 10', 'Check 12'])
+
+    def test_filters(self):
+        self.assertEqual(self.get(team=self.team.pk), ['Check 10'])
+        self.assertEqual(self.get(priority='Critical,High'), ['Check 10'])
+        self.assertEqual(self.get(work_center=self.work_center.pk), ['Check 12'])
+
+    def test_invalid_range(self):
+        response = self.client.get(reverse('request_events'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(GEARGUARD_BOARD_PAGE_SIZE=2, GEARGUARD_BOARD_CLOSED_DAYS=30)
+class KanbanBoardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tech', password='x')
+        for i in range(5):
+            MaintenanceRequest.objects.create(subject=f'New {i}', created_by=cls.user)
+        MaintenanceRequest.objects.create(subject='Fixed', stage='Repaired', created_by=cls.user)
+        old = MaintenanceRequest.objects.create(subject='Fixed long ago', stage='Repaired', created_by=cls.user)
+        MaintenanceRequest.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=90))
+
+    def test_board_queries_do_not_scale_with_stages(self):
+        with CaptureQueriesContext(connection) as ctx:
+            columns = board.build_board(board.board_queryset())
+        self.assertEqual(len(ctx.captured_queries), 2)
+        by_stage = {code: (cards, total, cursor) for _, cards, code, total, cursor in columns}
+        self.assertEqual([c.subject for c in by_stage['New'][0]], ['New 4', 'New 3'])
+        self.assertEqual(by_stage['New'][1], 5)
+        self.assertEqual(by_stage['Repaired'][1], 1)
+        self.assertIsNone(by_stage['Repaired'][2])
+
+    def test_history_includes_old_closed_requests(self):
+        columns = board.build_board(board.board_queryset(include_history=True))
+        self.assertEqual({code: total for _, _, code, total, _ in columns}['Repaired'], 2)
+
+    def test_column_endpoint_pages_through_cards(self):
+        self.client.force_login(self.user)
+        url = reverse('request_board_column')
+        cursor = board.build_board(board.board_queryset())[0][4]
+        seen = []
+        while cursor:
+            data = self.client.get(url, {'stage': 'New', 'cursor': cursor}).json()
+            seen += [card['id'] for card in data['cards']]
+            cursor = data['next']
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(self.client.get(url, {'stage': 'New', 'cursor': 'bogus'}).status_code, 400)
+
+    @override_settings(GEARGUARD_SEARCH_LIMIT=2)
+    def test_search_filter_counts_every_match(self):
+        columns = board.build_board(board.board_queryset('new'))
+        self.assertEqual({code: total for _, _, code, total, _ in columns}['New'], 5)
+
+    def test_kanban_page_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('request_list'))
+        self.assertContains(response, 'New 4')
+        self.assertNotContains(response, 'Fixed long ago')
+
+
+@override_settings(GEARGUARD_KPI_ASYNC_REFRESH=False)
+class DashboardKpiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('manager')
+        self.equipment = Equipment.objects.create(
+            name='Lathe', serial_number='L-1', department='Machining', location='Hall B', health=20,
+        )
+        MaintenanceRequest.objects.create(
+            subject='Overdue', created_by=self.user, scheduled_date=timezone.now() - timedelta(days=1),
+        )
+        MaintenanceRequest.objects.create(subject='Pending', created_by=self.user)
+        MaintenanceRequest.objects.create(subject='Done', stage='Repaired', created_by=self.user)
+
+    def test_snapshot_counts(self):
+        snapshot = kpis.get_snapshot()
+        self.assertEqual(snapshot['critical_count'], 1)
+        self.assertEqual(snapshot['open_count'], 2)
+        self.assertEqual(snapshot['overdue_count'], 1)
+        self.assertEqual(snapshot['pending_count'], 1)
+
+    def test_signals_refresh_stale_snapshot(self):
+        kpis.get_snapshot()
+        with CaptureQueriesContext(connection) as ctx:
+            kpis.get_snapshot()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        MaintenanceRequest.objects.create(subject='Another', created_by=self.user)
+        # The stale snapshot is served while the refresh runs; with the
+        # refresh inline the following read sees the new value.
+        kpis.get_snapshot()
+        self.assertEqual(kpis.get_snapshot()['open_count'], 3)
+
+    def test_dashboard_reports_freshness(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, '1 Units')
+        self.assertIn('X-KPI-Snapshot-Age', response)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher')
+        cls.pump = Equipment.objects.create(
+            name='Hydraulic Pump', serial_number='HP-100', department='Utilities', location='Basement',
+        )
+        cls.press = Equipment.objects.create(
+            name='Press', serial_number='PR-200', department='Stamping', location='Hall A',
+            description='Hydraulic seals replaced in 2024',
+        )
+        cls.req = MaintenanceRequest.objects.create(subject='Oil leak', equipment=cls.pump, created_by=cls.user)
+
+    def test_prefix_and_ranking(self):
+        # Name hits rank above description hits
+        self.assertEqual(search.search('equipment', 'hydr'), [self.pump.pk, self.press.pk])
+        self.assertEqual(search.search('equipment', 'hydr hall'), [self.press.pk])
+        self.assertEqual(search.search('equipment', 'HP-100'), [self.pump.pk])
+
+    def test_signals_keep_index_in_sync(self):
+        MaintenanceLog.objects.create(request=self.req, comment='Gasket swapped', created_by=self.user)
+        self.assertEqual(search.search('request', 'gasket'), [self.req.pk])
+
+        self.pump.name = 'Coolant Pump'
+        self.pump.save()
+        self.assertEqual(search.search('request', 'coolant'), [self.req.pk])
+
+        self.req.delete()
+        self.assertEqual(search.search('request', 'gasket'), [])
+
+    def test_rebuild(self):
+        search.get_backend().clear()
+        self.assertEqual(search.search('equipment', 'press'), [])
+        self.assertEqual(search.rebuild(), (2, 1))
+        self.assertEqual(search.search('equipment', 'press'), [self.press.pk])
+
+    def test_equipment_list_uses_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('equipment_list'), {'q': 'basement'})
+        self.assertContains(response, 'HP-100')
+        self.assertNotContains(response, 'PR-200')
+
+
+@override_settings(GEARGUARD_EQUIPMENT_PAGE_SIZE=2)
+class EquipmentListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer')
+        for i, health in enumerate([90, 40, 40, 75, 10]):
+            Equipment.objects.create(
+                name=f'Unit {i}', serial_number=f'U-{i}', department='Assembly', location='Hall C', health=health,
+            )
+
+    def test_keyset_pages_cover_every_row_once(self):
+        qs = Equipment.objects.all()
+        rows, next_cursor, prev_cursor = pagination.paginate(qs, 'health', descending=True, limit=2)
+        self.assertIsNone(prev_cursor)
+        seen = [e.serial_number for e in rows]
+        while next_cursor:
+            rows, next_cursor, prev_cursor = pagination.paginate(qs, 'health', True, cursor=next_cursor, limit=2)
+            seen += [e.serial_number for e in rows]
+        self.assertEqual(seen, ['U-0', 'U-3', 'U-2', 'U-1', 'U-4'])
+
+        back, _, _ = pagination.paginate(qs, 'health', True, cursor=prev_cursor, limit=2, backwards=True)
+        self.assertEqual([e.serial_number for e in back], ['U-2', 'U-1'])
+
+    def test_malformed_cursors_are_rejected(self):
+        for raw in ('{"a": 1, "b": 2}', '7', '[1, 2, 3]', '["soon", 1]', '[null, 1]', '[1, "x"]'):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.assertRaises(ValueError, msg=raw):
+                pagination.paginate(MaintenanceLog.objects.all(), 'created_at', cursor=cursor)
+
+    def test_list_is_paginated(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('equipment_list'), {'sort': '-health'})
+        self.assertEqual([e.serial_number for e in response.context['equipments']], ['U-0', 'U-3'])
+        response = self.client.get(reverse('equipment_list'), {'sort': '-health', 'after': response.context['next_cursor']})
+        self.assertEqual([e.serial_number for e in response.context['equipments']], ['U-2', 'U-1'])
+
+    def test_exports_stream_every_row(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_data', args=['equipment', 'csv']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith('id,name,serial_number'))
+
+        MaintenanceRequest.objects.create(subject='Belt', created_by=self.user)
+        response = self.client.get(reverse('export_data', args=['requests', 'jsonl']))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('"subject": "Belt"', b''.join(response.streaming_content).decode())
+
+        self.assertEqual(self.client.get('/export/equipment.xml').status_code, 404)
+
+    @override_settings(GEARGUARD_SEARCH_LIMIT=3)
+    def test_search_filters_are_not_capped(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_data', args=['equipment', 'csv']), {'q': 'unit'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 6)
+
+        seen, params = [], {'q': 'unit', 'sort': 'name'}
+        while True:
+            response = self.client.get(reverse('equipment_list'), params)
+            seen += [e.serial_number for e in response.context['equipments']]
+            if not response.context['next_cursor']:
+                break
+            params['after'] = response.context['next_cursor']
+        self.assertEqual(seen, [f'U-{i}' for i in range(5)])
+
+
+class ImportTests(TestCase):
+    CSV = (
+        "serial_number,name,department,location,category,work_center,health\n"
+        "S-1,Robot Arm,Welding,Cell 1,Robotics,WC1,80\n"
+        "S-2,Conveyor,Logistics,Dock,Robotics,,\n"
+        "S-3,Mystery,Logistics,Dock,Unknown,,\n"
+        "S-2,Conveyor again,Logistics,Dock,,,\n"
+        ",No serial,Logistics,Dock,,,\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer')
+        EquipmentCategory.objects.create(name='Robotics')
+        WorkCenter.objects.create(name='Welding', code='WC1')
+        Equipment.objects.create(name='Old Arm', serial_number='S-1', department='Welding', location='Cell 9')
+
+    def run_import(self, **kwargs):
+        return importers.import_file(io.BytesIO(self.CSV.encode()), 'assets.csv', chunk_size=2, **kwargs)
+
+    def test_upsert_by_serial_with_row_errors(self):
+        report = self.run_import()
+        self.assertEqual((report.rows, report.created, report.updated), (5, 1, 1))
+        self.assertEqual([row for row, _ in report.errors], [4, 5, 6])
+        arm = Equipment.objects.get(serial_number='S-1')
+        self.assertEqual((arm.name, arm.location, arm.health, arm.work_center.code), ('Robot Arm', 'Cell 1', 80, 'WC1'))
+        self.assertEqual(Equipment.objects.get(serial_number='S-2').health, 100)
+        self.assertEqual(search.search('equipment', 'conveyor'), [Equipment.objects.get(serial_number='S-2').pk])
+
+    def test_field_validators_reject_rows(self):
+        self.CSV = (
+            "serial_number,name,department,location,health\n"
+            f"S-4,{'x' * 201},Logistics,Dock,50\n"
+            "S-5,Gauge,Logistics,Dock,500\n"
+            "S-6,Gauge,Logistics,Dock,-1\n"
+            "S-7,Gauge,Logistics,Dock,0\n"
+        )
+        report = self.run_import()
+        self.assertEqual(report.created, 1)
+        self.assertEqual([row for row, _ in report.errors], [2, 3, 4])
+        self.assertIn("'name': Ensure this value has at most 200 characters", report.errors[0][1])
+        self.assertIn("'health': Ensure this value is less than or equal to 100.", report.errors[1][1])
+        self.assertFalse(Equipment.objects.filter(serial_number__in=['S-4', 'S-5', 'S-6']).exists())
+
+    def test_blank_cells_keep_stored_values(self):
+        team = MaintenanceTeam.objects.create(name='Welders')
+        Equipment.objects.filter(serial_number='S-1').update(health=40, maintenance_team=team)
+        self.CSV = (
+            "serial_number,name,department,location,maintenance_team,health\n"
+            "S-1,Robot Arm,Welding,Cell 1,,\n"
+            "S-8,Gauge,Logistics,Dock,,\n"
+        )
+        report = self.run_import()
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        arm = Equipment.objects.get(serial_number='S-1')
+        self.assertEqual((arm.name, arm.health, arm.maintenance_team), ('Robot Arm', 40, team))
+        gauge = Equipment.objects.get(serial_number='S-8')
+        self.assertEqual((gauge.health, gauge.maintenance_team), (100, None))
+
+    def test_ambiguous_names_are_row_errors(self):
+        EquipmentCategory.objects.create(name='ROBOTICS')
+        report = self.run_import()
+        self.assertIn((2, "Ambiguous category 'Robotics': several match."), report.errors)
+
+    def test_choice_fields_are_checked(self):
+        class RequestImporter(importers.BaseImporter):
+            model = MaintenanceRequest
+            key = 'subject'
+            columns = {'subject': 'subject', 'priority': 'priority'}
+
+        importer = RequestImporter()
+        self.assertEqual(importer.build({'subject': 'Leak', 'priority': 'High'})[1]['priority'], 'High')
+        with self.assertRaisesMessage(ValidationError, "'priority': Value 'Urgent' is not a valid choice."):
+            importer.build({'subject': 'Leak', 'priority': 'Urgent'})
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(dry_run=True)
+        self.assertEqual(report.created, 1)
+        self.assertFalse(Equipment.objects.filter(serial_number='S-2').exists())
+        self.assertEqual(Equipment.objects.get(serial_number='S-1').name, 'Old Arm')
+
+    def test_upload_endpoint(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('wc.csv', b"code,name,cost_per_hour\nWC2,Paint,45.50\n")
+        response = self.client.post(reverse('equipment_import'), {'kind': 'work_centers', 'file': upload})
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertEqual(str(WorkCenter.objects.get(code='WC2').cost_per_hour), '45.50')
+
+
+class BulkStageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shift-lead')
+        cls.equipment = Equipment.objects.create(name='Saw', serial_number='SW-1', department='Wood', location='Shop')
+        cls.work_center = WorkCenter.objects.create(name='Paint', code='PB')
+        cls.first = MaintenanceRequest.objects.create(subject='Blade', equipment=cls.equipment, created_by=cls.user)
+        cls.second = MaintenanceRequest.objects.create(subject='Booth', work_center=cls.work_center, created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, moves):
+        return self.client.post(reverse('bulk_update_request_stage'), {'moves': moves}, content_type='application/json')
+
+    @override_settings(GEARGUARD_TASKS_EAGER=False)
+    def test_moves_are_applied_in_one_batch(self):
+        moves = [
+            {'id': self.first.pk, 'stage': 'In Progress'},
+            {'id': self.second.pk, 'stage': 'Scrap'},
+            {'id': self.first.pk, 'stage': 'Scrap'},
+            {'id': 999999, 'stage': 'New'},
+            {'id': self.second.pk, 'stage': 'Lost'},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.post(moves).json()
+        # session + user + savepoint, SELECT, UPDATE, UPDATE, INSERT of the
+        # transitions, a queued stage flow refresh (savepoint, INSERT,
+        # release), release, then one queued OEE refresh (the same three)
+        self.assertEqual(len(ctx.captured_queries), 14)
+        self.assertEqual(data['status'], 'partial')
+        self.assertEqual([r['status'] for r in data['results']], ['ok', 'ok', 'ok', 'error', 'error'])
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.stage, self.second.stage), ('Scrap', 'Scrap'))
+        self.equipment.refresh_from_db()
+        self.assertTrue(self.equipment.is_scrapped)
+
+    def test_rejects_malformed_payload(self):
+        self.assertEqual(self.post('nope').status_code, 400)
+
+
+class PreventiveSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner')
+        cls.team = MaintenanceTeam.objects.create(name='Hydraulics')
+        cls.category = EquipmentCategory.objects.create(name='Presses')
+        for i in range(3):
+            Equipment.objects.create(
+                name=f'Press {i}', serial_number=f'PR-{i}', department='Stamping', location='Hall A',
+                category=cls.category, maintenance_team=cls.team, is_scrapped=(i == 2),
+            )
+        cls.now = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+    def test_category_plan_is_idempotent(self):
+        MaintenancePlan.objects.create(
+            name='Weekly lube', category=self.category, interval_days=7,
+            start_date=self.now - timedelta(days=3), created_by=self.user,
+        )
+        stats = scheduler.generate(horizon_days=28, now=self.now)
+        # 2 active presses x 4 weekly occurrences in the horizon
+        self.assertEqual(stats['created'], 8)
+        self.assertEqual(scheduler.generate(horizon_days=28, now=self.now)['created'], 0)
+        # Rolling the horizon forward adds only the new week
+        self.assertEqual(scheduler.generate(horizon_days=35, now=self.now)['created'], 2)
+
+        req = MaintenanceRequest.objects.filter(plan__isnull=False).earliest('scheduled_date')
+        self.assertEqual(req.scheduled_date, self.now + timedelta(days=4))
+        self.assertEqual((req.request_type, req.team), ('Preventive', self.team))
+
+    def test_rescheduled_and_deleted_requests_are_not_recreated(self):
+        MaintenancePlan.objects.create(
+            name='Weekly lube', category=self.category, interval_days=7,
+            start_date=self.now, created_by=self.user,
+        )
+        scheduler.generate(horizon_days=14, now=self.now)
+        first, second = MaintenanceRequest.objects.filter(plan__isnull=False).order_by('scheduled_date')[:2]
+        MaintenanceRequest.objects.filter(pk=first.pk).update(scheduled_date=self.now + timedelta(days=2))
+        second.delete()
+        stats = scheduler.generate(horizon_days=14, now=self.now)
+        self.assertEqual((stats['created'], stats['existing']), (0, 6))
+
+    def test_plans_saved_without_clean_are_skipped(self):
+        MaintenancePlan.objects.create(
+            name='Broken', category=self.category, interval_type='usage', start_date=self.now, created_by=self.user,
+        )
+        MaintenancePlan.objects.create(
+            name='Weekly lube', category=self.category, interval_days=7, start_date=self.now, created_by=self.user,
+        )
+        self.assertEqual(scheduler.generate(horizon_days=7, now=self.now)['created'], 4)
+
+    def test_usage_plan_on_work_center(self):
+        work_center = WorkCenter.objects.create(name='Oven', code='OV')
+        plan = MaintenancePlan(
+            name='Burner service', work_center=work_center, interval_type='usage',
+            interval_hours=160, usage_hours_per_day=16, start_date=self.now, created_by=self.user,
+        )
+        plan.full_clean()
+        plan.save()
+        scheduler.generate(horizon_days=30, now=self.now)
+        self.assertEqual(work_center.requests.count(), 4)  # days 0, 10, 20, 30
+
+
+class AssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager')
+        cls.team = MaintenanceTeam.objects.create(name='Electricians')
+        cls.other_team = MaintenanceTeam.objects.create(name='IT')
+        cls.alice = User.objects.create_user('alice')
+        cls.bob = User.objects.create_user('bob')
+        cls.carol = User.objects.create_user('carol')
+        cls.team.members.add(cls.alice, cls.bob)
+        Technician.objects.create(user=cls.carol, team=cls.other_team)
+        cls.equipment = Equipment.objects.create(
+            name='Panel', serial_number='EP-1', department='Plant', location='Wall', maintenance_team=cls.team,
+        )
+
+    def setUp(self):
+        assignment.reset()
+
+    def new_request(self, **kwargs):
+        req = MaintenanceRequest(subject='Fault', equipment=self.equipment, created_by=self.manager, **kwargs)
+        assignment.assign(req)
+        req.save()
+        return req
+
+    def test_routes_to_least_loaded_team_member(self):
+        MaintenanceRequest.objects.create(subject='Busy', assigned_to=self.alice, created_by=self.manager)
+        first = self.new_request()
+        self.assertEqual((first.assigned_to, first.team), (self.bob, self.team))
+        # Signals updated the index: now both have one open request
+        second = self.new_request()
+        self.assertEqual(second.assigned_to, self.alice)
+        # Closing a request frees capacity without a rebuild
+        second.stage = 'Repaired'
+        second.save()
+        self.assertEqual(self.new_request().assigned_to, self.alice)
+
+    def test_utilization_and_rebalance(self):
+        for _ in range(4):
+            MaintenanceRequest.objects.create(subject='Backlog', equipment=self.equipment, created_by=self.manager)
+        self.assertEqual(assignment.rebalance(), 4)
+        loads = {row['name']: row['open'] for row in assignment.get_index().utilization()}
+        self.assertEqual(loads, {'alice': 2, 'bob': 2, 'carol': 0})
+        self.assertEqual(assignment.rebalance(), 0)
+
+    def test_dashboard_lists_technicians(self):
+        self.client.force_login(self.manager)
+        with self.settings(GEARGUARD_KPI_ASYNC_REFRESH=False):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual([row['name'] for row in response.context['technician_load']], ['alice', 'bob', 'carol'])
+
+
+@override_settings(GEARGUARD_TELEMETRY_TOKEN='sensor-secret')
+class TelemetryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.equipment = Equipment.objects.create(name='Mill', serial_number='M-1', department='Machining', location='Bay 2')
+        cls.start = datetime(2026, 5, 1, 10, 0, tzinfo=dt_timezone.utc)
+
+    def post(self, body, token='sensor-secret'):
+        return self.client.post(
+            reverse('ingest_telemetry'), body, content_type='application/x-ndjson',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+
+    def test_ingest_ndjson_and_json(self):
+        ndjson = (
+            '{"serial": "M-1", "value": 80, "ts": "2026-05-01T10:00:05Z"}\n'
+            '{"equipment": %d, "metric": "temp", "value": 61.5}\n'
+            '{"serial": "nope", "value": 1}\n' % self.equipment.pk
+        )
+        data = self.post(ndjson).json()
+        self.assertEqual((data['accepted'], data['rejected']), (2, 1))
+        data = self.post('[{"serial": "M-1", "value": "high"}]').json()
+        self.assertEqual(data['errors'][0]['message'], 'value must be a number')
+        self.assertEqual(self.post('[]', token='wrong').status_code, 403)
+
+    def test_non_finite_values_are_rejected(self):
+        body = (
+            '[{"serial": "M-1", "value": Infinity}, {"serial": "M-1", "metric": "temp", "value": NaN}, '
+            f'{{"serial": "M-1", "value": {10 ** 400}}}, {{"serial": "M-1", "value": 50}}]'
+        )
+        data = self.post(body).json()
+        self.assertEqual((data['accepted'], data['rejected']), (1, 3))
+        self.assertEqual({error['message'] for error in data['errors']}, {'value must be finite'})
+        self.assertEqual(TelemetryReading.objects.count(), 1)
+
+    def test_command_skips_malformed_lines_only(self):
+        out, err = io.StringIO(), io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'readings.ndjson')
+            with open(path, 'w') as stream:
+                stream.write('{"serial": "M-1", "value": 80}\n{"serial": \n{"serial": "nope", "value": 1}\n{"serial": "M-1", "value": 70}\n')
+            call_command('ingest_telemetry', path, stdout=out, stderr=err)
+        self.assertIn('2 readings accepted, 2 rejected.', out.getvalue())
+        self.assertIn('Line 2 of batch', err.getvalue())
+        self.assertIn('Line 3 of batch: Unknown equipment', err.getvalue())
+
+    def test_malformed_payloads_are_rejected(self):
+        for body in ('{"readings": 5}', '{"readings": null}', '7', '[{"serial": ["M-1"], "value": 1}]', '{"serial": 5, "value": 1}'):
+            response = self.post(body)
+            self.assertEqual((response.status_code, response.json()['message']), (400, 'Malformed payload'), body)
+
+    def test_rollups_downsample_and_update_health(self):
+        telemetry.ingest([
+            {'serial': 'M-1', 'value': value, 'ts': (self.start + timedelta(minutes=minute, seconds=10)).isoformat()}
+            for minute, value in [(0, 90), (0, 70), (1, 40), (61, 20)]
+        ])
+        written = telemetry.rollup(since=self.start, now=self.start + timedelta(hours=2))
+        self.assertEqual(written, {'minute': 3, 'hour': 2, 'day': 1})
+        # Re-running over the same window is idempotent
+        telemetry.rollup(since=self.start, now=self.start + timedelta(hours=2))
+
+        hour = TelemetryRollup.objects.get(bucket='hour', bucket_start=self.start)
+        self.assertEqual((hour.count, hour.min_value, hour.max_value, hour.avg_value), (3, 40, 90, 200 / 3))
+        day = TelemetryRollup.objects.get(bucket='day')
+        self.assertEqual(day.count, 4)
+
+        self.equipment.refresh_from_db()
+        self.assertEqual(self.equipment.health, 20)
+
+    def test_prune_respects_retention(self):
+        telemetry.ingest([{'serial': 'M-1', 'value': 50, 'ts': self.start.isoformat()}])
+        telemetry.rollup(since=self.start, now=self.start)
+        deleted = telemetry.prune(now=self.start + timedelta(days=8))
+        self.assertEqual(deleted['raw'], 1)
+        self.assertFalse(TelemetryReading.objects.exists())
+        self.assertEqual(TelemetryRollup.objects.count(), 3)
+
+
+class HealthRuleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager')
+        cls.team = MaintenanceTeam.objects.create(name='Mechanics')
+        cls.category = EquipmentCategory.objects.create(name='Pumps')
+        cls.pump = Equipment.objects.create(
+            name='Pump', serial_number='P-1', department='Utilities', location='Basement',
+            category=cls.category, maintenance_team=cls.team,
+        )
+        cls.vibration = HealthRule.objects.create(
+            name='Vibration', category=cls.category, metric='vibration', comparison='above',
+            threshold=7, clear_threshold=5, trigger_after=2, cooldown_minutes=0, created_by=cls.manager,
+        )
+
+    def setUp(self):
+        rules.clear()
+
+    def tearDown(self):
+        rules.clear()
+
+    def test_debounce_hysteresis_and_dedup(self):
+        self.assertEqual(rules.evaluate([(self.pump.pk, 'vibration', 8)]), [])
+        opened = rules.evaluate([(self.pump.pk, 'vibration', 8)])
+        self.assertEqual(len(opened), 1)
+        req = MaintenanceRequest.objects.get(rule=self.vibration)
+        self.assertEqual((req.request_type, req.team, req.equipment), ('Corrective', self.team, self.pump))
+
+        # Flapping between the thresholds stays latched
+        self.assertEqual(rules.evaluate([(self.pump.pk, 'vibration', v) for v in (6, 9, 6, 9, 9)]), [])
+        # Re-armed, but the open request still deduplicates (also for a fresh engine)
+        rules.evaluate([(self.pump.pk, 'vibration', 4)])
+        rules.clear()
+        self.assertEqual(rules.evaluate([(self.pump.pk, 'vibration', v) for v in (9, 9)]), [])
+
+        req.stage = 'Repaired'
+        req.save()
+        rules.evaluate([(self.pump.pk, 'vibration', 4)])
+        self.assertEqual(len(rules.evaluate([(self.pump.pk, 'vibration', v) for v in (9, 9)])), 1)
+
+    def test_health_changes_on_save(self):
+        HealthRule.objects.create(name='Low health', threshold=30, clear_threshold=50, created_by=self.manager)
+        self.pump.health = 20
+        self.pump.save()
+        self.assertEqual(self.pump.requests.filter(rule__name='Low health').count(), 1)
+        # Saving without a health change is not a new reading
+        self.pump.description = 'Checked'
+        self.pump.save()
+        self.assertEqual(self.pump.requests.count(), 1)
+
+    def test_telemetry_ingest_triggers(self):
+        result = telemetry.ingest([{'serial': 'P-1', 'metric': 'vibration', 'value': 8}] * 2)
+        self.assertEqual(result['triggered'], 1)
+        # Other categories are unaffected
+        other = Equipment.objects.create(name='Fan', serial_number='F-1', department='HVAC', location='Roof')
+        result = telemetry.ingest([{'serial': 'F-1', 'metric': 'vibration', 'value': 8}] * 2)
+        self.assertEqual((result['triggered'], other.requests.count()), (0, 0))
+
+
+    def test_board_scrap_stops_the_rules(self):
+        req = MaintenanceRequest.objects.create(subject='Seal', equipment=self.pump, created_by=self.manager)
+        # Caches the pump's profile
+        rules.evaluate([(self.pump.pk, 'vibration', 8)])
+        board.apply_moves([{'id': req.pk, 'stage': 'Scrap'}])
+        self.assertEqual(rules.evaluate([(self.pump.pk, 'vibration', 8)]), [])
+        self.assertEqual(self.pump.requests.filter(rule=self.vibration).count(), 0)
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('explain_hot_queries', '--check', stdout=out)
+        self.assertIn('core_eq_health', out.getvalue())
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('ops', is_staff=True)
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client.force_login(self.staff)
+
+    def test_records_per_view_and_exports_prometheus_text(self):
+        with self.assertLogs('gearguard.metrics', 'INFO') as logs:
+            self.client.get(reverse('request_events'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['status']), ('request_events', 200))
+        self.assertGreaterEqual(line['queries'], 1)
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('gearguard_requests_total{view="request_events",method="GET",status="200"} 1', text)
+        self.assertIn('gearguard_request_duration_seconds_bucket{view="request_events",method="GET",status="200",le="+Inf"} 1', text)
+        self.assertIn(f'gearguard_db_queries_total{{view="request_events",method="GET",status="200"}} {line["queries"]}', text)
+
+    def test_metrics_endpoint_requires_staff_or_token(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with self.settings(GEARGUARD_METRICS_TOKEN='scrape'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(GEARGUARD_QUERY_BUDGETS={'request_events': 0})
+    def test_query_budget(self):
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            self.client.get(reverse('request_events'))
+        with self.settings(GEARGUARD_QUERY_BUDGET_STRICT=False), self.assertLogs('gearguard.metrics', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('request_events')).status_code, 200)
+        self.assertIn('gearguard_query_budget_exceeded_total{view="request_events",method="GET",status="200"} 2',
+                      metrics.registry.render())
+
+    async def test_counts_queries_of_async_views(self):
+        await self.async_client.aforce_login(self.staff)
+        await self.async_client.get(reverse('api_list', args=['requests']))
+        counted = metrics.registry.totals['api_list', 'GET', '200'].queries
+        self.assertGreater(counted, 0)
+        with self.settings(GEARGUARD_QUERY_BUDGETS={'api_list': counted - 1}):
+            with self.assertRaises(metrics.QueryBudgetExceeded):
+                await self.async_client.get(reverse('api_list', args=['requests']))
+
+
+class SeedPlantTests(TestCase):
+    def test_seeds_and_grows_a_plant(self):
+        now = timezone.now()
+        counts = seed.seed_plant(equipment=24, requests=60, logs_per_request=1, technicians_per_team=2, now=now)
+        self.assertEqual((counts['equipment'], counts['requests'], counts['technicians']), (24, 60, 10))
+        self.assertEqual(MaintenanceLog.objects.count(), counts['logs'])
+        self.assertFalse(MaintenanceRequest.objects.filter(updated_at__gt=now).exists())
+        self.assertFalse(MaintenanceRequest.objects.exclude(team=F('equipment__maintenance_team')).exists())
+        self.assertTrue(search.search('equipment', 'pump'))
+
+        counts = seed.seed_plant(equipment=6, requests=10, technicians_per_team=2, seed=7)
+        self.assertEqual((counts['technicians'], Equipment.objects.count()), (0, 30))
+
+    def test_category_list_counts_without_n_plus_one(self):
+        seed.seed_plant(equipment=12, requests=0, technicians_per_team=1, index=False)
+        self.client.force_login(User.objects.get(username='planner'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('category_list'))
+        self.assertContains(response, '<td>1</td>', count=12)
+
+
+@override_settings(GEARGUARD_READ_REPLICAS=['replica'], GEARGUARD_REPLICA_VIEWS=['dashboard'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, method, view_name, cookies=None):
+        seen = {}
+
+        def view(request):
+            seen['read'] = self.router.db_for_read(Equipment)
+            self.router.db_for_write(Equipment)
+            seen['after_write'] = self.router.db_for_read(Equipment)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = type('Match', (), {'view_name': view_name})()
+        middleware = ReplicaRoutingMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        response = middleware(request)
+        return seen, response
+
+    def test_replica_views_read_from_replica_until_a_write(self):
+        seen, response = self.route('get', 'dashboard')
+        self.assertEqual(seen, {'read': 'replica', 'after_write': 'default'})
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+        self.assertFalse(routers.reading_from_replica())
+
+    def test_other_views_and_pinned_clients_read_from_primary(self):
+        self.assertEqual(self.route('get', 'request_list')[0]['read'], 'default')
+        self.assertEqual(self.route('get', 'dashboard', {ReplicaRoutingMiddleware.cookie_name: '1'})[0]['read'], 'default')
+
+    def test_writes_pin_the_client_to_primary(self):
+        seen, response = self.route('post', 'dashboard')
+        self.assertEqual(seen['read'], 'default')
+        self.assertEqual(response.cookies[ReplicaRoutingMiddleware.cookie_name]['max-age'], 5)
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(GEARGUARD_SQLITE_TUNING=True)
+class SqliteTuningTests(TransactionTestCase):
+    def test_configure_applies_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            try:
+                with self.settings(GEARGUARD_SQLITE_PRAGMAS={'synchronous': 'OFF'}):
+                    sqlite.configure(connection)
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 0)
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 5000)
+            finally:
+                cursor.execute(f'PRAGMA synchronous = {synchronous}')
+
+    def test_serialized_write_begins_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            with sqlite.serialized_write():
+                with sqlite.serialized_write():
+                    Equipment.objects.create(name='Press', serial_number='P-1', department='Plant', location='Bay')
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 1)
+        self.assertIsNone(connection.transaction_mode)
+
+        with self.settings(GEARGUARD_SQLITE_TUNING=False), CaptureQueriesContext(connection) as queries:
+            with sqlite.serialized_write():
+                Equipment.objects.filter(serial_number='P-1').update(health=50)
+        self.assertNotIn('BEGIN IMMEDIATE', [query['sql'] for query in queries.captured_queries])
+
+
+@override_settings(GEARGUARD_API_TOKENS={'mes-secret': 'mes'}, GEARGUARD_API_PAGE_SIZE=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('mes')
+        cls.team = MaintenanceTeam.objects.create(name='Mechanics')
+        cls.equipment = [
+            Equipment.objects.create(
+                name=f'Press {number}', serial_number=f'P-{number}', department='Stamping', location='Hall A',
+                maintenance_team=cls.team,
+            )
+            for number in range(3)
+        ]
+        cls.req = MaintenanceRequest.objects.create(subject='Oil leak', equipment=cls.equipment[0], created_by=cls.user)
+
+    def api(self, method, path, data=None, **headers):
+        headers.setdefault('HTTP_AUTHORIZATION', 'Bearer mes-secret')
+        if method == 'get':
+            return self.client.get(path, data, **headers)
+        return getattr(self.client, method)(path, json.dumps(data), content_type='application/json', **headers)
+
+    def test_list_with_cursor_and_sparse_fields(self):
+        url = reverse('api_list', args=['equipment'])
+        page = self.api('get', url, {'fields': 'id,name', 'sort': 'name'}).json()
+        self.assertEqual(page['results'], [{'id': e.pk, 'name': e.name} for e in self.equipment[:2]])
+        page = self.api('get', url, {'fields': 'name', 'sort': 'name', 'cursor': page['next']}).json()
+        self.assertEqual(page, {'results': [{'name': 'Press 2'}], 'next': None})
+
+        self.assertEqual(self.api('get', url, {'fields': 'secret'}).status_code, 400)
+        self.assertEqual(self.api('get', url, {'is_scrapped': 'true'}).json()['results'], [])
+        self.assertEqual(self.api('get', reverse('api_list', args=['parts'])).status_code, 404)
+        self.assertEqual(self.api('get', url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_paging_through_null_sort_values(self):
+        # Two more unscheduled requests and three scheduled ones
+        for day in (None, None, 3, 1, 2):
+            MaintenanceRequest.objects.create(
+                subject=f'Check {day}', equipment=self.equipment[1], created_by=self.user,
+                scheduled_date=timezone.now() + timedelta(days=day) if day else None,
+            )
+        url = reverse('api_list', args=['requests'])
+        for sort in ('scheduled_date', '-scheduled_date'):
+            seen, cursor = [], None
+            while True:
+                page = self.api('get', url, {'sort': sort, 'limit': 2, 'fields': 'id,scheduled_date', 'cursor': cursor or ''})
+                self.assertEqual(page.status_code, 200)
+                seen += page.json()['results']
+                cursor = page.json()['next']
+                if not cursor:
+                    break
+            self.assertEqual(len({row['id'] for row in seen}), 6)
+            dates = [row['scheduled_date'] for row in seen if row['scheduled_date']]
+            self.assertEqual(dates, sorted(dates, reverse=sort.startswith('-')))
+            # Unscheduled requests come last going up, first going down
+            nulls = [index for index, row in enumerate(seen) if row['scheduled_date'] is None]
+            self.assertEqual(nulls, [3, 4, 5] if sort == 'scheduled_date' else [0, 1, 2])
+
+    @override_settings(GEARGUARD_SEARCH_LIMIT=1)
+    def test_search_pages_through_every_match(self):
+        url = reverse('api_list', args=['equipment'])
+        page = self.api('get', url, {'q': 'press', 'sort': 'name', 'fields': 'name'}).json()
+        self.assertEqual(page['results'], [{'name': 'Press 0'}, {'name': 'Press 1'}])
+        page = self.api('get', url, {'q': 'press', 'sort': 'name', 'fields': 'name', 'cursor': page['next']}).json()
+        self.assertEqual(page, {'results': [{'name': 'Press 2'}], 'next': None})
+
+    def test_etag_conditional_get(self):
+        url = reverse('api_detail', args=['requests', self.req.pk])
+        response = self.api('get', url)
+        self.assertEqual(response.json()['equipment_name'], 'Press 0')
+        response = self.api('get', url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((response.status_code, response.content), (304, b''))
+
+        self.api('patch', url, {'stage': 'In Progress'})
+        self.assertEqual(self.api('get', url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_create_and_update(self):
+        url = reverse('api_list', args=['requests'])
+        response = self.api('post', url, {'subject': 'Noise', 'equipment': self.equipment[1].pk, 'priority': 'High'})
+        self.assertEqual(response.status_code, 201)
+        created = MaintenanceRequest.objects.get(pk=response.json()['id'])
+        self.assertEqual((created.created_by, created.team), (self.user, self.team))
+
+        response = self.api('post', url, {'subject': 'Nothing to fix', 'bogus': 1})
+        self.assertEqual(set(response.json()['errors']), {'bogus'})
+        response = self.api('post', url, {'subject': 'Nothing to fix'})
+        self.assertEqual(response.json()['message'], 'Validation failed')
+
+        response = self.api('patch', reverse('api_detail', args=['requests', created.pk]), {'duration': 2.5})
+        self.assertEqual((response.json()['duration'], response.json()['subject']), (2.5, 'Noise'))
+
+        logs = reverse('api_list', args=['logs'])
+        self.assertEqual(self.api('post', logs, {'request': created.pk, 'comment': 'On it'}).status_code, 201)
+        self.assertEqual(self.api('get', logs, {'request': created.pk, 'fields': 'comment'}).json()['results'],
+                         [{'comment': 'On it'}])
+        log = MaintenanceLog.objects.get()
+        self.assertEqual(self.api('patch', reverse('api_detail', args=['logs', log.pk]), {}).status_code, 405)
+
+    def test_session_writes_need_csrf(self):
+        from django.test import Client
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('api_list', args=['work-centers'])
+        self.assertEqual(client.get(url).status_code, 200)
+        response = client.post(url, json.dumps({'name': 'Line', 'code': 'L1'}), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    async def test_async_client(self):
+        response = await self.async_client.get(
+            reverse('api_list', args=['requests']), {'stage': 'New'}, headers={'Authorization': 'Bearer mes-secret'},
+        )
+        self.assertEqual([row['subject'] for row in response.json()['results']], ['Oil leak'])
+
+
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tech')
+        cls.equipment = Equipment.objects.create(name='Press', serial_number='P-1', department='Plant', location='Bay')
+        cls.req = MaintenanceRequest.objects.create(subject='Oil leak', equipment=cls.equipment, created_by=cls.user)
+
+    def setUp(self):
+        events.bus.clear()
+
+    def published(self, since):
+        return [
+            (event.topic, event.type, event.data)
+            for event in events.bus._backlog if event.id > since
+        ]
+
+    def test_writes_publish_deltas_after_commit(self):
+        start = events.bus.last_id()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.req.stage = 'In Progress'
+            self.req.save()
+            self.req.save()
+            board.apply_moves([{'id': self.req.pk, 'stage': 'Repaired'}])
+            log = MaintenanceLog.objects.create(request=self.req, comment='Seal replaced', created_by=self.user)
+            self.assertEqual(events.bus.last_id(), start)
+
+        published = self.published(start)
+        self.assertEqual(published[:2], [
+            ('board', 'card', {'id': self.req.pk, 'stage': 'In Progress', 'from': 'New'}),
+            ('board', 'card', {'id': self.req.pk, 'stage': 'Repaired', 'from': 'In Progress'}),
+        ])
+        topic, kind, data = published[2]
+        self.assertEqual((topic, kind, data['id']), (f'request-{self.req.pk}', 'log', log.pk))
+        self.assertIn('Seal replaced', data['html'])
+
+    @override_settings(GEARGUARD_EVENTS_HEARTBEAT=60)
+    def test_poll_view_never_waits(self):
+        url = events.stream_url(self.user, events.BOARD)
+        start = events.bus.last_id()
+        self.assertEqual(self.client.get(url).content.decode(), f'retry: 3000\nid: {start}\n\n')
+
+        events.bus.publish('dashboard', 'kpis', {'open_count': 3})
+        events.bus.publish('board', 'card', {'id': 1, 'stage': 'New', 'from': None})
+        response = self.client.get(url, HTTP_LAST_EVENT_ID=str(start))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response.content.decode(), (
+            f'retry: 3000\n\nid: {start + 2}\nevent: card\ndata: {{"id": 1, "stage": "New", "from": null}}\n\n'
+        ))
+        self.assertEqual(self.client.get(url + 'x').status_code, 403)
+
+        started = time.monotonic()
+        response = self.client.get(url, HTTP_LAST_EVENT_ID=str(start + 2))
+        self.assertEqual(response.content.decode(), 'retry: 3000\n\n')
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_asgi_stream_pushes_without_django(self):
+        async def django_app(scope, receive, send):
+            raise AssertionError('Streams must not go through Django')
+
+        url = await sync_to_async(events.stream_url)(self.user, events.BOARD)
+        path, query = url.split('?')
+        chunks, disconnect = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                await chunks.put(message['body'])
+
+        app = events.route(django_app)
+        task = asyncio.ensure_future(app({'type': 'http', 'path': path, 'query_string': query.encode(),
+                                          'headers': []}, receive, send))
+        self.assertTrue((await chunks.get()).startswith(b'retry: 3000'))
+        # Published from a worker thread while the stream waits
+        await sync_to_async(events.bus.publish, thread_sensitive=False)('board', 'card_removed', {'id': 1})
+        self.assertIn(b'event: card_removed', await chunks.get())
+        self.assertTrue(events.bus.has_subscribers('board'))
+
+        disconnect.set()
+        await task
+        self.assertFalse(events.bus.has_subscribers('board'))
+
+    async def test_stale_clients_are_reset(self):
+        with self.settings(GEARGUARD_EVENTS_QUEUE_SIZE=1):
+            sub, missed = events.bus.subscribe(['board'], last_id=events.bus.last_id() + 5)
+        self.assertIsNone(missed)
+        events.bus.publish('board', 'card', {})
+        events.bus.publish('board', 'card', {})
+        await asyncio.sleep(0)
+        self.assertTrue(sub.lagging)
+        events.bus.unsubscribe(sub)
+
+
+# A single test process may trust its LocMemCache stamps
+@override_settings(DEBUG=True)
+class VersionedViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('planner')
+        self.client.force_login(self.user)
+        WorkCenter.objects.create(name='Press Line', code='PL1')
+
+    def test_conditional_get_until_the_model_changes(self):
+        url = reverse('work_center_list')
+        # The first page sets the CSRF cookie, so it is not cached
+        self.assertNotIn('ETag', self.client.get(url))
+        first = self.client.get(url)
+        self.assertContains(first, 'Press Line')
+        self.assertIn('private', first['Cache-Control'])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        with self.assertNumQueries(2):
+            # Session and user only: the page comes from the response cache
+            self.assertEqual(self.client.get(url).content, first.content)
+
+        WorkCenter.objects.create(name='Paint Shop', code='PS1')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertContains(response, 'Paint Shop')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    @override_settings(DEBUG=False)
+    def test_process_local_stamps_disable_caching(self):
+        url = reverse('work_center_list')
+        self.client.get(url)
+        self.assertNotIn('ETag', self.client.get(url))
+        response = self.client.get(reverse('equipment_list'))
+        self.assertIsNone(response.context['row_version'])
+
+    def test_bulk_writes_bump_stamps(self):
+        equipment = Equipment.objects.create(name='Lathe', serial_number='L-1', department='Machining', location='Hall B')
+        req = MaintenanceRequest.objects.create(subject='Noisy', equipment=equipment, created_by=self.user)
+        before = versions.stamps(MaintenanceRequest)
+        board.apply_moves([{'id': req.pk, 'stage': 'In Progress'}])
+        self.assertNotEqual(versions.stamps(MaintenanceRequest), before)
+
+        url = reverse('get_equipment_details', args=[equipment.pk])
+        etag = self.client.get(url)['ETag']
+        telemetry.apply_health({equipment.pk: 40})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cached_kanban_card_follows_reassignment(self):
+        tech = User.objects.create_user('tech', first_name='Ana')
+        req = MaintenanceRequest.objects.create(subject='Leak', created_by=self.user)
+        self.assertContains(self.client.get(reverse('request_list')), 'Unassigned')
+        MaintenanceRequest.objects.filter(pk=req.pk).update(assigned_to=tech)
+        self.assertNotContains(self.client.get(reverse('request_list')), 'Unassigned')
+
+
+@tasks.task(max_attempts=2, retry_delay=0)
+def failing_task(message):
+    raise RuntimeError(message)
+
+
+@override_settings(GEARGUARD_TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', is_staff=True)
+        self.equipment = Equipment.objects.create(name='Press', serial_number='P-1', department='Stamping', location='Hall A')
+
+    def test_scrap_is_queued_once_and_run_by_the_worker(self):
+        req = MaintenanceRequest.objects.create(subject='Cracked frame', equipment=self.equipment, created_by=self.user)
+        req.stage = 'Scrap'
+        req.save()
+        req.save()
+        scrap = Task.objects.filter(key=f'scrap:{self.equipment.pk}')
+        self.assertEqual(scrap.filter(status='queued').count(), 1)
+        self.equipment.refresh_from_db()
+        self.assertFalse(self.equipment.is_scrapped)
+
+        call_command('run_worker', '--once', stdout=io.StringIO())
+        self.equipment.refresh_from_db()
+        self.assertTrue(self.equipment.is_scrapped)
+        self.assertEqual(scrap.get().status, 'done')
+
+    def test_failures_are_retried_then_marked_failed(self):
+        task = failing_task.enqueue('boom')
+        with self.assertLogs('gearguard.tasks', 'WARNING'):
+            self.assertEqual(tasks.run_pending(), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('queued', 1))
+        with self.assertLogs('gearguard.tasks', 'ERROR'):
+            tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('RuntimeError: boom', task.last_error)
+
+    @override_settings(GEARGUARD_TASKS_EAGER=True)
+    def test_eager_tasks_of_a_request_run_after_its_response(self):
+        tasks.defer()
+        # Held back, so the view does not see the failure
+        self.assertIsNone(failing_task.enqueue('late'))
+        with self.assertLogs('gearguard.tasks', 'ERROR') as logs:
+            tasks.run_deferred()
+        self.assertIn('failed after its request', logs.output[0])
+        # Outside a request they run inline again
+        with self.assertRaises(RuntimeError):
+            failing_task.enqueue('now')
+
+    def test_lost_tasks_are_requeued(self):
+        task = failing_task.enqueue('lost')
+        Task.objects.filter(pk=task.pk).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.requeue_lost(), 1)
+        self.assertEqual(Task.objects.get(pk=task.pk).status, 'queued')
+
+    def test_lost_tasks_sharing_a_key_are_requeued_once(self):
+        first = failing_task.enqueue('lost', key='report')
+        Task.objects.filter(pk=first.pk).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+        # Queued again while running, then lost as well
+        second = failing_task.enqueue('lost', key='report')
+        Task.objects.filter(pk=second.pk).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.requeue_lost(), 1)
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('status', flat=True)), ['queued', 'failed'],
+        )
+
+    def test_metrics_view(self):
+        failing_task.enqueue('later', key='report')
+        failing_task.enqueue('later', key='report')
+        self.client.force_login(self.user)
+        text = self.client.get(reverse('task_metrics')).content.decode()
+        self.assertIn('gearguard_tasks{name="core.tests.failing_task",status="queued"} 1', text)
+        self.assertIn('gearguard_task_oldest_due_seconds', text)
+
+
+class ReliabilityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        self.work_center = WorkCenter.objects.create(name='Press Line', code='PL1', cost_per_hour=50)
+        self.category = EquipmentCategory.objects.create(name='Presses')
+        self.equipment = Equipment.objects.create(
+            name='Press 1', serial_number='P-1', department='Stamping', location='Hall A',
+            category=self.category, work_center=self.work_center,
+        )
+
+    def failure(self, reported, repaired=None, duration=0.0):
+        req = MaintenanceRequest.objects.create(subject='Jammed', equipment=self.equipment, created_by=self.user)
+        # created_at and stage_entered_at are automatic, so set them afterwards
+        MaintenanceRequest.objects.filter(pk=req.pk).update(
+            created_at=reported, stage_entered_at=repaired or reported,
+            stage='Repaired' if repaired else 'New', duration=duration,
+        )
+        return req
+
+    def test_mtbf_mttr_and_cost_roll_up(self):
+        start = timezone.now() - timedelta(days=2)
+        self.failure(start, start + timedelta(hours=2), duration=2)
+        self.failure(start + timedelta(hours=12), start + timedelta(hours=16), duration=3)
+        self.failure(start + timedelta(hours=40))
+        MaintenanceRequest.objects.create(
+            subject='Oil change', equipment=self.equipment, request_type='Preventive', created_by=self.user,
+        )
+        reliability.refresh()
+
+        for summary in (self.equipment.reliability, self.category.reliability, self.work_center.reliability):
+            summary.refresh_from_db()
+            self.assertEqual((summary.failures, summary.repairs, summary.intervals), (3, 2, 2))
+            # Repaired at +2h and +16h, failed again at +12h and +40h
+            self.assertAlmostEqual(summary.mtbf_hours, (10 + 24) / 2, places=3)
+            self.assertAlmostEqual(summary.mttr_hours, (2 + 4) / 2, places=3)
+            self.assertEqual(summary.cost, 250)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('equipment_detail', args=[self.equipment.pk]))
+        self.assertContains(response, '17.0 h')
+        self.assertContains(response, 'Oil change')
+
+    def test_repairs_refresh_the_summaries(self):
+        req = MaintenanceRequest.objects.create(subject='Leak', equipment=self.equipment, created_by=self.user)
+        summary = ReliabilitySummary.objects.get(equipment=self.equipment)
+        self.assertEqual((summary.failures, summary.repairs, summary.mttr_hours), (1, 0, None))
+
+        req.stage = 'In Progress'
+        with CaptureQueriesContext(connection) as queries:
+            req.save()
+        # Not a repair: nothing to recompute
+        self.assertFalse([q for q in queries if 'core_reliabilitysummary' in q['sql']])
+
+        req.stage = 'Repaired'
+        req.duration = 1.5
+        req.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.repairs, summary.labour_hours), (1, 1.5))
+        self.assertEqual(ReliabilitySummary.objects.get(category=self.category).cost, 75)
+
+        req.delete()
+        self.assertFalse(ReliabilitySummary.objects.filter(equipment=self.equipment).exists())
+
+
+    def test_refresh_runs_after_the_request_create_view(self):
+        metrics.registry.reset()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('request_create'), {
+            'subject': 'Jammed', 'request_type': 'Corrective', 'priority': 'High', 'stage': 'New',
+            'equipment': self.equipment.pk, 'duration': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        # The view's own queries only: the refreshes run once the response is ready
+        self.assertLessEqual(metrics.registry.totals['request_create', 'POST', '302'].queries, 14)
+        self.assertEqual(ReliabilitySummary.objects.get(equipment=self.equipment).failures, 1)
+
+class OeeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        self.work_center = WorkCenter.objects.create(
+            name='Press Line', code='PL1', efficiency=80, oee_target=85, planned_hours_per_day=12,
+        )
+        self.equipment = Equipment.objects.create(
+            name='Press 1', serial_number='P-1', department='Stamping', location='Hall A', work_center=self.work_center,
+        )
+
+    def request(self, request_type, reported, closed, duration=0.0):
+        req = MaintenanceRequest.objects.create(
+            subject='Stop', equipment=self.equipment, request_type=request_type, created_by=self.user,
+        )
+        # created_at and stage_entered_at are automatic, so set them afterwards
+        MaintenanceRequest.objects.filter(pk=req.pk).update(
+            created_at=reported, stage_entered_at=closed, stage='Repaired', duration=duration,
+        )
+
+    def test_buckets_merge_stops_and_roll_up(self):
+        monday = timezone.make_aware(datetime(2026, 3, 2))
+        # Overlapping stops: 06:00-14:00 stopped, a third of the day
+        self.request('Corrective', monday + timedelta(hours=6), monday + timedelta(hours=12))
+        self.request('Corrective', monday + timedelta(hours=10), monday + timedelta(hours=14))
+        self.request('Preventive', monday + timedelta(days=1, hours=8), monday + timedelta(days=1, hours=11), duration=2)
+        oee.refresh(now=monday + timedelta(days=2))
+
+        buckets = {
+            (row.bucket, row.bucket_start): row
+            for row in OeeBucket.objects.filter(work_center=self.work_center, bucket_start__gte=monday.date())
+        }
+        day = buckets['day', monday.date()]
+        self.assertEqual((day.planned_hours, day.downtime_hours), (12, 4))
+        self.assertEqual(buckets['day', monday.date() + timedelta(days=1)].downtime_hours, 2)
+        week = buckets['week', monday.date()]
+        self.assertEqual((week.planned_hours, week.downtime_hours), (24, 6))
+        self.assertAlmostEqual(week.availability, 75)
+
+        (work_center,) = oee.current([self.work_center], now=monday + timedelta(days=1, hours=23))
+        self.assertAlmostEqual(work_center.windows['week']['oee'], 75 * 0.8)
+
+    def test_request_changes_refresh_the_current_periods(self):
+        req = MaintenanceRequest.objects.create(subject='Jammed', equipment=self.equipment, created_by=self.user)
+        today = OeeBucket.objects.get(work_center=self.work_center, bucket='day', bucket_start=timezone.localdate())
+        self.assertGreater(today.planned_hours, 0)
+
+        req.stage = 'Repaired'
+        req.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('work_center_list'))
+        self.assertContains(response, 'OEE Today')
+        # Stopped only for the moments between reporting and repair
+        self.assertAlmostEqual(response.context['work_centers'][0].windows['day']['oee'], 80, places=2)
+
+
+class StageFlowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lead')
+        self.work_center = WorkCenter.objects.create(name='Paint', code='PT1')
+        self.client.force_login(self.user)
+
+    def post_move(self, req, stage):
+        moves = {'moves': [{'id': req.pk, 'stage': stage}]}
+        response = self.client.post(reverse('bulk_update_request_stage'), moves, content_type='application/json')
+        self.assertEqual(response.json()['status'], 'success')
+
+    def test_stage_changes_are_recorded_with_dwell(self):
+        req = MaintenanceRequest.objects.create(subject='Drip', work_center=self.work_center, created_by=self.user)
+        self.assertIsNotNone(req.stage_entered_at)
+        hour_ago = timezone.now() - timedelta(hours=1)
+        MaintenanceRequest.objects.filter(pk=req.pk).update(stage_entered_at=hour_ago)
+        StageTransition.objects.filter(request=req).update(at=hour_ago)
+
+        req = MaintenanceRequest.objects.get(pk=req.pk)
+        req.subject = 'Dripping'
+        req.save()
+        req.stage = 'In Progress'
+        req.save()
+        created, started = StageTransition.objects.filter(request=req).order_by('at')
+        self.assertEqual((created.from_stage, created.to_stage, created.dwell_hours), ('', 'New', None))
+        self.assertEqual((started.from_stage, started.to_stage), ('New', 'In Progress'))
+        self.assertAlmostEqual(started.dwell_hours, 1, places=2)
+        req.refresh_from_db()
+        self.assertEqual(req.stage_entered_at, started.at)
+
+        self.post_move(req, 'Repaired')
+        self.assertEqual(
+            list(StageTransition.objects.filter(request=req).order_by('at').values_list('to_stage', flat=True)),
+            ['New', 'In Progress', 'Repaired'],
+        )
+
+    def test_flow_endpoint_reports_daily_counts_and_dwell(self):
+        first = MaintenanceRequest.objects.create(subject='Drip', work_center=self.work_center, created_by=self.user)
+        MaintenanceRequest.objects.create(subject='Rattle', work_center=self.work_center, created_by=self.user)
+        first.stage = 'In Progress'
+        first.save()
+        today = timezone.localdate()
+        self.assertEqual(StageFlow.objects.get(stage='New', day=today).entered, 2)
+
+        response = self.client.get(reverse('request_flow'), {'start': (today - timedelta(days=1)).isoformat()})
+        data = response.json()
+        self.assertEqual([day['date'] for day in data['days']], [(today - timedelta(days=1)).isoformat(), today.isoformat()])
+        self.assertEqual((data['days'][0]['New'], data['days'][1]['New'], data['days'][1]['In Progress']), (0, 1, 1))
+        self.assertEqual(data['dwell']['New']['exits'], 1)
+
+        self.assertEqual(self.client.get(reverse('request_flow'), {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('request_flow'), {'start': '2000-01-01'}).status_code, 400)
+
+        # A full rebuild gives the same rows
+        before = list(StageFlow.objects.order_by('day', 'stage').values_list('stage', 'entered', 'exited'))
+        flow.refresh()
+        self.assertEqual(list(StageFlow.objects.order_by('day', 'stage').values_list('stage', 'entered', 'exited')), before)
+
+
+@override_settings(GEARGUARD_LOG_PAGE_SIZE=2)
+class RequestFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('editor')
+        cls.pump = Equipment.objects.create(name='Pump 1', serial_number='PU-1', department='Water', location='Basement')
+        cls.fan = Equipment.objects.create(name='Fan 1', serial_number='FA-1', department='Air', location='Roof')
+        search.index_equipment([cls.pump, cls.fan])
+        cls.req = MaintenanceRequest.objects.create(subject='Noise', equipment=cls.pump, created_by=cls.user)
+        MaintenanceLog.objects.bulk_create([
+            MaintenanceLog(request=cls.req, comment=f'Note {n}', created_by=cls.user) for n in range(5)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_edit_page_renders_only_the_selected_rows(self):
+        response = self.client.get(reverse('request_update', args=[self.req.pk]))
+        self.assertContains(response, 'Pump 1 (PU-1)')
+        self.assertNotContains(response, 'Fan 1')
+        self.assertContains(response, f'data-lookup="{reverse("lookup", args=["equipment"])}"')
+        self.assertEqual(len(response.context['logs']), 2)
+
+        cursor = response.context['logs_next']
+        seen = [log.pk for log in response.context['logs']]
+        while cursor:
+            data = self.client.get(reverse('request_logs', args=[self.req.pk]), {'cursor': cursor}).json()
+            seen += [log['id'] for log in data['logs']]
+            cursor = data['next']
+        self.assertEqual(seen, list(self.req.logs.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+
+        results = self.client.get(reverse('lookup', args=['equipment']), {'q': 'fan'}).json()['results']
+        self.assertEqual(results, [{'id': self.fan.pk, 'text': 'Fan 1 (FA-1)'}])
+        self.assertEqual(self.client.get(reverse('lookup', args=['parts'])).status_code, 404)
+
+    def test_invalid_posts_show_their_errors(self):
+        url = reverse('request_update', args=[self.req.pk])
+        response = self.client.post(url, {'submit_request': '1', 'subject': '', 'equipment': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+        response = self.client.post(url, {'submit_log': '1', 'comment': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['log_form'].errors)
+        self.assertFalse(response.context['form'].is_bound)
+
+
+class AutofillTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        self.client.force_login(self.user)
+        self.team = MaintenanceTeam.objects.create(name='Mechanics')
+        self.category = EquipmentCategory.objects.create(name='Pumps')
+        self.pump = Equipment.objects.create(
+            name='Pump 1', serial_number='PU-1', department='Water', location='Basement',
+            category=self.category, maintenance_team=self.team,
+        )
+        self.fan = Equipment.objects.create(name='Fan 1', serial_number='FA-1', department='Air', location='Roof')
+
+    def test_details_are_cached_until_a_save(self):
+        autofill.forget()
+        with self.assertNumQueries(1):
+            found = autofill.details_many([self.pump.pk, self.fan.pk, 999999])
+        self.assertEqual(found[self.pump.pk]['team_name'], 'Mechanics')
+        self.assertEqual(found[self.fan.pk]['category'], '')
+        with self.assertNumQueries(0):
+            autofill.details(self.pump.pk)
+
+        self.team.name = 'Fitters'
+        self.team.save()
+        self.assertEqual(autofill.details(self.pump.pk)['team_name'], 'Fitters')
+
+        data = self.client.get(reverse('equipment_details_batch'), {'ids': f'{self.fan.pk},{self.pump.pk},999999'}).json()
+        self.assertEqual([row['id'] for row in data['equipment']], [self.fan.pk, self.pump.pk])
+        self.assertEqual(self.client.get(reverse('equipment_details_batch'), {'ids': 'a'}).status_code, 400)
+        response = self.client.get(reverse('get_equipment_details', args=[self.pump.pk]))
+        self.assertEqual(response.json()['category'], 'Pumps')
+
+    def test_snapshot_and_delta_sync(self):
+        snapshot = self.client.get(reverse('equipment_snapshot')).json()
+        self.assertEqual(len(snapshot['rows']), 2)
+        index = snapshot['fields'].index('department')
+
+        # Health is not part of the details: no change
+        self.fan.health = 50
+        self.fan.save()
+        self.pump.department = 'Utilities'
+        self.pump.save()
+        pump_id = self.pump.pk
+        self.fan.delete()
+        delta = self.client.get(reverse('equipment_snapshot'), {'since': snapshot['version']}).json()
+        self.assertEqual([row[index] for row in delta['rows']], ['Utilities'])
+        self.assertEqual(delta['deleted'], [snapshot['rows'][1][0]])
+        self.assertEqual(delta['rows'][0][0], pump_id)
+        self.assertEqual(EquipmentChange.objects.filter(id__gt=snapshot['version']).count(), 2)
+
+        kept = EquipmentChange.objects.count()
+        self.assertEqual(autofill.prune(now=timezone.now() + timedelta(days=365)), kept - 1)
+        self.assertEqual(autofill.changes(delta['version'])['rows'], [])
+        self.assertEqual(self.client.get(reverse('equipment_snapshot'), {'since': 0}).json(), {'reset': True})
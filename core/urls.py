@@ -1,20 +1,35 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('equipment/', views.equipment_list, name='equipment_list'),
+    path('export/<str:kind>.<str:fmt>', views.export_data, name='export_data'),
     path('equipment/new/', views.equipment_create, name='equipment_create'),
+    path('equipment/import/', views.equipment_import, name='equipment_import'),
     path('equipment/<int:pk>/', views.equipment_detail, name='equipment_detail'),
     path('requests/', views.request_list, name='request_list'),
     path('requests/new/', views.request_create, name='request_create'),
     path('requests/<int:pk>/edit/', views.request_update, name='request_update'),
+    path('api/requests/board/', views.request_board_column, name='request_board_column'),
+    path('api/requests/stage/', views.bulk_update_request_stage, name='bulk_update_request_stage'),
     path('api/requests/<int:pk>/stage/', views.update_request_stage, name='update_request_stage'),
+    path('api/requests/<int:pk>/logs/', views.request_logs, name='request_logs'),
+    path('api/lookup/<str:kind>/', views.lookup, name='lookup'),
     path('api/equipment/<int:pk>/', views.get_equipment_details, name='get_equipment_details'),
+    path('api/equipment/details/', views.equipment_details_batch, name='equipment_details_batch'),
+    path('api/equipment/snapshot/', views.equipment_snapshot, name='equipment_snapshot'),
     path('work-centers/', views.work_center_list, name='work_center_list'),
     path('work-centers/new/', views.work_center_create, name='work_center_create'),
     path('categories/', views.category_list, name='category_list'),
     path('categories/new/', views.category_create, name='category_create'),
     path('calendar/', views.calendar_view, name='calendar'),
     path('api/events/', views.request_events, name='request_events'),
+    path('api/requests/flow/', views.request_flow, name='request_flow'),
+    path('api/telemetry/', views.ingest_telemetry, name='ingest_telemetry'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('tasks/metrics/', views.task_metrics, name='task_metrics'),
+    path('events/', views.event_stream, name='event_stream'),
+    path('api/v1/<str:resource>/', api.resource_list, name='api_list'),
+    path('api/v1/<str:resource>/<int:pk>/', api.resource_detail, name='api_detail'),
 ]
@@ -0,0 +1,166 @@
+"""
+Model version stamps and cached views.
+
+Each tracked model has a stamp in Django's cache: the time of its last
+write, bumped by signals (and explicitly by the bulk write paths, which
+bypass them). A view decorated with ``cached_view(*models)`` derives an
+ETag and Last-Modified from the stamps of the models it reads, so:
+
+* a browser revalidating with ``If-None-Match`` / ``If-Modified-Since``
+  gets a 304 without the view running, and
+* other hits are answered from a response cache keyed on that ETag
+  (stamps, URL, user and CSRF cookie), so nothing needs deleting when
+  data changes; old entries simply stop being asked for.
+
+Stamps are bumped when a write happens and again when its transaction
+commits, so a reader that queried the old rows in between cannot keep
+them cached under the new stamp. Cache misses read from the primary:
+a lagging replica would have the same problem.
+
+Stamps and responses live in the ``GEARGUARD_VERSION_CACHE`` alias, which
+every process must share: the worker, management commands and other web
+processes bump stamps too. With a per-process LocMemCache there, cached
+views and stamped fragments are switched off unless DEBUG is on.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import routers
+
+PREFIX = 'gearguard:version:'
+
+
+def timeout():
+    """
+    Seconds a cached response is kept.
+    """
+    return getattr(settings, 'GEARGUARD_VIEW_CACHE_TIMEOUT', 300)
+
+
+def store():
+    """
+    The cache holding stamps and cached responses.
+    """
+    return caches[getattr(settings, 'GEARGUARD_VERSION_CACHE', 'default')]
+
+
+def enabled():
+    """
+    Whether stamps can be trusted for caching: a process-local cache never
+    sees the bumps of other processes, so pages would stay stale until
+    they expire. Allowed anyway under DEBUG (single runserver process).
+    """
+    return settings.DEBUG or not isinstance(store(), LocMemCache)
+
+
+def _key(model):
+    return PREFIX + model._meta.label_lower
+
+
+def _set(keys):
+    store().set_many(dict.fromkeys(keys, time.time()), None)
+
+
+def bump(*models):
+    """
+    Mark ``models`` as changed, now and after the current transaction commits.
+    """
+    keys = [_key(model) for model in models]
+    _set(keys)
+    transaction.on_commit(lambda: _set(keys))
+
+
+def stamps(*models):
+    """
+    Return ``{label: stamp}`` for ``models`` in one cache round trip.
+    """
+    keys = [_key(model) for model in models]
+    cache = store()
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Cold cache: start every process from the same stamp
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return {key.removeprefix(PREFIX): found[key] for key in keys}
+
+
+def version(*models):
+    """
+    A short string that changes whenever one of ``models`` does, for
+    keying template fragments.
+    """
+    return hashlib.md5(repr(sorted(stamps(*models).items())).encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # A page with a CSRF token must match the cookie the client sent
+        # (the cookie is part of the key); a new cookie means a new secret
+        and request.META.get('CSRF_COOKIE', '') == request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    )
+
+
+def _add_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Per-user content that browsers must revalidate (cheap: usually a 304)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def cached_view(*models):
+    """
+    Conditional GET and response caching for a view whose output depends
+    only on its URL, the user and the rows of ``models``.
+    """
+    def decorator(view):
+        name = f'{view.__module__}.{view.__qualname__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not enabled():
+                return view(request, *args, **kwargs)
+
+            current = stamps(*models)
+            identity = (
+                name,
+                request.get_full_path(),
+                request.user.pk,
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+                sorted(current.items()),
+            )
+            digest = hashlib.md5(repr(identity).encode(), usedforsecurity=False).hexdigest()
+            etag = quote_etag(digest)
+            last_modified = int(max(current.values()))
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return _add_headers(response, etag, last_modified)
+
+            key = f'gearguard:view:{digest}'
+            cache = store()
+            response = cache.get(key)
+            if response is None:
+                routers.pin_primary()
+                response = view(request, *args, **kwargs)
+                if not _cacheable(request, response):
+                    return response
+                cache.set(key, response, timeout())
+            return _add_headers(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -1,74 +1,129 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Count, Q
-from .models import Equipment, MaintenanceRequest, MaintenanceTeam, Technician, WorkCenter, MaintenanceLog, EquipmentCategory
-from .forms import EquipmentForm, MaintenanceRequestForm, WorkCenterForm, MaintenanceLogForm
+from .models import Equipment, MaintenanceRequest, MaintenanceTeam, Technician, WorkCenter, MaintenanceLog, EquipmentCategory, OeeBucket, ReliabilitySummary, StageFlow
+from .forms import EquipmentForm, MaintenanceRequestForm, WorkCenterForm, MaintenanceLogForm, ImportForm
+from . import assignment, autofill, board, events, exports, flow, importers, kpis, lookups, metrics, oee, pagination, routers, search, sqlite, tasks, telemetry, versions
 
 from django import forms
 
+import json
+from datetime import datetime, time, timedelta
+
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 
 @login_required
 def dashboard(request):
     """
     Overview of maintenance status.
     """
-    # Critical Equipment (Health < 30%)
-    critical_equipment = Equipment.objects.filter(health__lt=30).count()
-    
-    # Open Requests (Pending vs Overdue)
-    open_requests_qs = MaintenanceRequest.objects.exclude(stage__in=['Repaired', 'Scrap'])
-    total_open = open_requests_qs.count()
-    
-    now = timezone.now()
-    # Note: scheduled_date is DateTimeField now
-    overdue_requests = open_requests_qs.filter(scheduled_date__lt=now).count()
-    pending_requests = total_open - overdue_requests
-    
-    total_techs = Technician.objects.count()
-    if total_techs > 0:
-        utilization = int((total_open / (total_techs * 5)) * 100)
-    else:
-        utilization = 0
-    
+    # Counters come from the cached KPI snapshot (see core/kpis.py)
+    snapshot = kpis.get_snapshot()
+    snapshot_age = kpis.age(snapshot)
+
+    # Per-technician load from the in-memory index (see core/assignment.py)
+    technician_load = assignment.get_index().utilization()
+
     recent_activity = MaintenanceRequest.objects.select_related('equipment', 'work_center', 'assigned_to', 'created_by').order_by('-updated_at')[:5]
 
     context = {
-        'critical_count': critical_equipment,
-        'open_count': total_open,
-        'pending_count': pending_requests,
-        'overdue_count': overdue_requests,
-        'tech_utilization': utilization,
+        'critical_count': snapshot['critical_count'],
+        'open_count': snapshot['open_count'],
+        'pending_count': snapshot['pending_count'],
+        'overdue_count': snapshot['overdue_count'],
+        'tech_utilization': assignment.overall_utilization(technician_load),
+        'technician_load': technician_load,
+        'snapshot_age': snapshot_age,
         'recent_activity': recent_activity,
+        'events_url': events.stream_url(request.user, events.DASHBOARD),
     }
-    return render(request, 'core/dashboard.html', context)
+    response = render(request, 'core/dashboard.html', context)
+    response['X-KPI-Snapshot-Age'] = str(snapshot_age)
+    return response
 
 # --- Equipment Views ---
 
+EQUIPMENT_SORTS = ('name', 'serial_number', 'department', 'location', 'health')
+
+# Latest requests shown on the equipment page
+HISTORY_SIZE = 10
+
 @login_required
 def equipment_list(request):
     query = request.GET.get('q')
     equipments = Equipment.objects.select_related('category', 'work_center', 'maintenance_team').all()
-    
-    if query:
-        equipments = equipments.filter(
-            Q(name__icontains=query) | 
-            Q(serial_number__icontains=query) |
-            Q(department__icontains=query)
-        )
-        
-    return render(request, 'core/equipment_list.html', {'equipments': equipments})
+    page_size = getattr(settings, 'GEARGUARD_EQUIPMENT_PAGE_SIZE', 50)
+    sort = request.GET.get('sort')
+
+    if query and not sort:
+        # Ranked full-text search (see core/search.py): best matches only
+        equipments = list(search.filter_ranked(equipments, 'equipment', query)[:page_size])
+        next_cursor = prev_cursor = None
+    else:
+        if query:
+            equipments = search.filter_matches(equipments, 'equipment', query)
+        field, descending = pagination.parse_sort(sort, EQUIPMENT_SORTS, 'name')
+        sort = f"{'-' if descending else ''}{field}"
+        before = request.GET.get('before')
+        try:
+            equipments, next_cursor, prev_cursor = pagination.paginate(
+                equipments, field, descending,
+                cursor=before or request.GET.get('after'),
+                limit=page_size,
+                backwards=bool(before),
+            )
+        except ValueError:
+            return redirect('equipment_list')
+
+    # Cached rows are keyed on the model stamps, which a lagging replica
+    # may not have caught up with yet (or, unshared, other processes bumped)
+    row_version = None
+    if versions.enabled() and not (routers.replicas() and routers.reading_from_replica()):
+        row_version = versions.version(Equipment, EquipmentCategory, MaintenanceTeam)
+
+    return render(request, 'core/equipment_list.html', {
+        'equipments': equipments,
+        'row_version': row_version,
+        'sort': sort,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    })
 
 @login_required
+@versions.cached_view(Equipment, EquipmentCategory, MaintenanceTeam, User, MaintenanceRequest, ReliabilitySummary)
 def equipment_detail(request, pk):
-    equipment = get_object_or_404(Equipment, pk=pk)
+    equipment = get_object_or_404(Equipment.objects.select_related('category', 'maintenance_team', 'owner', 'reliability'), pk=pk)
     request_count = equipment.requests.count()
+    history = equipment.requests.select_related('assigned_to').order_by('-created_at')[:HISTORY_SIZE]
     return render(request, 'core/equipment_detail.html', {
         'equipment': equipment,
-        'request_count': request_count
+        'request_count': request_count,
+        'reliability': getattr(equipment, 'reliability', None),
+        'history': history,
     })
 
+@login_required
+def export_data(request, kind, fmt):
+    """
+    Stream equipment or maintenance requests as CSV or JSON Lines.
+    """
+    if kind not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404
+    queryset = None
+    query = request.GET.get('q')
+    if query:
+        model = exports.EXPORTS[kind][0]
+        queryset = search.filter_matches(model.objects.all(), 'equipment' if kind == 'equipment' else 'request', query)
+    return exports.stream(kind, fmt, queryset)
+
 @login_required
 def equipment_create(request):
     if request.method == 'POST':
@@ -80,11 +135,32 @@ def equipment_create(request):
         form = EquipmentForm()
     return render(request, 'core/form.html', {'form': form, 'title': 'Add Equipment'})
 
+@login_required
+def equipment_import(request):
+    report = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = importers.import_file(
+                    upload, upload.name,
+                    kind=form.cleaned_data['kind'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+    else:
+        form = ImportForm()
+    return render(request, 'core/import.html', {'form': form, 'report': report})
+
 # --- Work Center Views ---
 
 @login_required
+@versions.cached_view(WorkCenter, ReliabilitySummary, OeeBucket)
 def work_center_list(request):
-    work_centers = WorkCenter.objects.all()
+    # Current day/week/month OEE from the precomputed buckets (see core/oee.py)
+    work_centers = oee.current(list(WorkCenter.objects.select_related('reliability')))
     return render(request, 'core/work_center_list.html', {'work_centers': work_centers})
 
 @login_required
@@ -101,8 +177,9 @@ def work_center_create(request):
 # --- Category Views ---
 
 @login_required
+@versions.cached_view(EquipmentCategory, Equipment, User, ReliabilitySummary)
 def category_list(request):
-    categories = EquipmentCategory.objects.annotate(count=Count('equipment'))
+    categories = EquipmentCategory.objects.select_related('responsible_user', 'reliability').annotate(count=Count('equipment'))
     return render(request, 'core/category_list.html', {'categories': categories})
 
 class CategoryForm(forms.ModelForm):
@@ -128,18 +205,38 @@ def request_list(request):
     # Kanban Board View
     # Filtering: Can filter by equipment if passed in GET
     equipment_name = request.GET.get('q')
-    
-    qs = MaintenanceRequest.objects.all().select_related('equipment', 'work_center', 'assigned_to')
-    if equipment_name:
-        qs = qs.filter(equipment__name__icontains=equipment_name)
+    include_history = bool(request.GET.get('history'))
 
-    stages = []
-    # (Stage Name, QuerySet, ID for Sortable)
-    for stage_code, stage_label in MaintenanceRequest.STAGE_CHOICES:
-        stages.append((stage_label, qs.filter(stage=stage_code), stage_code))
+    qs = board.board_queryset(equipment_name, include_history=include_history)
 
     return render(request, 'core/kanban.html', {
-        'stages': stages
+        'stages': board.build_board(qs),
+        'include_history': include_history,
+        'closed_window': board.closed_window(),
+        'events_url': events.stream_url(request.user, events.BOARD),
+    })
+
+@login_required
+def request_board_column(request):
+    """
+    JSON: next page of cards for one Kanban column (keyset on updated_at, id).
+    """
+    stage = request.GET.get('stage')
+    if stage not in dict(MaintenanceRequest.STAGE_CHOICES):
+        return JsonResponse({'status': 'error', 'message': 'Unknown stage'}, status=400)
+
+    qs = board.board_queryset(request.GET.get('q'), include_history=bool(request.GET.get('history')))
+    try:
+        cards, next_cursor = board.column_page(qs, stage, cursor=request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'cards': [
+            {'id': req.pk, 'html': render_to_string('core/kanban_card.html', {'req': req}, request=request)}
+            for req in cards
+        ],
+        'next': next_cursor,
     })
 
 @login_required
@@ -157,6 +254,9 @@ def request_create(request):
         if form.is_valid():
             maintenance_request = form.save(commit=False)
             maintenance_request.created_by = request.user
+            if not maintenance_request.assigned_to_id:
+                # Route to the least-loaded technician of the equipment's team
+                assignment.assign(maintenance_request)
             maintenance_request.save()
             return redirect('request_list')
     else:
@@ -165,10 +265,22 @@ def request_create(request):
     # Pass work centers for dynamic JS if needed, though form handles choices
     return render(request, 'core/request_form.html', {'form': form})
 
+def _log_page(req, cursor=None):
+    """
+    ``(logs, next_cursor)``: one newest-first page of ``req``'s logs.
+    """
+    logs, next_cursor, _ = pagination.paginate(
+        req.logs.select_related('created_by'), 'created_at', descending=True, cursor=cursor,
+        limit=getattr(settings, 'GEARGUARD_LOG_PAGE_SIZE', 20),
+    )
+    return logs, next_cursor
+
 @login_required
 def request_update(request, pk):
     req = get_object_or_404(MaintenanceRequest, pk=pk)
-    
+    # Bound by whichever of the two forms was posted, so its errors show
+    form = log_form = None
+
     # Handle Log submission
     if request.method == 'POST' and 'submit_log' in request.POST:
         log_form = MaintenanceLogForm(request.POST)
@@ -176,68 +288,289 @@ def request_update(request, pk):
             log = log_form.save(commit=False)
             log.request = req
             log.created_by = request.user
-            log.save()
+            with sqlite.serialized_write():
+                log.save()
             return redirect('request_update', pk=pk)
-    
+
     # Handle Request Update
-    if request.method == 'POST' and 'submit_request' in request.POST:
+    elif request.method == 'POST' and 'submit_request' in request.POST:
         form = MaintenanceRequestForm(request.POST, instance=req)
         if form.is_valid():
             form.save()
             return redirect('request_list')
-    
-    else:
-        form = MaintenanceRequestForm(instance=req)
-        log_form = MaintenanceLogForm()
 
-    logs = req.logs.select_related('created_by').order_by('-created_at')
+    logs, next_cursor = _log_page(req)
 
     return render(request, 'core/request_form.html', {
-        'form': form, 
+        'form': form or MaintenanceRequestForm(instance=req),
         'request_obj': req,
-        'log_form': log_form,
-        'logs': logs
+        'log_form': log_form or MaintenanceLogForm(),
+        'logs': logs,
+        'logs_next': next_cursor,
+        'events_url': events.stream_url(request.user, events.request_topic(req.pk)),
+    })
+
+@login_required
+def request_logs(request, pk):
+    """
+    JSON: the next page of a request's logs (keyset on created_at, id).
+    """
+    req = get_object_or_404(MaintenanceRequest.objects.only('id'), pk=pk)
+    try:
+        logs, next_cursor = _log_page(req, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'logs': [
+            {'id': log.pk, 'html': render_to_string('core/log_entry.html', {'log': log}, request=request)}
+            for log in logs
+        ],
+        'next': next_cursor,
     })
 
 @login_required
+@versions.cached_view(Equipment, WorkCenter, User)
+def lookup(request, kind):
+    """
+    JSON: type-ahead matches for the request form (see core/lookups.py).
+    """
+    if kind not in lookups.KINDS:
+        raise Http404
+    return JsonResponse({'results': lookups.lookup(kind, request.GET.get('q'))})
+
+@login_required
+@versions.cached_view(Equipment, EquipmentCategory, MaintenanceTeam)
 def get_equipment_details(request, pk):
-    equipment = get_object_or_404(Equipment, pk=pk)
-    data = {
-        'category': equipment.category.name if equipment.category else '',
-        'department': equipment.department,
-        'team_id': equipment.maintenance_team.id if equipment.maintenance_team else None,
-        'team_name': equipment.maintenance_team.name if equipment.maintenance_team else '',
-        'work_center_id': equipment.work_center.id if equipment.work_center else None
-    }
+    data = autofill.details(pk)
+    if data is None:
+        raise Http404
     return JsonResponse(data)
 
+@login_required
+def equipment_details_batch(request):
+    """
+    JSON: auto-fill details for ?ids=1,2,3 (unknown ids are left out).
+    """
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid ids'}, status=400)
+    limit = getattr(settings, 'GEARGUARD_AUTOFILL_MAX_BATCH', 200)
+    if len(ids) > limit:
+        return JsonResponse({'status': 'error', 'message': f'At most {limit} ids per call'}, status=400)
+    found = autofill.details_many(ids)
+    return JsonResponse({'equipment': [found[pk] for pk in dict.fromkeys(ids) if pk in found]})
+
+@login_required
+@versions.cached_view(Equipment, EquipmentCategory, MaintenanceTeam)
+def equipment_snapshot(request):
+    """
+    JSON: the auto-fill table for offline clients, whole or, with
+    ?since=<version>, the changes after it. ``{'reset': true}`` asks for a
+    new snapshot when those changes are no longer kept.
+    """
+    since = request.GET.get('since')
+    if not since:
+        return JsonResponse(autofill.snapshot())
+    try:
+        changes = autofill.changes(int(since))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid version'}, status=400)
+    return JsonResponse(changes if changes is not None else {'reset': True})
+
 def update_request_stage(request, pk):
     # API View
     if request.method == 'POST':
-        import json
         data = json.loads(request.body)
         new_stage = data.get('stage')
-        req = get_object_or_404(MaintenanceRequest, pk=pk)
-        req.stage = new_stage
-        req.save()
+        with sqlite.serialized_write():
+            req = get_object_or_404(MaintenanceRequest, pk=pk)
+            req.stage = new_stage
+            req.save()
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
 
+@login_required
+def bulk_update_request_stage(request):
+    """
+    API View: apply many Kanban moves at once.
+    Body: {"moves": [{"id": 1, "stage": "Repaired"}, ...]}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=405)
+    try:
+        moves = json.loads(request.body).get('moves')
+    except (ValueError, AttributeError):
+        moves = None
+    if not isinstance(moves, list):
+        return JsonResponse({'status': 'error', 'message': 'Expected {"moves": [...]}'}, status=400)
+    if len(moves) > board.max_moves():
+        return JsonResponse({'status': 'error', 'message': f'At most {board.max_moves()} moves per call'}, status=400)
+
+    results = board.apply_moves(moves)
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    return JsonResponse({'status': 'success' if not failed else 'partial', 'results': results})
+
+@csrf_exempt
+def ingest_telemetry(request):
+    """
+    API View: append sensor readings (JSON array or NDJSON).
+    Authenticated with `Authorization: Bearer <GEARGUARD_TELEMETRY_TOKEN>`.
+    """
+    token = getattr(settings, 'GEARGUARD_TELEMETRY_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not token or not constant_time_compare(supplied, token):
+        return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=405)
+    try:
+        records = telemetry.parse_payload(request.body)
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'status': 'error', 'message': 'Malformed payload'}, status=400)
+    if len(records) > telemetry.batch_size():
+        return JsonResponse({'status': 'error', 'message': f'At most {telemetry.batch_size()} readings per call'}, status=400)
+
+    result = telemetry.ingest(records)
+    return JsonResponse({
+        'status': 'success' if not result['rejected'] else 'partial',
+        'accepted': result['accepted'],
+        'rejected': result['rejected'],
+        'triggered': result['triggered'],
+        'errors': [{'index': index, 'message': message} for index, message in result['errors']],
+    })
+
 @login_required
 def calendar_view(request):
-    return render(request, 'core/calendar.html')
+    return render(request, 'core/calendar.html', {
+        'teams': MaintenanceTeam.objects.only('id', 'name').order_by('name'),
+        'work_centers': WorkCenter.objects.only('id', 'name', 'code').order_by('name'),
+        'priorities': MaintenanceRequest.PRIORITY_CHOICES,
+    })
+
+def _parse_event_bound(value):
+    """
+    Parse a FullCalendar range bound. Accepts full ISO datetimes
+    (with or without offset) as well as plain dates.
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
+@versions.cached_view(MaintenanceRequest, Equipment)
 def request_events(request):
-    events = []
     # V2: Use scheduled_date (DateTimeField)
+    # FullCalendar sends the visible range as ?start=...&end=...
+    try:
+        start = _parse_event_bound(request.GET.get('start'))
+        end = _parse_event_bound(request.GET.get('end'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid start/end'}, status=400)
+
     requests = MaintenanceRequest.objects.filter(scheduled_date__isnull=False)
-    
-    for req in requests:
-        events.append({
-            'title': f"{req.subject}",
-            'start': req.scheduled_date.isoformat(),
-            'url': f"/requests/{req.pk}/edit/",
-            'color': '#ef4444' if req.priority == 'Critical' else ('#10b981' if req.stage == 'Repaired' else '#f59e0b')
-        })
-            
+    if start:
+        requests = requests.filter(scheduled_date__gte=start)
+    if end:
+        requests = requests.filter(scheduled_date__lt=end)
+
+    # Optional filters
+    team = request.GET.get('team')
+    work_center = request.GET.get('work_center')
+    priority = request.GET.get('priority')
+    try:
+        if team:
+            requests = requests.filter(team_id=int(team))
+        if work_center:
+            work_center = int(work_center)
+            requests = requests.filter(Q(work_center_id=work_center) | Q(equipment__work_center_id=work_center))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid filter'}, status=400)
+    if priority:
+        requests = requests.filter(priority__in=priority.split(','))
+
+    rows = requests.order_by('scheduled_date').values('pk', 'subject', 'scheduled_date', 'priority', 'stage')
+    events = [
+        {
+            'title': row['subject'],
+            'start': row['scheduled_date'].isoformat(),
+            'url': f"/requests/{row['pk']}/edit/",
+            'color': '#ef4444' if row['priority'] == 'Critical' else ('#10b981' if row['stage'] == 'Repaired' else '#f59e0b')
+        }
+        for row in rows
+    ]
+
     return JsonResponse(events, safe=False)
+
+
+@login_required
+@versions.cached_view(StageFlow)
+def request_flow(request):
+    """
+    Cumulative flow and time in stage for ?start=...&end=... (ISO dates,
+    default the last 30 days), from the daily StageFlow aggregates.
+    """
+    try:
+        end = parse_date(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = parse_date(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        start = end = None
+    if start is None or end is None or start > end:
+        return JsonResponse({'status': 'error', 'message': 'Invalid start/end'}, status=400)
+    if (end - start).days >= flow.MAX_DAYS:
+        return JsonResponse({'status': 'error', 'message': f'At most {flow.MAX_DAYS} days per call'}, status=400)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'stages': flow.STAGES,
+        'days': flow.cumulative_flow(start, end),
+        'dwell': flow.dwell(start, end),
+    })
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for the request metrics of this process.
+    Open to staff users or with `Authorization: Bearer <GEARGUARD_METRICS_TOKEN>`.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def task_metrics(request):
+    """
+    Prometheus gauges for the background task queue: depth by task and
+    status, oldest due task, and recent wait/run times. These come from
+    the shared table, so scrape one instance only. Same access as /metrics/.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(tasks.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'GEARGUARD_METRICS_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return request.user.is_staff or bool(token and constant_time_compare(supplied, token))
+
+def event_stream(request):
+    """
+    Server-sent events for live pages (see core/events.py), authorized by
+    the signed token in the URL. Under WSGI this answers at once with a
+    retry hint (polling); under ASGI, events.route() streams this URL
+    before Django sees it.
+    """
+    try:
+        topics = events.read_token(request.GET.get('token', ''))
+    except signing.BadSignature:
+        return HttpResponse('Invalid or expired stream token', status=403, content_type='text/plain')
+
+    last_id = events.parse_last_id(request.headers.get('Last-Event-ID'))
+    response = HttpResponse(events.poll(topics, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gearguard.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Server-sent events are streamed in front of Django (see core/events.py)
+from core import events  # noqa: E402
+
+application = events.route(django_application)
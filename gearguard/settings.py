@@ -42,11 +42,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +83,10 @@ DATABASES = {
     }
 }
 
+# Reads go to GEARGUARD_READ_REPLICAS (database aliases) only for the
+# replica-safe views; see core/routers.py and gearguard/settings_production.py.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +135,184 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+TEST_RUNNER = 'gearguard.test_runner.TestRunner'
+
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 LOGIN_URL = 'login'
+
+# Kanban board: cards rendered per column, how many days of
+# Repaired/Scrap history the closed columns show by default (0 = all),
+# and the largest batch accepted by the bulk stage API.
+GEARGUARD_BOARD_PAGE_SIZE = 20
+GEARGUARD_BOARD_CLOSED_DAYS = 30
+GEARGUARD_BOARD_MAX_MOVES = 500
+
+# Cache used for the dashboard KPI snapshot. The local-memory cache is
+# per process; multi-worker deployments should point this at a shared
+# backend (Redis/Memcached) so signal invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered Kanban cards and equipment rows. Keys change with the data,
+    # so this stays a per-process memory cache even in production: a
+    # network round trip per fragment would cost more than rendering it.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gearguard-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Dashboard KPIs: maximum snapshot age in seconds, and whether stale
+# snapshots are refreshed in a background thread.
+GEARGUARD_KPI_MAX_AGE = 60
+GEARGUARD_KPI_ASYNC_REFRESH = True
+
+# Full-text search: 'auto' uses SQLite FTS5 or PostgreSQL tsvector/GIN
+# depending on the database, or give a dotted path to a backend class
+# from core.search. Rebuild with `manage.py rebuild_search_index`. The
+# limit caps relevance-ranked results only; exports and keyset-paged
+# filters see every match.
+GEARGUARD_SEARCH_BACKEND = 'auto'
+GEARGUARD_SEARCH_LIMIT = 500
+
+# Equipment list page size and streaming export fetch size.
+GEARGUARD_EQUIPMENT_PAGE_SIZE = 50
+GEARGUARD_EXPORT_CHUNK_SIZE = 2000
+
+# Technician assignment: open requests per technician at 100% load, and
+# how often (seconds) the in-memory load index is rebuilt from the database.
+GEARGUARD_TECH_CAPACITY = 5
+GEARGUARD_ASSIGNMENT_MAX_AGE = 300
+
+# Telemetry ingestion. The API is disabled until a token is configured.
+# Retention is in days per level ('raw' readings, then rollup buckets);
+# None keeps a level forever.
+GEARGUARD_TELEMETRY_TOKEN = ''
+GEARGUARD_TELEMETRY_BATCH_SIZE = 5000
+GEARGUARD_TELEMETRY_LOOKBACK_MINUTES = 120
+GEARGUARD_TELEMETRY_RETENTION = {'raw': 7, 'minute': 30, 'hour': 365, 'day': None}
+
+# Health rules: how often (seconds) each process reloads rules and cached
+# equipment profiles from the database.
+GEARGUARD_RULES_MAX_AGE = 300
+
+# Request metrics (core/metrics.py): per-view query count, DB/template
+# time and latency, served at /metrics/ to staff or to scrapers sending
+# `Authorization: Bearer <GEARGUARD_METRICS_TOKEN>`, and logged as JSON
+# on the 'gearguard.metrics' logger. Views over their query budget log a
+# warning, or raise when GEARGUARD_QUERY_BUDGET_STRICT is on, which
+# TEST_RUNNER (gearguard/test_runner.py) does for the test suite.
+GEARGUARD_METRICS_ENABLED = True
+GEARGUARD_METRICS_TOKEN = ''
+GEARGUARD_QUERY_BUDGET_STRICT = False
+GEARGUARD_QUERY_BUDGETS = {
+    # Includes the session and user lookups, and cold KPI/load caches.
+    # Refresh tasks are not counted: eager ones run once the response has
+    # been sent (core/tasks.py); queued ones add a Task row each.
+    'dashboard': 16,
+    'equipment_list': 6,
+    'equipment_detail': 8,
+    'equipment_create': 8,
+    'export_data': 5,
+    'request_list': 6,
+    'request_create': 14,
+    'request_update': 14,
+    'request_board_column': 5,
+    'bulk_update_request_stage': 14,
+    'update_request_stage': 12,
+    'request_logs': 5,
+    'lookup': 5,
+    'get_equipment_details': 8,
+    'equipment_details_batch': 3,
+    'equipment_snapshot': 5,
+    'work_center_list': 5,
+    'category_list': 6,
+    'calendar': 6,
+    'request_events': 4,
+    'request_flow': 5,
+    'ingest_telemetry': 10,
+    'metrics': 3,
+    'api_list': 15,
+    'api_detail': 15,
+    'event_stream': 1,
+    'task_metrics': 6,
+}
+
+# Read replicas: GET requests to these views may read from a replica.
+# Clients that just wrote are pinned to the primary for PIN_SECONDS so
+# they read their own writes.
+GEARGUARD_READ_REPLICAS = []
+GEARGUARD_REPLICA_VIEWS = ['dashboard', 'equipment_list', 'request_events', 'category_list', 'work_center_list']
+GEARGUARD_REPLICA_PIN_SECONDS = 5
+
+# SQLite tuning for single-node sites (core/sqlite.py): WAL journal,
+# synchronous=NORMAL, mmap, a larger page cache and a busy timeout on every
+# connection, and BEGIN IMMEDIATE on the Kanban and log write paths.
+# GEARGUARD_SQLITE_PRAGMAS overrides individual PRAGMA values.
+GEARGUARD_SQLITE_TUNING = False
+GEARGUARD_SQLITE_PRAGMAS = {}
+
+# JSON API (/api/v1/, core/api.py). Besides session auth, clients may send
+# `Authorization: Bearer <token>`; each token maps to the username it acts as.
+GEARGUARD_API_TOKENS = {}
+GEARGUARD_API_PAGE_SIZE = 50
+GEARGUARD_API_MAX_PAGE_SIZE = 200
+
+# Live updates over server-sent events (/events/, core/events.py): how long
+# (seconds) a page's signed stream URL stays valid, how many recent events
+# are kept for reconnecting clients, how many may queue per stream before
+# it is reset, the keep-alive interval (seconds), the largest bulk insert
+# announced card by card, and how long (seconds) KPI changes are gathered
+# before a refreshed snapshot is pushed to dashboards. Without ASGI the
+# stream is polled every POLL_INTERVAL seconds instead. Events are per
+# process: changes made by run_worker and management commands appear on
+# reload, not live.
+GEARGUARD_EVENTS_TOKEN_MAX_AGE = 12 * 3600
+GEARGUARD_EVENTS_BACKLOG = 500
+GEARGUARD_EVENTS_QUEUE_SIZE = 200
+GEARGUARD_EVENTS_HEARTBEAT = 15
+GEARGUARD_EVENTS_POLL_INTERVAL = 3
+GEARGUARD_EVENTS_MAX_BATCH = 50
+GEARGUARD_KPI_PUSH_DELAY = 2
+
+# HTTP caching (core/versions.py): seconds a response of a cached view
+# (work centers, categories, equipment detail, equipment lookup, calendar
+# feed, request form pickers) is kept. Entries are keyed on model version stamps, so writes
+# never serve stale pages; this only bounds memory.
+GEARGUARD_VIEW_CACHE_TIMEOUT = 300
+# Cache alias holding the version stamps and cached responses. It must be
+# shared by every process (web, run_worker, management commands), e.g.
+# Redis: with a per-process LocMemCache, bumps made elsewhere never arrive,
+# so cached views and stamped fragments are off unless DEBUG is on.
+GEARGUARD_VERSION_CACHE = 'default'
+
+# Background tasks (core/tasks.py, `manage.py run_worker`). Eager mode runs
+# tasks inline when they are enqueued (those of a request once its response
+# has been sent), so no worker is needed; turn it off and run at least one
+# worker to take slow side effects off the web processes.
+# Running tasks older than the timeout (seconds) are presumed lost and
+# retried; finished tasks are kept for the retention period (days).
+GEARGUARD_TASKS_EAGER = True
+GEARGUARD_TASKS_TIMEOUT = 300
+GEARGUARD_TASKS_RETENTION_DAYS = 7
+
+# Work center OEE (core/oee.py): days of daily/weekly/monthly buckets kept.
+# `manage.py refresh_oee --every SECONDS` keeps the current periods up to
+# date while stops are open.
+GEARGUARD_OEE_HISTORY_DAYS = 730
+
+# Request edit page: logs shown per page (more load on demand), and rows
+# per type-ahead answer of the equipment/work center/user pickers.
+GEARGUARD_LOG_PAGE_SIZE = 20
+GEARGUARD_LOOKUP_LIMIT = 20
+
+# Equipment auto-fill (core/autofill.py): details cached per process and
+# how long (seconds) before they are read again, ids per batch call, and
+# days of changes kept for offline clients syncing from a snapshot.
+GEARGUARD_AUTOFILL_CACHE_SIZE = 5000
+GEARGUARD_AUTOFILL_MAX_AGE = 60
+GEARGUARD_AUTOFILL_MAX_BATCH = 200
+GEARGUARD_AUTOFILL_CHANGE_RETENTION_DAYS = 30